@@ -17,6 +17,7 @@ class StartEvent(BaseEvent):
     """Event indicating the start of processing"""
 
     type: Literal["start"] = "start"
+    run_id: Optional[str] = None
     timestamp: Optional[str] = None
 
 class ProgressUpdateEvent(BaseEvent):
@@ -29,11 +30,20 @@ class ProgressUpdateEvent(BaseEvent):
     timestamp: Optional[str] = None
     analysis: Optional[str] = None
 
+class TokenEvent(BaseEvent):
+    """Event carrying a chunk of an agent's LLM output as it is generated"""
+
+    type: Literal["token"] = "token"
+    agent: str
+    ticker: Optional[str] = None
+    text: str
+
 class ErrorEvent(BaseEvent):
     """Event indicating an error occurred"""
 
     type: Literal["error"] = "error"
     message: str
+    run_id: Optional[str] = None  # Resubmit with this run ID to resume from the last checkpoint
     timestamp: Optional[str] = None
 
 
@@ -13,6 +13,9 @@ class AgentModelConfig(BaseModel):
 class HedgeFundResponse(BaseModel):
     decisions: dict
     analyst_signals: dict
+    llm_telemetry: dict | None = None
+    profile: list[dict] | None = None
+    run_id: str | None = None
 
 
 class ErrorResponse(BaseModel):
@@ -30,6 +33,15 @@ class HedgeFundRequest(BaseModel):
     model_provider: ModelProvider = ModelProvider.OPENAI
     initial_cash: float = 100000.0
     margin_requirement: float = 0.0
+    fan_out: bool = False  # Run every (agent, ticker) pair as its own graph task
+    max_concurrency: Optional[int] = Field(default=None, ge=1)
+    profile: bool = False  # Return per-node timings with the result
+    run_id: Optional[str] = None  # Checkpoints the run under this ID; resubmitting a failed run's ID resumes it
+    # Seconds each analyst / all analysts may take before missing signals are skipped
+    node_timeout: Optional[float] = Field(default=None, gt=0)
+    run_timeout: Optional[float] = Field(default=None, gt=0)
+    process_pool: bool = False  # Run CPU-bound analysts in worker processes
+    reuse_signals: bool = False  # Reuse stored analyst signals while their inputs are unchanged
 
     def get_start_date(self) -> str:
         """Calculate start date if not provided"""
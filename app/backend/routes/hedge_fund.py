@@ -1,21 +1,36 @@
 from fastapi import APIRouter, HTTPException, Depends
 from fastapi.responses import StreamingResponse
 import asyncio
+import uuid
 
 from app.backend.models.schemas import ErrorResponse, HedgeFundRequest
-from app.backend.models.events import StartEvent, ProgressUpdateEvent, ErrorEvent, CompleteEvent
+from app.backend.models.events import StartEvent, ProgressUpdateEvent, TokenEvent, ErrorEvent, CompleteEvent
 from app.backend.models.user import User
-from app.backend.services.graph import create_graph, parse_hedge_fund_response, run_graph_async
+from app.backend.services.graph import get_compiled_graph, parse_hedge_fund_response, run_graph_async
 from app.backend.services.portfolio import create_portfolio
 from app.backend.services.auth_service import AuthService
 from app.backend.dependencies import get_auth_service
 from app.backend.routes.auth import get_current_user
+from src.graph.checkpoint import RunInProgressError, stored_run
 from src.utils.progress import progress
 from src.utils.analysts import get_agents_list
 from src.llm.models import get_models_list
 
 router = APIRouter(prefix="/hedge-fund")
 
+
+def _resume_conflict(stored: dict, request: HedgeFundRequest) -> str | None:
+    """Why a stored run cannot be resumed with this request, if it cannot."""
+    data = stored.get("data", {})
+    stored_request = stored.get("metadata", {}).get("request")
+    if list(data.get("tickers", [])) != list(request.tickers):
+        return "tickers"
+    if data.get("start_date") != request.start_date or data.get("end_date") != request.end_date:
+        return "dates"
+    if stored_request is not None and set(stored_request.selected_agents) != set(request.selected_agents):
+        return "selected_agents"
+    return None
+
 @router.post(
     path="/run",
     responses={
@@ -23,6 +38,7 @@ router = APIRouter(prefix="/hedge-fund")
         400: {"model": ErrorResponse, "description": "Invalid request parameters"},
         401: {"description": "Authentication required"},
         403: {"description": "Insufficient API calls remaining"},
+        409: {"model": ErrorResponse, "description": "A run with this run_id is already in progress"},
         500: {"model": ErrorResponse, "description": "Internal server error"},
     },
 )
@@ -42,9 +58,18 @@ async def run_hedge_fund(
         # Create the portfolio
         portfolio = create_portfolio(request.initial_cash, request.margin_requirement, request.tickers)
 
-        # Construct agent graph
-        graph = create_graph(request.selected_agents)
-        graph = graph.compile()
+        # Construct agent graph; runs given a run_id are checkpointed so a failed run can be resumed by it
+        graph = get_compiled_graph(request.selected_agents, fan_out=request.fan_out, checkpointed=request.run_id is not None)
+        run_id = request.run_id or uuid.uuid4().hex
+        # Checkpoints and progress are scoped to the user, so one user's run ID never reaches another user's run
+        thread_id = f"{current_user.id}:{run_id}"
+        if request.run_id:
+            try:
+                stored = stored_run(graph, thread_id)
+            except RunInProgressError:
+                raise HTTPException(status_code=409, detail=f"运行 {run_id} 正在进行中")
+            if stored is not None and (conflict := _resume_conflict(stored, request)):
+                raise HTTPException(status_code=400, detail=f"运行 {run_id} 的 {conflict} 与本次请求不一致, 无法恢复")
 
         # Log a test progress update for debugging
         progress.update_status("system", None, "Preparing hedge fund run")
@@ -58,14 +83,21 @@ async def run_hedge_fund(
         async def event_generator():
             # Queue for progress updates
             progress_queue = asyncio.Queue()
+            loop = asyncio.get_running_loop()
 
-            # Simple handler to add updates to the queue
+            # Simple handler to add updates to the queue (called from the graph's worker threads)
             def progress_handler(agent_name, ticker, status, analysis, timestamp):
                 event = ProgressUpdateEvent(agent=agent_name, ticker=ticker, status=status, timestamp=timestamp, analysis=analysis)
-                progress_queue.put_nowait(event)
+                loop.call_soon_threadsafe(progress_queue.put_nowait, event)
 
-            # Register our handler with the progress tracker
-            progress.register_handler(progress_handler)
+            # Streamed LLM output, delivered as it is generated
+            def token_handler(agent_name, ticker, text):
+                event = TokenEvent(agent=agent_name, ticker=ticker, text=text)
+                loop.call_soon_threadsafe(progress_queue.put_nowait, event)
+
+            # Subscribe to this run's progress only; other requests' runs have their own run IDs
+            progress.register_handler(progress_handler, run_id=thread_id)
+            progress.register_token_handler(token_handler, run_id=thread_id)
 
             try:
                 # Start the graph execution in a background task
@@ -79,10 +111,17 @@ async def run_hedge_fund(
                         model_name=request.model_name,
                         model_provider=model_provider,
                         request=request,  # Pass the full request for agent-specific model access
+                        max_concurrency=request.max_concurrency,
+                        profile=request.profile,
+                        run_id=thread_id,
+                        node_timeout=request.node_timeout,
+                        run_timeout=request.run_timeout,
+                        process_pool=request.process_pool,
+                        reuse_signals=request.reuse_signals,
                     )
                 )
                 # Send initial message
-                yield StartEvent().to_sse()
+                yield StartEvent(run_id=run_id).to_sse()
 
                 # Stream progress updates until run_task completes
                 while not run_task.done():
@@ -94,8 +133,17 @@ async def run_hedge_fund(
                         # Just continue the loop
                         pass
 
+                # Flush updates queued while the run was finishing
+                while not progress_queue.empty():
+                    yield progress_queue.get_nowait().to_sse()
+
                 # Get the final result
-                result = run_task.result()
+                try:
+                    result = run_task.result()
+                except Exception as e:
+                    # With a client-given run_id completed nodes are checkpointed; resubmitting it resumes the run
+                    yield ErrorEvent(message=f"对冲基金运行失败: {e}", run_id=run_id).to_sse()
+                    return
 
                 if not result or not result.get("messages"):
                     yield ErrorEvent(message="生成对冲基金决策失败").to_sse()
@@ -105,14 +153,18 @@ async def run_hedge_fund(
                 final_data = CompleteEvent(
                     data={
                         "decisions": parse_hedge_fund_response(result.get("messages", [])[-1].content),
-                        "analyst_signals": result.get("data", {}).get("analyst_signals", {}),
+                        "analyst_signals": result.get("analyst_signals", {}),
+                        "llm_telemetry": result.get("llm_telemetry"),
+                        "profile": result.get("profile"),
+                        "run_id": run_id,
                     }
                 )
                 yield final_data.to_sse()
 
             finally:
                 # Clean up
-                progress.unregister_handler(progress_handler)
+                progress.unregister_handler(progress_handler, run_id=thread_id)
+                progress.unregister_token_handler(token_handler, run_id=thread_id)
                 if "run_task" in locals() and not run_task.done():
                     run_task.cancel()
 
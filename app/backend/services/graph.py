@@ -1,59 +1,34 @@
 import asyncio
 import json
+from contextlib import nullcontext
 from langchain_core.messages import HumanMessage
-from langgraph.graph import END, StateGraph
+from langgraph.graph import StateGraph
 
-from src.agents.portfolio_manager import portfolio_management_agent
-from src.agents.risk_manager import risk_management_agent
-from src.main import start
+from src.llm.telemetry import telemetry_run
+from src.graph.checkpoint import invoke_resumable
+from src.graph.deadlines import run_deadline
+from src.main import create_workflow, get_compiled_workflow
 from src.utils.analysts import ANALYST_CONFIG
-from src.graph.state import AgentState
+from src.utils.profiling import profiling_run
+from src.utils.progress import progress_run
 
 
-# Helper function to create the agent graph
-def create_graph(selected_agents: list[str]) -> StateGraph:
-    """Create the workflow with selected agents."""
-    graph = StateGraph(AgentState)
-    graph.add_node("start_node", start)
+def get_compiled_graph(selected_agents: list[str], fan_out: bool = False, checkpointed: bool = False):
+    """Compiled graph for the agent selection (see :func:`src.main.get_compiled_workflow`); unknown agents are ignored."""
+    return get_compiled_workflow([agent for agent in selected_agents if agent in ANALYST_CONFIG], fan_out=fan_out, checkpointed=checkpointed)
 
-    # Filter out any agents that are not in analyst.py
-    selected_agents = [agent for agent in selected_agents if agent in ANALYST_CONFIG]
 
-    # Get analyst nodes from the configuration
-    analyst_nodes = {key: (f"{key}_agent", config["agent_func"]) for key, config in ANALYST_CONFIG.items()}
+def create_graph(selected_agents: list[str], fan_out: bool = False) -> StateGraph:
+    """Create the workflow with selected agents (see :func:`src.main.create_workflow`); unknown agents are ignored."""
+    return create_workflow([agent for agent in selected_agents if agent in ANALYST_CONFIG], fan_out=fan_out)
 
-    # Add selected analyst nodes
-    for agent_name in selected_agents:
-        node_name, node_func = analyst_nodes[agent_name]
-        graph.add_node(node_name, node_func)
-        graph.add_edge("start_node", node_name)
 
-    # Always add risk and portfolio management (for now)
-    graph.add_node("risk_management_agent", risk_management_agent)
-    graph.add_node("portfolio_manager", portfolio_management_agent)
-
-    # Connect selected agents to risk management
-    for agent_name in selected_agents:
-        node_name = analyst_nodes[agent_name][0]
-        graph.add_edge(node_name, "risk_management_agent")
-
-    # Connect the risk management agent to the portfolio management agent
-    graph.add_edge("risk_management_agent", "portfolio_manager")
-
-    # Connect the portfolio management agent to the end node
-    graph.add_edge("portfolio_manager", END)
-
-    # Set the entry point to the start node
-    graph.set_entry_point("start_node")
-    return graph
-
-
-async def run_graph_async(graph, portfolio, tickers, start_date, end_date, model_name, model_provider, request=None):
+async def run_graph_async(graph, portfolio, tickers, start_date, end_date, model_name, model_provider, request=None, max_concurrency=None, profile=False, run_id=None, node_timeout=None, run_timeout=None, process_pool=False, reuse_signals=False):
     """Async wrapper for run_graph to work with asyncio."""
     # Use run_in_executor to run the synchronous function in a separate thread
     # so it doesn't block the event loop
     loop = asyncio.get_running_loop()
-    result = await loop.run_in_executor(None, lambda: run_graph(graph, portfolio, tickers, start_date, end_date, model_name, model_provider, request))  # Use default executor
+    result = await loop.run_in_executor(None, lambda: run_graph(graph, portfolio, tickers, start_date, end_date, model_name, model_provider, request, max_concurrency, profile, run_id, node_timeout, run_timeout, process_pool, reuse_signals))  # Use default executor
     return result
 
 
@@ -66,34 +41,62 @@ def run_graph(
     model_name: str,
     model_provider: str,
     request=None,
+    max_concurrency: int | None = None,
+    profile: bool = False,
+    run_id: str | None = None,
+    node_timeout: float | None = None,
+    run_timeout: float | None = None,
+    process_pool: bool = False,
+    reuse_signals: bool = False,
 ) -> dict:
     """
     Run the graph with the given portfolio, tickers,
     start date, end date, show reasoning, model name,
     and model provider.
+
+    The final state also carries the run's LLM usage summary under
+    ``"llm_telemetry"``. ``max_concurrency`` bounds how many graph tasks run
+    at once. With ``profile`` the per-node timings are returned under
+    ``"profile"``. ``run_id`` scopes the run's progress updates; with a
+    graph compiled with a checkpointer an interrupted run with that ID is
+    resumed instead of started over.
+    Analysts that exceed ``node_timeout`` or the ``run_timeout`` budget are
+    reported to the portfolio manager as missing. With ``process_pool`` the
+    CPU-bound analysts run in worker processes. With ``reuse_signals``
+    analysts whose fetched inputs are unchanged reuse their stored signals.
     """
-    return graph.invoke(
-        {
-            "messages": [
-                HumanMessage(
-                    content="Make trading decisions based on the provided data.",
-                )
-            ],
-            "data": {
-                "tickers": tickers,
-                "portfolio": portfolio,
-                "start_date": start_date,
-                "end_date": end_date,
-                "analyst_signals": {},
-            },
-            "metadata": {
-                "show_reasoning": False,
-                "model_name": model_name,
-                "model_provider": model_provider,
-                "request": request,  # Pass the request for agent-specific model access
-            },
+    graph_input = {
+        "messages": [
+            HumanMessage(
+                content="Make trading decisions based on the provided data.",
+            )
+        ],
+        "data": {
+            "tickers": tickers,
+            "portfolio": portfolio,
+            "start_date": start_date,
+            "end_date": end_date,
+        },
+        "metadata": {
+            "show_reasoning": False,
+            "model_name": model_name,
+            "model_provider": model_provider,
+            "request": request,  # Pass the request for agent-specific model access
+            "stream_llm_tokens": True,  # Forward LLM tokens to progress token handlers (SSE)
+            "node_timeout": node_timeout,
+            "process_pool": process_pool,
+            "reuse_signals": reuse_signals,
         },
-    )
+        "analyst_signals": {},
+    }
+    config = {"max_concurrency": max_concurrency} if max_concurrency else None
+    # Progress updates from this run only reach the handlers subscribed to run_id
+    with progress_run(run_id), telemetry_run() as telemetry, profiling_run() if profile else nullcontext() as run_profile, run_deadline(run_timeout):
+        if run_id is not None and graph.checkpointer is not None:
+            final_state = invoke_resumable(graph, graph_input, run_id, config)
+        else:
+            final_state = graph.invoke(graph_input, config=config)
+    return {**final_state, "llm_telemetry": telemetry.summary(), "profile": run_profile.summary() if profile else None}
 
 
 def parse_hedge_fund_response(response):
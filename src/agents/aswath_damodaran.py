@@ -1,10 +1,11 @@
 from __future__ import annotations
 
 import json
+import math
 from typing_extensions import Literal
 from pydantic import BaseModel
 
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
 
@@ -13,7 +14,9 @@ from src.tools.api import (
     get_market_cap,
     search_line_items,
 )
-from src.utils.llm import call_llm
+from src.utils.dcf import growth_path, present_value, terminal_value
+from src.llm.prompt_budget import prompt_budget, to_prompt_json
+from src.utils.llm import call_llm_for_tickers
 from src.utils.progress import progress
 
 
@@ -111,14 +114,13 @@ def aswath_damodaran_agent(state: AgentState):
             "market_cap": market_cap,
         }
 
-        # ─── LLM: craft Damodaran-style narrative ──────────────────────────────
-        progress.update_status("aswath_damodaran_agent", ticker, "Generating Damodaran analysis")
-        damodaran_output = generate_damodaran_output(
-            ticker=ticker,
-            analysis_data=analysis_data,
-            state=state,
-        )
+    # ─── LLM: craft Damodaran-style narrative ──────────────────────────────
+    damodaran_outputs = generate_damodaran_outputs(
+        analysis_data=analysis_data,
+        state=state,
+    )
 
+    for ticker, damodaran_output in damodaran_outputs.items():
         damodaran_signals[ticker] = damodaran_output.model_dump()
 
         progress.update_status("aswath_damodaran_agent", ticker, "Done", analysis=damodaran_output.reasoning)
@@ -129,10 +131,9 @@ def aswath_damodaran_agent(state: AgentState):
     if state["metadata"]["show_reasoning"]:
         show_agent_reasoning(damodaran_signals, "Aswath Damodaran Agent")
 
-    state["data"]["analyst_signals"]["aswath_damodaran_agent"] = damodaran_signals
     progress.update_status("aswath_damodaran_agent", None, "Done")
 
-    return {"messages": [message], "data": state["data"]}
+    return {"messages": agent_messages(state, message), "analyst_signals": {"aswath_damodaran_agent": damodaran_signals}}
 
 
 # ────────────────────────────────────────────────────────────────────────────────
@@ -310,23 +311,14 @@ def calculate_intrinsic_value_dcf(metrics: list, line_items: list, risk_analysis
     # Discount rate
     discount = risk_analysis.get("cost_of_equity") or 0.09
 
-    # Project FCFF and discount
-    pv_sum = 0.0
-    g = base_growth
-    g_step = (terminal_growth - base_growth) / (years - 1)
-    for yr in range(1, years + 1):
-        fcff_t = fcff0 * (1 + g)
-        pv = fcff_t / (1 + discount) ** yr
-        pv_sum += pv
-        g += g_step
+    # Project FCFF (growth fades linearly to terminal) and discount
+    growth = growth_path(base_growth, years, fade_to=terminal_growth)
+    pv_sum = float(present_value(fcff0 * (1 + growth), discount))
 
     # Terminal value (perpetuity with terminal growth)
-    tv = (
-        fcff0
-        * (1 + terminal_growth)
-        / (discount - terminal_growth)
-        / (1 + discount) ** years
-    )
+    tv = float(terminal_value(fcff0, discount, years, terminal_growth=terminal_growth))
+    if math.isnan(tv):
+        return {"intrinsic_value": None, "details": ["Discount rate does not exceed terminal growth"]}
 
     equity_value = pv_sum + tv
     intrinsic_per_share = equity_value / shares
@@ -356,11 +348,10 @@ def estimate_cost_of_equity(beta: float | None) -> float:
 # ────────────────────────────────────────────────────────────────────────────────
 # LLM generation
 # ────────────────────────────────────────────────────────────────────────────────
-def generate_damodaran_output(
-    ticker: str,
+def generate_damodaran_outputs(
     analysis_data: dict[str, any],
     state: AgentState,
-) -> AswathDamodaranSignal:
+) -> dict[str, AswathDamodaranSignal]:
     """
     Ask the LLM to channel Prof. Damodaran's analytical style:
       • Story → Numbers → Value narrative
@@ -398,7 +389,7 @@ def generate_damodaran_output(
         ]
     )
 
-    prompt = template.invoke({"analysis_data": json.dumps(analysis_data, indent=2), "ticker": ticker})
+    prompts = {ticker: template.invoke({"analysis_data": to_prompt_json({ticker: data}, prompt_budget(state, "aswath_damodaran_agent")), "ticker": ticker}) for ticker, data in analysis_data.items()}
 
     def default_signal():
         return AswathDamodaranSignal(
@@ -407,10 +398,12 @@ def generate_damodaran_output(
             reasoning="Parsing error; defaulting to neutral",
         )
 
-    return call_llm(
-        prompt=prompt,
+    return call_llm_for_tickers(
+        prompts=prompts,
+        analysis_data=analysis_data,
         pydantic_model=AswathDamodaranSignal,
         agent_name="aswath_damodaran_agent",
         state=state,
         default_factory=default_signal,
+        status="Generating Damodaran analysis",
     )
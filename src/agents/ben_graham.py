@@ -1,4 +1,4 @@
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from src.tools.api import get_financial_metrics, get_market_cap, search_line_items
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
@@ -6,7 +6,8 @@ from pydantic import BaseModel
 import json
 from typing_extensions import Literal
 from src.utils.progress import progress
-from src.utils.llm import call_llm
+from src.llm.prompt_budget import prompt_budget, to_prompt_json
+from src.utils.llm import call_llm_for_tickers
 import math
 
 
@@ -65,13 +66,12 @@ def ben_graham_agent(state: AgentState):
 
         analysis_data[ticker] = {"signal": signal, "score": total_score, "max_score": max_possible_score, "earnings_analysis": earnings_analysis, "strength_analysis": strength_analysis, "valuation_analysis": valuation_analysis}
 
-        progress.update_status("ben_graham_agent", ticker, "Generating Ben Graham analysis")
-        graham_output = generate_graham_output(
-            ticker=ticker,
-            analysis_data=analysis_data,
-            state=state,
-        )
+    graham_outputs = generate_graham_outputs(
+        analysis_data=analysis_data,
+        state=state,
+    )
 
+    for ticker, graham_output in graham_outputs.items():
         graham_analysis[ticker] = {"signal": graham_output.signal, "confidence": graham_output.confidence, "reasoning": graham_output.reasoning}
 
         progress.update_status("ben_graham_agent", ticker, "Done", analysis=graham_output.reasoning)
@@ -84,11 +84,10 @@ def ben_graham_agent(state: AgentState):
         show_agent_reasoning(graham_analysis, "Ben Graham Agent")
 
     # Store signals in the overall state
-    state["data"]["analyst_signals"]["ben_graham_agent"] = graham_analysis
 
     progress.update_status("ben_graham_agent", None, "Done")
 
-    return {"messages": [message], "data": state["data"]}
+    return {"messages": agent_messages(state, message), "analyst_signals": {"ben_graham_agent": graham_analysis}}
 
 
 def analyze_earnings_stability(metrics: list, financial_line_items: list) -> dict:
@@ -276,13 +275,12 @@ def analyze_valuation_graham(financial_line_items: list, market_cap: float) -> d
     return {"score": score, "details": "; ".join(details)}
 
 
-def generate_graham_output(
-    ticker: str,
+def generate_graham_outputs(
     analysis_data: dict[str, any],
     state: AgentState,
-) -> BenGrahamSignal:
+) -> dict[str, BenGrahamSignal]:
     """
-    Generates an investment decision in the style of Benjamin Graham:
+    Generates investment decisions for every analyzed ticker in the style of Benjamin Graham:
     - Value emphasis, margin of safety, net-nets, conservative balance sheet, stable earnings.
     - Return the result in a JSON structure: { signal, confidence, reasoning }.
     """
@@ -330,15 +328,17 @@ def generate_graham_output(
         ]
     )
 
-    prompt = template.invoke({"analysis_data": json.dumps(analysis_data, indent=2), "ticker": ticker})
+    prompts = {ticker: template.invoke({"analysis_data": to_prompt_json({ticker: data}, prompt_budget(state, "ben_graham_agent")), "ticker": ticker}) for ticker, data in analysis_data.items()}
 
     def create_default_ben_graham_signal():
         return BenGrahamSignal(signal="中立", confidence=0.0, reasoning="Error in generating analysis; defaulting to neutral.")
 
-    return call_llm(
-        prompt=prompt,
+    return call_llm_for_tickers(
+        prompts=prompts,
+        analysis_data=analysis_data,
         pydantic_model=BenGrahamSignal,
         agent_name="ben_graham_agent",
         state=state,
         default_factory=create_default_ben_graham_signal,
+        status="Generating Ben Graham analysis",
     )
@@ -1,5 +1,5 @@
 from langchain_openai import ChatOpenAI
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from src.tools.api import get_financial_metrics, get_market_cap, search_line_items
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
@@ -7,7 +7,8 @@ from pydantic import BaseModel
 import json
 from typing_extensions import Literal
 from src.utils.progress import progress
-from src.utils.llm import call_llm
+from src.llm.prompt_budget import prompt_budget, to_prompt_json
+from src.utils.llm import call_llm_for_tickers
 
 
 class BillAckmanSignal(BaseModel):
@@ -96,13 +97,12 @@ def bill_ackman_agent(state: AgentState):
             "valuation_analysis": valuation_analysis
         }
         
-        progress.update_status("bill_ackman_agent", ticker, "Generating Bill Ackman analysis")
-        ackman_output = generate_ackman_output(
-            ticker=ticker, 
-            analysis_data=analysis_data,
-            state=state,
-        )
-        
+    ackman_outputs = generate_ackman_outputs(
+        analysis_data=analysis_data,
+        state=state,
+    )
+
+    for ticker, ackman_output in ackman_outputs.items():
         ackman_analysis[ticker] = {
             "signal": ackman_output.signal,
             "confidence": ackman_output.confidence,
@@ -121,15 +121,9 @@ def bill_ackman_agent(state: AgentState):
     if state["metadata"]["show_reasoning"]:
         show_agent_reasoning(ackman_analysis, "Bill Ackman Agent")
     
-    # Add signals to the overall state
-    state["data"]["analyst_signals"]["bill_ackman_agent"] = ackman_analysis
-
     progress.update_status("bill_ackman_agent", None, "Done")
 
-    return {
-        "messages": [message],
-        "data": state["data"]
-    }
+    return {"messages": agent_messages(state, message), "analyst_signals": {"bill_ackman_agent": ackman_analysis}}
 
 
 def analyze_business_quality(metrics: list, financial_line_items: list) -> dict:
@@ -394,11 +388,10 @@ def analyze_valuation(financial_line_items: list, market_cap: float) -> dict:
     }
 
 
-def generate_ackman_output(
-    ticker: str,
+def generate_ackman_outputs(
     analysis_data: dict[str, any],
     state: AgentState,
-) -> BillAckmanSignal:
+) -> dict[str, BillAckmanSignal]:
     """
     Generates investment decisions in the style of Bill Ackman.
     Includes more explicit references to brand strength, activism potential, 
@@ -444,10 +437,7 @@ def generate_ackman_output(
         )
     ])
 
-    prompt = template.invoke({
-        "analysis_data": json.dumps(analysis_data, indent=2),
-        "ticker": ticker
-    })
+    prompts = {ticker: template.invoke({"analysis_data": to_prompt_json({ticker: data}, prompt_budget(state, "bill_ackman_agent")), "ticker": ticker}) for ticker, data in analysis_data.items()}
 
     def create_default_bill_ackman_signal():
         return BillAckmanSignal(
@@ -456,10 +446,12 @@ def generate_ackman_output(
             reasoning="Error in analysis, defaulting to neutral"
         )
 
-    return call_llm(
-        prompt=prompt, 
+    return call_llm_for_tickers(
+        prompts=prompts,
+        analysis_data=analysis_data,
         pydantic_model=BillAckmanSignal, 
         agent_name="bill_ackman_agent", 
         state=state,
         default_factory=create_default_bill_ackman_signal,
+        status="Generating Bill Ackman analysis",
     )
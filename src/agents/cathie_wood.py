@@ -1,4 +1,4 @@
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from src.tools.api import get_financial_metrics, get_market_cap, search_line_items
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
@@ -6,7 +6,8 @@ from pydantic import BaseModel
 import json
 from typing_extensions import Literal
 from src.utils.progress import progress
-from src.utils.llm import call_llm
+from src.llm.prompt_budget import prompt_budget, to_prompt_json
+from src.utils.llm import call_llm_for_tickers
 
 
 class CathieWoodSignal(BaseModel):
@@ -82,13 +83,12 @@ def cathie_wood_agent(state: AgentState):
 
         analysis_data[ticker] = {"signal": signal, "score": total_score, "max_score": max_possible_score, "disruptive_analysis": disruptive_analysis, "innovation_analysis": innovation_analysis, "valuation_analysis": valuation_analysis}
 
-        progress.update_status("cathie_wood_agent", ticker, "Generating Cathie Wood analysis")
-        cw_output = generate_cathie_wood_output(
-            ticker=ticker,
-            analysis_data=analysis_data,
-            state=state,
-        )
+    cw_outputs = generate_cathie_wood_outputs(
+        analysis_data=analysis_data,
+        state=state,
+    )
 
+    for ticker, cw_output in cw_outputs.items():
         cw_analysis[ticker] = {"signal": cw_output.signal, "confidence": cw_output.confidence, "reasoning": cw_output.reasoning}
 
         progress.update_status("cathie_wood_agent", ticker, "Done", analysis=cw_output.reasoning)
@@ -98,11 +98,9 @@ def cathie_wood_agent(state: AgentState):
     if state["metadata"].get("show_reasoning"):
         show_agent_reasoning(cw_analysis, "Cathie Wood Agent")
 
-    state["data"]["analyst_signals"]["cathie_wood_agent"] = cw_analysis
-
     progress.update_status("cathie_wood_agent", None, "Done")
 
-    return {"messages": [message], "data": state["data"]}
+    return {"messages": agent_messages(state, message), "analyst_signals": {"cathie_wood_agent": cw_analysis}}
 
 
 def analyze_disruptive_potential(metrics: list, financial_line_items: list) -> dict:
@@ -357,11 +355,10 @@ def analyze_cathie_wood_valuation(financial_line_items: list, market_cap: float)
     return {"score": score, "details": "; ".join(details), "intrinsic_value": intrinsic_value, "margin_of_safety": margin_of_safety}
 
 
-def generate_cathie_wood_output(
-    ticker: str,
+def generate_cathie_wood_outputs(
     analysis_data: dict[str, any],
     state: AgentState,
-) -> CathieWoodSignal:
+) -> dict[str, CathieWoodSignal]:
     """
     Generates investment decisions in the style of Cathie Wood.
     """
@@ -415,17 +412,19 @@ def generate_cathie_wood_output(
         ]
     )
 
-    prompt = template.invoke({"analysis_data": json.dumps(analysis_data, indent=2), "ticker": ticker})
+    prompts = {ticker: template.invoke({"analysis_data": to_prompt_json({ticker: data}, prompt_budget(state, "cathie_wood_agent")), "ticker": ticker}) for ticker, data in analysis_data.items()}
 
     def create_default_cathie_wood_signal():
         return CathieWoodSignal(signal="中立", confidence=0.0, reasoning="Error in analysis, defaulting to neutral")
 
-    return call_llm(
-        prompt=prompt,
+    return call_llm_for_tickers(
+        prompts=prompts,
+        analysis_data=analysis_data,
         pydantic_model=CathieWoodSignal,
         agent_name="cathie_wood_agent",
         state=state,
         default_factory=create_default_cathie_wood_signal,
+        status="Generating Cathie Wood analysis",
     )
 
 
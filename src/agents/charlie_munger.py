@@ -1,12 +1,14 @@
-from src.graph.state import AgentState, show_agent_reasoning
-from src.tools.api import get_financial_metrics, get_market_cap, search_line_items, get_insider_trades, get_company_news
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
+from src.tools.api import get_financial_metrics, get_market_cap, search_line_items, get_insider_trades, get_company_news_counts
+from src.data.event_index import NewsCounts
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
 import json
 from typing_extensions import Literal
 from src.utils.progress import progress
-from src.utils.llm import call_llm
+from src.llm.prompt_budget import prompt_budget, to_prompt_json
+from src.utils.llm import call_llm_for_tickers
 
 class CharlieMungerSignal(BaseModel):
     signal: Literal["看涨", "看跌", "中立"]
@@ -69,7 +71,7 @@ def charlie_munger_agent(state: AgentState):
         
         progress.update_status("charlie_munger_agent", ticker, "Fetching company news")
         # Munger avoids businesses with frequent negative press
-        company_news = get_company_news(
+        news_counts = get_company_news_counts(
             ticker,
             end_date,
             # Look back 1 year for news
@@ -117,16 +119,15 @@ def charlie_munger_agent(state: AgentState):
             "predictability_analysis": predictability_analysis,
             "valuation_analysis": valuation_analysis,
             # Include some qualitative assessment from news
-            "news_sentiment": analyze_news_sentiment(company_news) if company_news else "No news data available"
+            "news_sentiment": analyze_news_sentiment(news_counts) if news_counts.total else "No news data available"
         }
         
-        progress.update_status("charlie_munger_agent", ticker, "Generating Charlie Munger analysis")
-        munger_output = generate_munger_output(
-            ticker=ticker, 
-            analysis_data=analysis_data,
-            state=state,
-        )
-        
+    munger_outputs = generate_munger_outputs(
+        analysis_data=analysis_data,
+        state=state,
+    )
+
+    for ticker, munger_output in munger_outputs.items():
         munger_analysis[ticker] = {
             "signal": munger_output.signal,
             "confidence": munger_output.confidence,
@@ -147,13 +148,7 @@ def charlie_munger_agent(state: AgentState):
 
     progress.update_status("charlie_munger_agent", None, "Done")
     
-    # Add signals to the overall state
-    state["data"]["analyst_signals"]["charlie_munger_agent"] = munger_analysis
-
-    return {
-        "messages": [message],
-        "data": state["data"]
-    }
+    return {"messages": agent_messages(state, message), "analyst_signals": {"charlie_munger_agent": munger_analysis}}
 
 
 def analyze_moat_strength(metrics: list, financial_line_items: list) -> dict:
@@ -661,23 +656,22 @@ def calculate_munger_valuation(financial_line_items: list, market_cap: float) ->
     }
 
 
-def analyze_news_sentiment(news_items: list) -> str:
+def analyze_news_sentiment(news: NewsCounts) -> str:
     """
     Simple qualitative analysis of recent news.
     Munger pays attention to significant news but doesn't overreact to short-term stories.
     """
-    if not news_items or len(news_items) == 0:
+    if not news.total:
         return "No news data available"
     
     # Just return a simple count for now - in a real implementation, this would use NLP
-    return f"Qualitative review of {len(news_items)} recent news items would be needed"
+    return f"Qualitative review of {news.total} recent news items would be needed"
 
 
-def generate_munger_output(
-    ticker: str,
+def generate_munger_outputs(
     analysis_data: dict[str, any],
     state: AgentState,
-) -> CharlieMungerSignal:
+) -> dict[str, CharlieMungerSignal]:
     """
     Generates investment decisions in the style of Charlie Munger.
     """
@@ -735,10 +729,7 @@ def generate_munger_output(
         )
     ])
 
-    prompt = template.invoke({
-        "analysis_data": json.dumps(analysis_data, indent=2),
-        "ticker": ticker
-    })
+    prompts = {ticker: template.invoke({"analysis_data": to_prompt_json({ticker: data}, prompt_budget(state, "charlie_munger_agent")), "ticker": ticker}) for ticker, data in analysis_data.items()}
 
     def create_default_charlie_munger_signal():
         return CharlieMungerSignal(
@@ -747,10 +738,12 @@ def generate_munger_output(
             reasoning="Error in analysis, defaulting to neutral"
         )
 
-    return call_llm(
-        prompt=prompt,
+    return call_llm_for_tickers(
+        prompts=prompts,
+        analysis_data=analysis_data,
         state=state,
         pydantic_model=CharlieMungerSignal, 
         agent_name="charlie_munger_agent", 
         default_factory=create_default_charlie_munger_signal,
+        status="Generating Charlie Munger analysis",
     )
\ No newline at end of file
@@ -1,5 +1,5 @@
 from langchain_core.messages import HumanMessage
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from src.utils.progress import progress
 import json
 
@@ -168,12 +168,6 @@ def fundamentals_analyst_agent(state: AgentState):
     if state["metadata"]["show_reasoning"]:
         show_agent_reasoning(fundamental_analysis, "Fundamental Analysis Agent")
 
-    # Add the signal to the analyst_signals list
-    state["data"]["analyst_signals"]["fundamentals_analyst_agent"] = fundamental_analysis
-
     progress.update_status("fundamentals_analyst_agent", None, "Done")
     
-    return {
-        "messages": [message],
-        "data": data,
-    }
+    return {"messages": agent_messages(state, message), "analyst_signals": {"fundamentals_analyst_agent": fundamental_analysis}}
@@ -4,19 +4,21 @@ from datetime import datetime, timedelta
 import json
 from typing_extensions import Literal
 
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from langchain_core.messages import HumanMessage
 from langchain_core.prompts import ChatPromptTemplate
 from pydantic import BaseModel
 
+from src.data.event_index import InsiderCounts, NewsCounts
 from src.tools.api import (
-    get_company_news,
+    get_company_news_counts,
     get_financial_metrics,
-    get_insider_trades,
+    get_insider_trade_counts,
     get_market_cap,
     search_line_items,
 )
-from src.utils.llm import call_llm
+from src.llm.prompt_budget import prompt_budget, to_prompt_json
+from src.utils.llm import call_llm_for_tickers
 from src.utils.progress import progress
 
 __all__ = [
@@ -79,10 +81,10 @@ def michael_burry_agent(state: AgentState):  # noqa: C901  (complexity is fine h
         )
 
         progress.update_status("michael_burry_agent", ticker, "Fetching insider trades")
-        insider_trades = get_insider_trades(ticker, end_date=end_date, start_date=start_date)
+        insider_counts = get_insider_trade_counts(ticker, end_date=end_date, start_date=start_date)
 
         progress.update_status("michael_burry_agent", ticker, "Fetching company news")
-        news = get_company_news(ticker, end_date=end_date, start_date=start_date, limit=250)
+        news_counts = get_company_news_counts(ticker, end_date=end_date, start_date=start_date, limit=250)
 
         progress.update_status("michael_burry_agent", ticker, "Fetching market cap")
         market_cap = get_market_cap(ticker, end_date)
@@ -97,10 +99,10 @@ def michael_burry_agent(state: AgentState):  # noqa: C901  (complexity is fine h
         balance_sheet_analysis = _analyze_balance_sheet(metrics, line_items)
 
         progress.update_status("michael_burry_agent", ticker, "Analyzing insider activity")
-        insider_analysis = _analyze_insider_activity(insider_trades)
+        insider_analysis = _analyze_insider_activity(insider_counts)
 
         progress.update_status("michael_burry_agent", ticker, "Analyzing contrarian sentiment")
-        contrarian_analysis = _analyze_contrarian_sentiment(news)
+        contrarian_analysis = _analyze_contrarian_sentiment(news_counts)
 
         # ------------------------------------------------------------------
         # Aggregate score & derive preliminary signal
@@ -139,13 +141,12 @@ def michael_burry_agent(state: AgentState):  # noqa: C901  (complexity is fine h
             "market_cap": market_cap,
         }
 
-        progress.update_status("michael_burry_agent", ticker, "Generating LLM output")
-        burry_output = _generate_burry_output(
-            ticker=ticker,
-            analysis_data=analysis_data,
-            state=state,
-        )
+    burry_outputs = _generate_burry_outputs(
+        analysis_data=analysis_data,
+        state=state,
+    )
 
+    for ticker, burry_output in burry_outputs.items():
         burry_analysis[ticker] = {
             "signal": burry_output.signal,
             "confidence": burry_output.confidence,
@@ -162,11 +163,9 @@ def michael_burry_agent(state: AgentState):  # noqa: C901  (complexity is fine h
     if state["metadata"].get("show_reasoning"):
         show_agent_reasoning(burry_analysis, "Michael Burry Agent")
 
-    state["data"]["analyst_signals"]["michael_burry_agent"] = burry_analysis
-
     progress.update_status("michael_burry_agent", None, "Done")
 
-    return {"messages": [message], "data": state["data"]}
+    return {"messages": agent_messages(state, message), "analyst_signals": {"michael_burry_agent": burry_analysis}}
 
 
 ###############################################################################
@@ -270,20 +269,19 @@ def _analyze_balance_sheet(metrics, line_items):
 
 # ----- Insider activity -----------------------------------------------------
 
-def _analyze_insider_activity(insider_trades):
+def _analyze_insider_activity(insider: InsiderCounts):
     """Net insider buying over the last 12 months acts as a hard catalyst."""
 
     max_score = 2
     score = 0
     details: list[str] = []
 
-    if not insider_trades:
+    if not insider.total:
         details.append("No insider trade data")
         return {"score": score, "max_score": max_score, "details": "; ".join(details)}
 
-    shares_bought = sum(t.transaction_shares or 0 for t in insider_trades if (t.transaction_shares or 0) > 0)
-    shares_sold = abs(sum(t.transaction_shares or 0 for t in insider_trades if (t.transaction_shares or 0) < 0))
-    net = shares_bought - shares_sold
+    net = insider.shares_bought - insider.shares_sold
+    shares_sold = insider.shares_sold
     if net > 0:
         score += 2 if net / max(shares_sold, 1) > 1 else 1
         details.append(f"Net insider buying of {net:,} shares")
@@ -295,22 +293,20 @@ def _analyze_insider_activity(insider_trades):
 
 # ----- Contrarian sentiment -------------------------------------------------
 
-def _analyze_contrarian_sentiment(news):
+def _analyze_contrarian_sentiment(news: NewsCounts):
     """Very rough gauge: a wall of recent negative headlines can be a *positive* for a contrarian."""
 
     max_score = 1
     score = 0
     details: list[str] = []
 
-    if not news:
+    if not news.total:
         details.append("No recent news")
         return {"score": score, "max_score": max_score, "details": "; ".join(details)}
 
     # Count negative sentiment articles
-    sentiment_negative_count = sum(
-        1 for n in news if n.sentiment and n.sentiment.lower() in ["negative", "看跌"]
-    )
-    
+    sentiment_negative_count = news.negative
+
     if sentiment_negative_count >= 5:
         score += 1  # The more hated, the better (assuming fundamentals hold up)
         details.append(f"{sentiment_negative_count} negative headlines (contrarian opportunity)")
@@ -324,12 +320,11 @@ def _analyze_contrarian_sentiment(news):
 # LLM generation
 ###############################################################################
 
-def _generate_burry_output(
-    ticker: str,
+def _generate_burry_outputs(
     analysis_data: dict,
     state: AgentState,
-) -> MichaelBurrySignal:
-    """Call the LLM to craft the final trading signal in Burry's voice."""
+) -> dict[str, MichaelBurrySignal]:
+    """Call the LLM to craft the final trading signal for each ticker in Burry's voice."""
 
     template = ChatPromptTemplate.from_messages(
         [
@@ -371,16 +366,18 @@ def _generate_burry_output(
         ]
     )
 
-    prompt = template.invoke({"analysis_data": json.dumps(analysis_data, indent=2), "ticker": ticker})
+    prompts = {ticker: template.invoke({"analysis_data": to_prompt_json({ticker: data}, prompt_budget(state, "michael_burry_agent")), "ticker": ticker}) for ticker, data in analysis_data.items()}
 
     # Default fallback signal in case parsing fails
     def create_default_michael_burry_signal():
         return MichaelBurrySignal(signal="中立", confidence=0.0, reasoning="Parsing error – defaulting to neutral")
 
-    return call_llm(
-        prompt=prompt,
+    return call_llm_for_tickers(
+        prompts=prompts,
+        analysis_data=analysis_data,
         pydantic_model=MichaelBurrySignal,
         agent_name="michael_burry_agent",
         state=state,
         default_factory=create_default_michael_burry_signal,
+        status="Generating LLM output",
     )
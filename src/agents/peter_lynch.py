@@ -1,19 +1,21 @@
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from src.tools.api import (
     get_financial_metrics,
     get_market_cap,
     search_line_items,
-    get_insider_trades,
-    get_company_news,
+    get_insider_trade_counts,
+    get_company_news_counts,
     get_prices,
 )
+from src.data.event_index import InsiderCounts, NewsCounts
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
 import json
 from typing_extensions import Literal
 from src.utils.progress import progress
-from src.utils.llm import call_llm
+from src.llm.prompt_budget import prompt_budget, to_prompt_json
+from src.utils.llm import call_llm_for_tickers
 
 
 class PeterLynchSignal(BaseModel):
@@ -79,10 +81,10 @@ def peter_lynch_agent(state: AgentState):
         market_cap = get_market_cap(ticker, end_date)
 
         progress.update_status("peter_lynch_agent", ticker, "Fetching insider trades")
-        insider_trades = get_insider_trades(ticker, end_date, start_date=None, limit=50)
+        insider_counts = get_insider_trade_counts(ticker, end_date, start_date=None, limit=50)
 
         progress.update_status("peter_lynch_agent", ticker, "Fetching company news")
-        company_news = get_company_news(ticker, end_date, start_date=None, limit=50)
+        news_counts = get_company_news_counts(ticker, end_date, start_date=None, limit=50)
 
         progress.update_status("peter_lynch_agent", ticker, "Fetching recent price data for reference")
         prices = get_prices(ticker, start_date=start_date, end_date=end_date)
@@ -98,10 +100,10 @@ def peter_lynch_agent(state: AgentState):
         valuation_analysis = analyze_lynch_valuation(financial_line_items, market_cap)
 
         progress.update_status("peter_lynch_agent", ticker, "Analyzing sentiment")
-        sentiment_analysis = analyze_sentiment(company_news)
+        sentiment_analysis = analyze_sentiment(news_counts)
 
         progress.update_status("peter_lynch_agent", ticker, "Analyzing insider activity")
-        insider_activity = analyze_insider_activity(insider_trades)
+        insider_activity = analyze_insider_activity(insider_counts)
 
         # Combine partial scores with weights typical for Peter Lynch:
         #   30% Growth, 25% Valuation, 20% Fundamentals,
@@ -135,13 +137,12 @@ def peter_lynch_agent(state: AgentState):
             "insider_activity": insider_activity,
         }
 
-        progress.update_status("peter_lynch_agent", ticker, "Generating Peter Lynch analysis")
-        lynch_output = generate_lynch_output(
-            ticker=ticker,
-            analysis_data=analysis_data[ticker],
-            state=state,
-        )
+    lynch_outputs = generate_lynch_outputs(
+        analysis_data=analysis_data,
+        state=state,
+    )
 
+    for ticker, lynch_output in lynch_outputs.items():
         lynch_analysis[ticker] = {
             "signal": lynch_output.signal,
             "confidence": lynch_output.confidence,
@@ -157,11 +158,10 @@ def peter_lynch_agent(state: AgentState):
         show_agent_reasoning(lynch_analysis, "Peter Lynch Agent")
 
     # Save signals to state
-    state["data"]["analyst_signals"]["peter_lynch_agent"] = lynch_analysis
 
     progress.update_status("peter_lynch_agent", None, "Done")
 
-    return {"messages": [message], "data": state["data"]}
+    return {"messages": agent_messages(state, message), "analyst_signals": {"peter_lynch_agent": lynch_analysis}}
 
 
 def analyze_lynch_growth(financial_line_items: list) -> dict:
@@ -361,29 +361,25 @@ def analyze_lynch_valuation(financial_line_items: list, market_cap: float | None
     return {"score": final_score, "details": "; ".join(details)}
 
 
-def analyze_sentiment(news_items: list) -> dict:
+def analyze_sentiment(news: NewsCounts) -> dict:
     """
     Basic news sentiment check. Negative headlines weigh on the final score.
     """
-    if not news_items:
+    if not news.total:
         return {"score": 5, "details": "No news data; default to neutral sentiment"}
 
-    negative_keywords = ["lawsuit", "fraud", "negative", "downturn", "decline", "investigation", "recall"]
-    negative_count = 0
-    for news in news_items:
-        title_lower = (news.title or "").lower()
-        if any(word in title_lower for word in negative_keywords):
-            negative_count += 1
+    # Headlines matching NEGATIVE_HEADLINE_KEYWORDS
+    negative_count = news.negative_headlines
 
     details = []
-    if negative_count > len(news_items) * 0.3:
+    if negative_count > news.total * 0.3:
         # More than 30% negative => somewhat bearish => 3/10
         score = 3
-        details.append(f"High proportion of negative headlines: {negative_count}/{len(news_items)}")
+        details.append(f"High proportion of negative headlines: {negative_count}/{news.total}")
     elif negative_count > 0:
         # Some negativity => 6/10
         score = 6
-        details.append(f"Some negative headlines: {negative_count}/{len(news_items)}")
+        details.append(f"Some negative headlines: {negative_count}/{news.total}")
     else:
         # Mostly positive => 8/10
         score = 8
@@ -392,7 +388,7 @@ def analyze_sentiment(news_items: list) -> dict:
     return {"score": score, "details": "; ".join(details)}
 
 
-def analyze_insider_activity(insider_trades: list) -> dict:
+def analyze_insider_activity(insider: InsiderCounts) -> dict:
     """
     Simple insider-trade analysis:
       - If there's heavy insider buying, it's a positive sign.
@@ -403,17 +399,11 @@ def analyze_insider_activity(insider_trades: list) -> dict:
     score = 5
     details = []
 
-    if not insider_trades:
+    if not insider.total:
         details.append("No insider trades data; defaulting to neutral")
         return {"score": score, "details": "; ".join(details)}
 
-    buys, sells = 0, 0
-    for trade in insider_trades:
-        if trade.transaction_shares is not None:
-            if trade.transaction_shares > 0:
-                buys += 1
-            elif trade.transaction_shares < 0:
-                sells += 1
+    buys, sells = insider.buys, insider.sells
 
     total = buys + sells
     if total == 0:
@@ -437,13 +427,12 @@ def analyze_insider_activity(insider_trades: list) -> dict:
     return {"score": score, "details": "; ".join(details)}
 
 
-def generate_lynch_output(
-    ticker: str,
+def generate_lynch_outputs(
     analysis_data: dict[str, any],
     state: AgentState,
-) -> PeterLynchSignal:
+) -> dict[str, PeterLynchSignal]:
     """
-    Generates a final JSON signal in Peter Lynch's voice & style.
+    Generates a final JSON signal per ticker in Peter Lynch's voice & style.
     """
     template = ChatPromptTemplate.from_messages(
         [
@@ -487,7 +476,7 @@ def generate_lynch_output(
         ]
     )
 
-    prompt = template.invoke({"analysis_data": json.dumps(analysis_data, indent=2), "ticker": ticker})
+    prompts = {ticker: template.invoke({"analysis_data": to_prompt_json(data, prompt_budget(state, "peter_lynch_agent")), "ticker": ticker}) for ticker, data in analysis_data.items()}
 
     def create_default_signal():
         return PeterLynchSignal(
@@ -496,10 +485,12 @@ def generate_lynch_output(
             reasoning="Error in analysis; defaulting to neutral"
         )
 
-    return call_llm(
-        prompt=prompt,
+    return call_llm_for_tickers(
+        prompts=prompts,
+        analysis_data=analysis_data,
         pydantic_model=PeterLynchSignal,
         agent_name="peter_lynch_agent",
         state=state,
         default_factory=create_default_signal,
+        status="Generating Peter Lynch analysis",
     )
@@ -1,18 +1,20 @@
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from src.tools.api import (
     get_financial_metrics,
     get_market_cap,
     search_line_items,
-    get_insider_trades,
-    get_company_news,
+    get_insider_trade_counts,
+    get_company_news_counts,
 )
+from src.data.event_index import InsiderCounts, NewsCounts
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
 import json
 from typing_extensions import Literal
 from src.utils.progress import progress
-from src.utils.llm import call_llm
+from src.llm.prompt_budget import prompt_budget, to_prompt_json
+from src.utils.llm import call_llm_for_tickers
 import statistics
 
 
@@ -77,10 +79,10 @@ def phil_fisher_agent(state: AgentState):
         market_cap = get_market_cap(ticker, end_date)
 
         progress.update_status("phil_fisher_agent", ticker, "Fetching insider trades")
-        insider_trades = get_insider_trades(ticker, end_date, start_date=None, limit=50)
+        insider_counts = get_insider_trade_counts(ticker, end_date, start_date=None, limit=50)
 
         progress.update_status("phil_fisher_agent", ticker, "Fetching company news")
-        company_news = get_company_news(ticker, end_date, start_date=None, limit=50)
+        news_counts = get_company_news_counts(ticker, end_date, start_date=None, limit=50)
 
         progress.update_status("phil_fisher_agent", ticker, "Analyzing growth & quality")
         growth_quality = analyze_fisher_growth_quality(financial_line_items)
@@ -95,10 +97,10 @@ def phil_fisher_agent(state: AgentState):
         fisher_valuation = analyze_fisher_valuation(financial_line_items, market_cap)
 
         progress.update_status("phil_fisher_agent", ticker, "Analyzing insider activity")
-        insider_activity = analyze_insider_activity(insider_trades)
+        insider_activity = analyze_insider_activity(insider_counts)
 
         progress.update_status("phil_fisher_agent", ticker, "Analyzing sentiment")
-        sentiment_analysis = analyze_sentiment(company_news)
+        sentiment_analysis = analyze_sentiment(news_counts)
 
         # Combine partial scores with weights typical for Fisher:
         #   30% Growth & Quality
@@ -138,13 +140,12 @@ def phil_fisher_agent(state: AgentState):
             "sentiment_analysis": sentiment_analysis,
         }
 
-        progress.update_status("phil_fisher_agent", ticker, "Generating Phil Fisher-style analysis")
-        fisher_output = generate_fisher_output(
-            ticker=ticker,
-            analysis_data=analysis_data,
-            state=state,
-        )
+    fisher_outputs = generate_fisher_outputs(
+        analysis_data=analysis_data,
+        state=state,
+    )
 
+    for ticker, fisher_output in fisher_outputs.items():
         fisher_analysis[ticker] = {
             "signal": fisher_output.signal,
             "confidence": fisher_output.confidence,
@@ -159,11 +160,9 @@ def phil_fisher_agent(state: AgentState):
     if state["metadata"].get("show_reasoning"):
         show_agent_reasoning(fisher_analysis, "Phil Fisher Agent")
 
-    state["data"]["analyst_signals"]["phil_fisher_agent"] = fisher_analysis
-
     progress.update_status("phil_fisher_agent", None, "Done")
     
-    return {"messages": [message], "data": state["data"]}
+    return {"messages": agent_messages(state, message), "analyst_signals": {"phil_fisher_agent": fisher_analysis}}
 
 
 def analyze_fisher_growth_quality(financial_line_items: list) -> dict:
@@ -456,7 +455,7 @@ def analyze_fisher_valuation(financial_line_items: list, market_cap: float | Non
     return {"score": final_score, "details": "; ".join(details)}
 
 
-def analyze_insider_activity(insider_trades: list) -> dict:
+def analyze_insider_activity(insider: InsiderCounts) -> dict:
     """
     Simple insider-trade analysis:
       - If there's heavy insider buying, we nudge the score up.
@@ -467,17 +466,11 @@ def analyze_insider_activity(insider_trades: list) -> dict:
     score = 5
     details = []
 
-    if not insider_trades:
+    if not insider.total:
         details.append("No insider trades data; defaulting to neutral")
         return {"score": score, "details": "; ".join(details)}
 
-    buys, sells = 0, 0
-    for trade in insider_trades:
-        if trade.transaction_shares is not None:
-            if trade.transaction_shares > 0:
-                buys += 1
-            elif trade.transaction_shares < 0:
-                sells += 1
+    buys, sells = insider.buys, insider.sells
 
     total = buys + sells
     if total == 0:
@@ -498,27 +491,23 @@ def analyze_insider_activity(insider_trades: list) -> dict:
     return {"score": score, "details": "; ".join(details)}
 
 
-def analyze_sentiment(news_items: list) -> dict:
+def analyze_sentiment(news: NewsCounts) -> dict:
     """
     Basic news sentiment: negative keyword check vs. overall volume.
     """
-    if not news_items:
+    if not news.total:
         return {"score": 5, "details": "No news data; defaulting to neutral sentiment"}
 
-    negative_keywords = ["lawsuit", "fraud", "negative", "downturn", "decline", "investigation", "recall"]
-    negative_count = 0
-    for news in news_items:
-        title_lower = (news.title or "").lower()
-        if any(word in title_lower for word in negative_keywords):
-            negative_count += 1
+    # Headlines matching NEGATIVE_HEADLINE_KEYWORDS
+    negative_count = news.negative_headlines
 
     details = []
-    if negative_count > len(news_items) * 0.3:
+    if negative_count > news.total * 0.3:
         score = 3
-        details.append(f"High proportion of negative headlines: {negative_count}/{len(news_items)}")
+        details.append(f"High proportion of negative headlines: {negative_count}/{news.total}")
     elif negative_count > 0:
         score = 6
-        details.append(f"Some negative headlines: {negative_count}/{len(news_items)}")
+        details.append(f"Some negative headlines: {negative_count}/{news.total}")
     else:
         score = 8
         details.append("Mostly positive/neutral headlines")
@@ -526,13 +515,12 @@ def analyze_sentiment(news_items: list) -> dict:
     return {"score": score, "details": "; ".join(details)}
 
 
-def generate_fisher_output(
-    ticker: str,
+def generate_fisher_outputs(
     analysis_data: dict[str, any],
     state: AgentState,
-) -> PhilFisherSignal:
+) -> dict[str, PhilFisherSignal]:
     """
-    Generates a JSON signal in the style of Phil Fisher.
+    Generates a JSON signal per ticker in the style of Phil Fisher.
     """
     template = ChatPromptTemplate.from_messages(
         [
@@ -582,7 +570,7 @@ def generate_fisher_output(
         ]
     )
 
-    prompt = template.invoke({"analysis_data": json.dumps(analysis_data, indent=2), "ticker": ticker})
+    prompts = {ticker: template.invoke({"analysis_data": to_prompt_json({ticker: data}, prompt_budget(state, "phil_fisher_agent")), "ticker": ticker}) for ticker, data in analysis_data.items()}
 
     def create_default_signal():
         return PhilFisherSignal(
@@ -591,10 +579,12 @@ def generate_fisher_output(
             reasoning="Error in analysis, defaulting to neutral"
         )
 
-    return call_llm(
-        prompt=prompt,
+    return call_llm_for_tickers(
+        prompts=prompts,
+        analysis_data=analysis_data,
         pydantic_model=PhilFisherSignal,
         state=state,
         agent_name="phil_fisher_agent",
         default_factory=create_default_signal,
+        status="Generating Phil Fisher-style analysis",
     )
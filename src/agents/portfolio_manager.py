@@ -6,6 +6,7 @@ from src.graph.state import AgentState, show_agent_reasoning
 from pydantic import BaseModel, Field
 from typing_extensions import Literal
 from src.utils.progress import progress
+from src.llm.prompt_budget import to_prompt_json
 from src.utils.llm import call_llm
 
 
@@ -26,7 +27,7 @@ def portfolio_management_agent(state: AgentState):
 
     # Get the portfolio and analyst signals
     portfolio = state["data"]["portfolio"]
-    analyst_signals = state["data"]["analyst_signals"]
+    analyst_signals = state.get("analyst_signals", {})
     tickers = state["data"]["tickers"]
 
     # Get position limits, current prices, and signals for every ticker
@@ -34,6 +35,7 @@ def portfolio_management_agent(state: AgentState):
     current_prices = {}
     max_shares = {}
     signals_by_ticker = {}
+    missing_signals = {}
     for ticker in tickers:
         progress.update_status("portfolio_manager", ticker, "Processing analyst signals")
 
@@ -51,7 +53,12 @@ def portfolio_management_agent(state: AgentState):
         # Get signals for the ticker
         ticker_signals = {}
         for agent, signals in analyst_signals.items():
-            if agent != "risk_management_agent" and ticker in signals:
+            if agent == "risk_management_agent" or ticker not in signals:
+                continue
+            if signals[ticker].get("missing"):
+                # The analyst missed its deadline (see src/graph/deadlines.py)
+                missing_signals.setdefault(ticker, []).append(agent)
+            else:
                 ticker_signals[agent] = {"signal": signals[ticker]["signal"], "confidence": signals[ticker]["confidence"]}
         signals_by_ticker[ticker] = ticker_signals
 
@@ -61,6 +68,7 @@ def portfolio_management_agent(state: AgentState):
     result = generate_trading_decision(
         tickers=tickers,
         signals_by_ticker=signals_by_ticker,
+        missing_signals=missing_signals,
         current_prices=current_prices,
         max_shares=max_shares,
         portfolio=portfolio,
@@ -79,15 +87,13 @@ def portfolio_management_agent(state: AgentState):
 
     progress.update_status("portfolio_manager", None, "Done")
 
-    return {
-        "messages": state["messages"] + [message],
-        "data": state["data"],
-    }
+    return {"messages": [message]}
 
 
 def generate_trading_decision(
     tickers: list[str],
     signals_by_ticker: dict[str, dict],
+    missing_signals: dict[str, list[str]],
     current_prices: dict[str, float],
     max_shares: dict[str, int],
     portfolio: dict[str, float],
@@ -127,6 +133,7 @@ def generate_trading_decision(
 
               Inputs:
               - signals_by_ticker: dictionary of ticker → signals
+              - missing_signals: dictionary of ticker → analysts whose signals are missing (they did not finish in time); base the decision on the available signals and lower your confidence when many are missing
               - max_shares: maximum shares allowed per ticker
               - portfolio_cash: current cash in portfolio
               - portfolio_positions: current positions (both long and short)
@@ -142,6 +149,9 @@ def generate_trading_decision(
               Here are the signals by ticker:
               {signals_by_ticker}
 
+              Missing Signals:
+              {missing_signals}
+
               Current Prices:
               {current_prices}
 
@@ -176,7 +186,8 @@ def generate_trading_decision(
     # Generate the prompt
     prompt = template.invoke(
         {
-            "signals_by_ticker": json.dumps(signals_by_ticker, indent=2),
+            "signals_by_ticker": to_prompt_json(signals_by_ticker),
+            "missing_signals": json.dumps(missing_signals, ensure_ascii=False) if missing_signals else "None",
             "current_prices": json.dumps(current_prices, indent=2),
             "max_shares": json.dumps(max_shares, indent=2),
             "portfolio_cash": f"{portfolio.get('cash', 0):.2f}",
@@ -1,11 +1,13 @@
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
 import json
 from typing_extensions import Literal
 from src.tools.api import get_financial_metrics, get_market_cap, search_line_items
-from src.utils.llm import call_llm
+from src.utils.dcf import dcf_value
+from src.llm.prompt_budget import prompt_budget, to_prompt_json
+from src.utils.llm import call_llm_for_tickers
 from src.utils.progress import progress
 
 class RakeshJhunjhunwalaSignal(BaseModel):
@@ -132,14 +134,13 @@ def rakesh_jhunjhunwala_agent(state: AgentState):
             "market_cap": market_cap,
         }
 
-        # ─── LLM: craft Jhunjhunwala‑style narrative ──────────────────────────────
-        progress.update_status("rakesh_jhunjhunwala_agent", ticker, "Generating Jhunjhunwala analysis")
-        jhunjhunwala_output = generate_jhunjhunwala_output(
-            ticker=ticker,
-            analysis_data=analysis_data[ticker],
-            state=state,
-        )
+    # ─── LLM: craft Jhunjhunwala‑style narrative ──────────────────────────────
+    jhunjhunwala_outputs = generate_jhunjhunwala_outputs(
+        analysis_data=analysis_data,
+        state=state,
+    )
 
+    for ticker, jhunjhunwala_output in jhunjhunwala_outputs.items():
         jhunjhunwala_analysis[ticker] = jhunjhunwala_output.model_dump()
 
         progress.update_status("rakesh_jhunjhunwala_agent", ticker, "Done", analysis=jhunjhunwala_output.reasoning)
@@ -150,10 +151,9 @@ def rakesh_jhunjhunwala_agent(state: AgentState):
     if state["metadata"]["show_reasoning"]:
         show_agent_reasoning(jhunjhunwala_analysis, "Rakesh Jhunjhunwala Agent")
 
-    state["data"]["analyst_signals"]["rakesh_jhunjhunwala_agent"] = jhunjhunwala_analysis
     progress.update_status("rakesh_jhunjhunwala_agent", None, "Done")
 
-    return {"messages": [message], "data": state["data"]}
+    return {"messages": agent_messages(state, message), "analyst_signals": {"rakesh_jhunjhunwala_agent": jhunjhunwala_analysis}}
 
 
 def analyze_profitability(financial_line_items: list) -> dict[str, any]:
@@ -552,22 +552,14 @@ def calculate_intrinsic_value(financial_line_items: list, market_cap: float) ->
             discount_rate = 0.18  # 18% for riskier companies
             terminal_multiple = 12
         
-        # Simple DCF with terminal value
-        current_earnings = latest.net_income
-        terminal_value = 0
-        dcf_value = 0
-        
-        # Project 5 years of earnings
-        for year in range(1, 6):
-            projected_earnings = current_earnings * ((1 + sustainable_growth) ** year)
-            present_value = projected_earnings / ((1 + discount_rate) ** year)
-            dcf_value += present_value
-        
-        # Terminal value (year 5 earnings * terminal multiple)
-        year_5_earnings = current_earnings * ((1 + sustainable_growth) ** 5)
-        terminal_value = (year_5_earnings * terminal_multiple) / ((1 + discount_rate) ** 5)
-        
-        total_intrinsic_value = dcf_value + terminal_value
+        # Simple DCF: 5 years of earnings plus year 5 earnings * terminal multiple
+        total_intrinsic_value = float(dcf_value(
+            latest.net_income,
+            sustainable_growth,
+            discount_rate,
+            num_years=5,
+            terminal_multiple=terminal_multiple,
+        ))
         
         return total_intrinsic_value
         
@@ -638,12 +630,11 @@ def analyze_rakesh_jhunjhunwala_style(
 # ────────────────────────────────────────────────────────────────────────────────
 # LLM generation
 # ────────────────────────────────────────────────────────────────────────────────
-def generate_jhunjhunwala_output(
-    ticker: str,
+def generate_jhunjhunwala_outputs(
     analysis_data: dict[str, any],
     state: AgentState,
-) -> RakeshJhunjhunwalaSignal:
-    """Get investment decision from LLM with Jhunjhunwala's principles"""
+) -> dict[str, RakeshJhunjhunwalaSignal]:
+    """Get investment decisions from LLM with Jhunjhunwala's principles"""
     template = ChatPromptTemplate.from_messages(
         [
             (
@@ -689,16 +680,18 @@ def generate_jhunjhunwala_output(
         ]
     )
 
-    prompt = template.invoke({"analysis_data": json.dumps(analysis_data, indent=2), "ticker": ticker})
+    prompts = {ticker: template.invoke({"analysis_data": to_prompt_json(data, prompt_budget(state, "rakesh_jhunjhunwala_agent")), "ticker": ticker}) for ticker, data in analysis_data.items()}
 
     # Default fallback signal in case parsing fails
     def create_default_rakesh_jhunjhunwala_signal():
         return RakeshJhunjhunwalaSignal(signal="中立", confidence=0.0, reasoning="Error in analysis, defaulting to neutral")
 
-    return call_llm(
-        prompt=prompt,
+    return call_llm_for_tickers(
+        prompts=prompts,
+        analysis_data=analysis_data,
         pydantic_model=RakeshJhunjhunwalaSignal,
         state=state,
         agent_name="rakesh_jhunjhunwala_agent",
         default_factory=create_default_rakesh_jhunjhunwala_signal,
+        status="Generating Jhunjhunwala analysis",
     )
\ No newline at end of file
@@ -1,5 +1,5 @@
 from langchain_core.messages import HumanMessage
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from src.utils.progress import progress
 from src.tools.api import get_prices, prices_to_df
 import json
@@ -107,10 +107,4 @@ def risk_management_agent(state: AgentState):
     if state["metadata"]["show_reasoning"]:
         show_agent_reasoning(risk_analysis, "Risk Management Agent")
 
-    # Add the signal to the analyst_signals list
-    state["data"]["analyst_signals"]["risk_management_agent"] = risk_analysis
-
-    return {
-        "messages": state["messages"] + [message],
-        "data": data,
-    }
+    return {"messages": agent_messages(state, message), "analyst_signals": {"risk_management_agent": risk_analysis}}
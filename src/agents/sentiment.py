@@ -1,11 +1,9 @@
 from langchain_core.messages import HumanMessage
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from src.utils.progress import progress
-import pandas as pd
-import numpy as np
 import json
 
-from src.tools.api import get_insider_trades, get_company_news
+from src.tools.api import get_insider_trade_counts, get_company_news_counts
 
 
 ##### Sentiment Agent #####
@@ -21,8 +19,8 @@ def sentiment_analyst_agent(state: AgentState):
     for ticker in tickers:
         progress.update_status("sentiment_analyst_agent", ticker, "Fetching insider trades")
 
-        # Get the insider trades
-        insider_trades = get_insider_trades(
+        # Aggregate the insider trades
+        insider = get_insider_trade_counts(
             ticker=ticker,
             end_date=end_date,
             limit=1000,
@@ -30,44 +28,35 @@ def sentiment_analyst_agent(state: AgentState):
 
         progress.update_status("sentiment_analyst_agent", ticker, "Analyzing trading patterns")
 
-        # Get the signals from the insider trades
-        transaction_shares = pd.Series([t.transaction_shares for t in insider_trades]).dropna()
-        insider_signals = np.where(transaction_shares < 0, "看跌", "看涨").tolist()
+        # Trades with reported shares: selling is bearish, everything else bullish
+        insider_bearish = insider.sells
+        insider_bullish = insider.with_shares - insider.sells
 
         progress.update_status("sentiment_analyst_agent", ticker, "Fetching company news")
 
-        # Get the company news
-        company_news = get_company_news(ticker, end_date, limit=100)
+        # Aggregate the company news sentiment
+        news = get_company_news_counts(ticker, end_date, limit=100)
+        news_bullish = news.positive
+        news_bearish = news.negative
 
-        # Get the sentiment from the company news
-        sentiment = pd.Series([n.sentiment for n in company_news]).dropna()
-        news_signals = np.where(sentiment == "negative", "看跌",
-                            np.where(sentiment == "positive", "看涨", "中立")).tolist()
-        
         progress.update_status("sentiment_analyst_agent", ticker, "Combining signals")
         # Combine signals from both sources with weights
         insider_weight = 0.3
         news_weight = 0.7
-        
+
         # Calculate weighted signal counts
-        bullish_signals = (
-        insider_signals.count("看涨") * insider_weight +
-        news_signals.count("看涨") * news_weight
-    )
-    bearish_signals = (
-        insider_signals.count("看跌") * insider_weight +
-        news_signals.count("看跌") * news_weight
-    )
+        bullish_signals = insider_bullish * insider_weight + news_bullish * news_weight
+        bearish_signals = insider_bearish * insider_weight + news_bearish * news_weight
 
-    if bullish_signals > bearish_signals:
-        overall_signal = "看涨"
-    elif bearish_signals > bullish_signals:
-        overall_signal = "看跌"
-    else:
-        overall_signal = "中立"
+        if bullish_signals > bearish_signals:
+            overall_signal = "看涨"
+        elif bearish_signals > bullish_signals:
+            overall_signal = "看跌"
+        else:
+            overall_signal = "中立"
 
         # Calculate confidence level based on the weighted proportion
-        total_weighted_signals = len(insider_signals) * insider_weight + len(news_signals) * news_weight
+        total_weighted_signals = insider.with_shares * insider_weight + news.labelled * news_weight
         confidence = 0  # Default confidence when there are no signals
         if total_weighted_signals > 0:
             confidence = round((max(bullish_signals, bearish_signals) / total_weighted_signals) * 100, 2)
@@ -75,30 +64,30 @@ def sentiment_analyst_agent(state: AgentState):
         # Create structured reasoning similar to technical analysis
         reasoning = {
             "insider_trading": {
-                "signal": "bullish" if insider_signals.count("bullish") > insider_signals.count("bearish") else
-                         "bearish" if insider_signals.count("bearish") > insider_signals.count("bullish") else "neutral",
-                "confidence": round((max(insider_signals.count("bullish"), insider_signals.count("bearish")) / max(len(insider_signals), 1)) * 100),
+                "signal": "bullish" if insider_bullish > insider_bearish else
+                         "bearish" if insider_bearish > insider_bullish else "neutral",
+                "confidence": round((max(insider_bullish, insider_bearish) / max(insider.with_shares, 1)) * 100),
                 "metrics": {
-                    "total_trades": len(insider_signals),
-                    "bullish_trades": insider_signals.count("bullish"),
-                    "bearish_trades": insider_signals.count("bearish"),
+                    "total_trades": insider.with_shares,
+                    "bullish_trades": insider_bullish,
+                    "bearish_trades": insider_bearish,
                     "weight": insider_weight,
-                    "weighted_bullish": round(insider_signals.count("bullish") * insider_weight, 1),
-                    "weighted_bearish": round(insider_signals.count("bearish") * insider_weight, 1),
+                    "weighted_bullish": round(insider_bullish * insider_weight, 1),
+                    "weighted_bearish": round(insider_bearish * insider_weight, 1),
                 }
             },
             "news_sentiment": {
-                "signal": "bullish" if news_signals.count("bullish") > news_signals.count("bearish") else
-                         "bearish" if news_signals.count("bearish") > news_signals.count("bullish") else "neutral",
-                "confidence": round((max(news_signals.count("bullish"), news_signals.count("bearish")) / max(len(news_signals), 1)) * 100),
+                "signal": "bullish" if news_bullish > news_bearish else
+                         "bearish" if news_bearish > news_bullish else "neutral",
+                "confidence": round((max(news_bullish, news_bearish) / max(news.labelled, 1)) * 100),
                 "metrics": {
-                    "total_articles": len(news_signals),
-                    "bullish_articles": news_signals.count("bullish"),
-                    "bearish_articles": news_signals.count("bearish"),
-                    "neutral_articles": news_signals.count("neutral"),
+                    "total_articles": news.labelled,
+                    "bullish_articles": news_bullish,
+                    "bearish_articles": news_bearish,
+                    "neutral_articles": news.neutral,
                     "weight": news_weight,
-                    "weighted_bullish": round(news_signals.count("bullish") * news_weight, 1),
-                    "weighted_bearish": round(news_signals.count("bearish") * news_weight, 1),
+                    "weighted_bullish": round(news_bullish * news_weight, 1),
+                    "weighted_bearish": round(news_bearish * news_weight, 1),
                 }
             },
             "combined_analysis": {
@@ -126,12 +115,6 @@ def sentiment_analyst_agent(state: AgentState):
     if state["metadata"]["show_reasoning"]:
         show_agent_reasoning(sentiment_analysis, "Sentiment Analysis Agent")
 
-    # Add the signal to the analyst_signals list
-    state["data"]["analyst_signals"]["sentiment_agent"] = sentiment_analysis
-
     progress.update_status("sentiment_analyst_agent", None, "Done")
 
-    return {
-        "messages": [message],
-        "data": data,
-    }
+    return {"messages": agent_messages(state, message), "analyst_signals": {"sentiment_agent": sentiment_analysis}}
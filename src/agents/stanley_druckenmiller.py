@@ -1,19 +1,21 @@
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from src.tools.api import (
     get_financial_metrics,
     get_market_cap,
     search_line_items,
-    get_insider_trades,
-    get_company_news,
+    get_insider_trade_counts,
+    get_company_news_counts,
     get_prices,
 )
+from src.data.event_index import InsiderCounts, NewsCounts
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
 import json
 from typing_extensions import Literal
 from src.utils.progress import progress
-from src.utils.llm import call_llm
+from src.llm.prompt_budget import prompt_budget, to_prompt_json
+from src.utils.llm import call_llm_for_tickers
 import statistics
 
 
@@ -78,10 +80,10 @@ def stanley_druckenmiller_agent(state: AgentState):
         market_cap = get_market_cap(ticker, end_date)
 
         progress.update_status("stanley_druckenmiller_agent", ticker, "Fetching insider trades")
-        insider_trades = get_insider_trades(ticker, end_date, start_date=None, limit=50)
+        insider_counts = get_insider_trade_counts(ticker, end_date, start_date=None, limit=50)
 
         progress.update_status("stanley_druckenmiller_agent", ticker, "Fetching company news")
-        company_news = get_company_news(ticker, end_date, start_date=None, limit=50)
+        news_counts = get_company_news_counts(ticker, end_date, start_date=None, limit=50)
 
         progress.update_status("stanley_druckenmiller_agent", ticker, "Fetching recent price data for momentum")
         prices = get_prices(ticker, start_date=start_date, end_date=end_date)
@@ -90,10 +92,10 @@ def stanley_druckenmiller_agent(state: AgentState):
         growth_momentum_analysis = analyze_growth_and_momentum(financial_line_items, prices)
 
         progress.update_status("stanley_druckenmiller_agent", ticker, "Analyzing sentiment")
-        sentiment_analysis = analyze_sentiment(company_news)
+        sentiment_analysis = analyze_sentiment(news_counts)
 
         progress.update_status("stanley_druckenmiller_agent", ticker, "Analyzing insider activity")
-        insider_activity = analyze_insider_activity(insider_trades)
+        insider_activity = analyze_insider_activity(insider_counts)
 
         progress.update_status("stanley_druckenmiller_agent", ticker, "Analyzing risk-reward")
         risk_reward_analysis = analyze_risk_reward(financial_line_items, prices)
@@ -133,13 +135,12 @@ def stanley_druckenmiller_agent(state: AgentState):
             "valuation_analysis": valuation_analysis,
         }
 
-        progress.update_status("stanley_druckenmiller_agent", ticker, "Generating Stanley Druckenmiller analysis")
-        druck_output = generate_druckenmiller_output(
-            ticker=ticker,
-            analysis_data=analysis_data,
-            state=state,
-        )
+    druck_outputs = generate_druckenmiller_outputs(
+        analysis_data=analysis_data,
+        state=state,
+    )
 
+    for ticker, druck_output in druck_outputs.items():
         druck_analysis[ticker] = {
             "signal": druck_output.signal,
             "confidence": druck_output.confidence,
@@ -154,11 +155,9 @@ def stanley_druckenmiller_agent(state: AgentState):
     if state["metadata"].get("show_reasoning"):
         show_agent_reasoning(druck_analysis, "Stanley Druckenmiller Agent")
 
-    state["data"]["analyst_signals"]["stanley_druckenmiller_agent"] = druck_analysis
-
     progress.update_status("stanley_druckenmiller_agent", None, "Done")
     
-    return {"messages": [message], "data": state["data"]}
+    return {"messages": agent_messages(state, message), "analyst_signals": {"stanley_druckenmiller_agent": druck_analysis}}
 
 
 def analyze_growth_and_momentum(financial_line_items: list, prices: list) -> dict:
@@ -264,7 +263,7 @@ def analyze_growth_and_momentum(financial_line_items: list, prices: list) -> dic
     return {"score": final_score, "details": "; ".join(details)}
 
 
-def analyze_insider_activity(insider_trades: list) -> dict:
+def analyze_insider_activity(insider: InsiderCounts) -> dict:
     """
     Simple insider-trade analysis:
       - If there's heavy insider buying, we nudge the score up.
@@ -275,19 +274,11 @@ def analyze_insider_activity(insider_trades: list) -> dict:
     score = 5
     details = []
 
-    if not insider_trades:
+    if not insider.total:
         details.append("No insider trades data; defaulting to neutral")
         return {"score": score, "details": "; ".join(details)}
 
-    buys, sells = 0, 0
-    for trade in insider_trades:
-        # Use transaction_shares to determine if it's a buy or sell
-        # Negative shares = sell, positive shares = buy
-        if trade.transaction_shares is not None:
-            if trade.transaction_shares > 0:
-                buys += 1
-            elif trade.transaction_shares < 0:
-                sells += 1
+    buys, sells = insider.buys, insider.sells
 
     total = buys + sells
     if total == 0:
@@ -311,29 +302,25 @@ def analyze_insider_activity(insider_trades: list) -> dict:
     return {"score": score, "details": "; ".join(details)}
 
 
-def analyze_sentiment(news_items: list) -> dict:
+def analyze_sentiment(news: NewsCounts) -> dict:
     """
     Basic news sentiment: negative keyword check vs. overall volume.
     """
-    if not news_items:
+    if not news.total:
         return {"score": 5, "details": "No news data; defaulting to neutral sentiment"}
 
-    negative_keywords = ["lawsuit", "fraud", "negative", "downturn", "decline", "investigation", "recall"]
-    negative_count = 0
-    for news in news_items:
-        title_lower = (news.title or "").lower()
-        if any(word in title_lower for word in negative_keywords):
-            negative_count += 1
+    # Headlines matching NEGATIVE_HEADLINE_KEYWORDS
+    negative_count = news.negative_headlines
 
     details = []
-    if negative_count > len(news_items) * 0.3:
+    if negative_count > news.total * 0.3:
         # More than 30% negative => somewhat bearish => 3/10
         score = 3
-        details.append(f"High proportion of negative headlines: {negative_count}/{len(news_items)}")
+        details.append(f"High proportion of negative headlines: {negative_count}/{news.total}")
     elif negative_count > 0:
         # Some negativity => 6/10
         score = 6
-        details.append(f"Some negative headlines: {negative_count}/{len(news_items)}")
+        details.append(f"Some negative headlines: {negative_count}/{news.total}")
     else:
         # Mostly positive => 8/10
         score = 8
@@ -520,13 +507,12 @@ def analyze_druckenmiller_valuation(financial_line_items: list, market_cap: floa
     return {"score": final_score, "details": "; ".join(details)}
 
 
-def generate_druckenmiller_output(
-    ticker: str,
+def generate_druckenmiller_outputs(
     analysis_data: dict[str, any],
     state: AgentState,
-) -> StanleyDruckenmillerSignal:
+) -> dict[str, StanleyDruckenmillerSignal]:
     """
-    Generates a JSON signal in the style of Stanley Druckenmiller.
+    Generates a JSON signal per ticker in the style of Stanley Druckenmiller.
     """
     template = ChatPromptTemplate.from_messages(
         [
@@ -577,7 +563,7 @@ def generate_druckenmiller_output(
         ]
     )
 
-    prompt = template.invoke({"analysis_data": json.dumps(analysis_data, indent=2), "ticker": ticker})
+    prompts = {ticker: template.invoke({"analysis_data": to_prompt_json({ticker: data}, prompt_budget(state, "stanley_druckenmiller_agent")), "ticker": ticker}) for ticker, data in analysis_data.items()}
 
     def create_default_signal():
         return StanleyDruckenmillerSignal(
@@ -586,10 +572,12 @@ def generate_druckenmiller_output(
             reasoning="Error in analysis, defaulting to neutral"
         )
 
-    return call_llm(
-        prompt=prompt,
+    return call_llm_for_tickers(
+        prompts=prompts,
+        analysis_data=analysis_data,
         pydantic_model=StanleyDruckenmillerSignal,
         agent_name="stanley_druckenmiller_agent",
         state=state,
         default_factory=create_default_signal,
+        status="Generating Stanley Druckenmiller analysis",
     )
@@ -1,14 +1,13 @@
-import math
-
 from langchain_core.messages import HumanMessage
 
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 
 import json
 import pandas as pd
 import numpy as np
 
-from src.tools.api import get_prices, prices_to_df
+from src.tools.api import get_prices, prices_to_df, prices_to_matrix
+from src.utils.indicators import IndicatorSet, compute_indicators_from_df
 from src.utils.progress import progress
 
 
@@ -31,6 +30,19 @@ def safe_float(value, default=0.0):
         return default
 
 
+# Strategy weights for the ensemble signal
+STRATEGY_WEIGHTS = {
+    "trend": 0.25,
+    "mean_reversion": 0.20,
+    "momentum": 0.25,
+    "volatility": 0.15,
+    "stat_arb": 0.15,
+}
+
+# Index with direction + 1 (-1 bearish, 0 neutral, 1 bullish)
+SIGNAL_LABELS = np.array(["看跌", "中立", "看涨"])
+
+
 ##### Technical Analyst #####
 def technical_analyst_agent(state: AgentState):
     """
@@ -40,367 +52,279 @@ def technical_analyst_agent(state: AgentState):
     3. Momentum
     4. Volatility Analysis
     5. Statistical Arbitrage Signals
+
+    With ``metadata["cross_sectional_technicals"]`` set, all tickers are laid out
+    on one trading calendar and evaluated together; results are identical to
+    the per-ticker path.
+
+    With ``metadata["indicator_book"]`` (an :class:`IndicatorBook`, supplied by
+    the backtester) only bars newer than the previous call are fed into the
+    streaming indicator state instead of recomputing the whole window.
     """
     data = state["data"]
     start_date = data["start_date"]
     end_date = data["end_date"]
     tickers = data["tickers"]
 
-    # Initialize analysis for each ticker
-    technical_analysis = {}
-
+    # Get the historical price data
+    prices_by_ticker = {}
     for ticker in tickers:
         progress.update_status("technical_analyst_agent", ticker, "Analyzing price data")
-
-        # Get the historical price data
         prices = get_prices(
             ticker=ticker,
             start_date=start_date,
             end_date=end_date,
         )
-
         if not prices:
             progress.update_status("technical_analyst_agent", ticker, "Failed: No price data found")
             continue
+        prices_by_ticker[ticker] = prices
+
+    indicator_book = state["metadata"].get("indicator_book")
+    if indicator_book is not None:
+        technical_analysis = {}
+        for ticker, prices in prices_by_ticker.items():
+            progress.update_status("technical_analyst_agent", ticker, "Updating indicators")
+            indicator_book.advance(ticker, prices)
+            strategy_signals, combined_signal = evaluate_strategies(indicator_book.indicators(ticker))
+            technical_analysis[ticker] = build_ticker_report(strategy_signals, combined_signal, ())
+            progress.update_status("technical_analyst_agent", ticker, "Done", analysis=json.dumps(technical_analysis, indent=4))
+    elif state["metadata"].get("cross_sectional_technicals"):
+        technical_analysis = analyze_cross_section(prices_by_ticker)
+    else:
+        technical_analysis = {}
+        for ticker, prices in prices_by_ticker.items():
+            progress.update_status("technical_analyst_agent", ticker, "Calculating indicators")
+            indicators = compute_indicators_from_df(prices_to_df(prices))
 
-        # Convert prices to a DataFrame
-        prices_df = prices_to_df(prices)
+            progress.update_status("technical_analyst_agent", ticker, "Combining signals")
+            strategy_signals, combined_signal = evaluate_strategies(indicators)
+            technical_analysis[ticker] = build_ticker_report(strategy_signals, combined_signal, ())
+            progress.update_status("technical_analyst_agent", ticker, "Done", analysis=json.dumps(technical_analysis, indent=4))
 
-        progress.update_status("technical_analyst_agent", ticker, "Calculating trend signals")
-        trend_signals = calculate_trend_signals(prices_df)
+    # Create the technical analyst message
+    message = HumanMessage(
+        content=json.dumps(technical_analysis),
+        name="technical_analyst_agent",
+    )
 
-        progress.update_status("technical_analyst_agent", ticker, "Calculating mean reversion")
-        mean_reversion_signals = calculate_mean_reversion_signals(prices_df)
+    if state["metadata"]["show_reasoning"]:
+        show_agent_reasoning(technical_analysis, "Technical Analyst")
 
-        progress.update_status("technical_analyst_agent", ticker, "Calculating momentum")
-        momentum_signals = calculate_momentum_signals(prices_df)
+    progress.update_status("technical_analyst_agent", None, "Done")
 
-        progress.update_status("technical_analyst_agent", ticker, "Analyzing volatility")
-        volatility_signals = calculate_volatility_signals(prices_df)
+    return {"messages": agent_messages(state, message), "analyst_signals": {"technical_analyst_agent": technical_analysis}}
 
-        progress.update_status("technical_analyst_agent", ticker, "Statistical analysis")
-        stat_arb_signals = calculate_stat_arb_signals(prices_df)
 
-        # Combine all signals using a weighted ensemble approach
-        strategy_weights = {
-            "trend": 0.25,
-            "mean_reversion": 0.20,
-            "momentum": 0.25,
-            "volatility": 0.15,
-            "stat_arb": 0.15,
-        }
+def analyze_cross_section(prices_by_ticker: dict) -> dict:
+    """Evaluate every ticker at once on a (tickers × dates) price matrix."""
+    if not prices_by_ticker:
+        return {}
 
-        progress.update_status("technical_analyst_agent", ticker, "Combining signals")
-        combined_signal = weighted_signal_combination(
-            {
-                "trend": trend_signals,
-                "mean_reversion": mean_reversion_signals,
-                "momentum": momentum_signals,
-                "volatility": volatility_signals,
-                "stat_arb": stat_arb_signals,
-            },
-            strategy_weights,
-        )
+    progress.update_status("technical_analyst_agent", None, f"Calculating indicators for {len(prices_by_ticker)} tickers")
+    matrix = prices_to_matrix(prices_by_ticker)
+    strategy_signals, combined_signal = evaluate_strategies(matrix.indicators())
 
-        # Generate detailed analysis report for this ticker
-        technical_analysis[ticker] = {
-            "signal": combined_signal["signal"],
-            "confidence": round(combined_signal["confidence"] * 100),
-            "reasoning": {
-                "trend_following": {
-                    "signal": trend_signals["signal"],
-                    "confidence": round(trend_signals["confidence"] * 100),
-                    "metrics": normalize_pandas(trend_signals["metrics"]),
-                },
-                "mean_reversion": {
-                    "signal": mean_reversion_signals["signal"],
-                    "confidence": round(mean_reversion_signals["confidence"] * 100),
-                    "metrics": normalize_pandas(mean_reversion_signals["metrics"]),
-                },
-                "momentum": {
-                    "signal": momentum_signals["signal"],
-                    "confidence": round(momentum_signals["confidence"] * 100),
-                    "metrics": normalize_pandas(momentum_signals["metrics"]),
-                },
-                "volatility": {
-                    "signal": volatility_signals["signal"],
-                    "confidence": round(volatility_signals["confidence"] * 100),
-                    "metrics": normalize_pandas(volatility_signals["metrics"]),
-                },
-                "statistical_arbitrage": {
-                    "signal": stat_arb_signals["signal"],
-                    "confidence": round(stat_arb_signals["confidence"] * 100),
-                    "metrics": normalize_pandas(stat_arb_signals["metrics"]),
-                },
-            },
-        }
-        progress.update_status("technical_analyst_agent", ticker, "Done", analysis=json.dumps(technical_analysis, indent=4))
+    technical_analysis = {}
+    for i, ticker in enumerate(matrix.tickers):
+        technical_analysis[ticker] = build_ticker_report(strategy_signals, combined_signal, (i,))
+        progress.update_status("technical_analyst_agent", ticker, "Done", analysis=json.dumps(technical_analysis[ticker], indent=4))
+    return technical_analysis
+
+
+def evaluate_strategies(indicators: IndicatorSet):
+    """Run all strategies and the weighted ensemble over (possibly batched) indicators."""
+    strategy_signals = {
+        "trend": calculate_trend_signals(indicators),
+        "mean_reversion": calculate_mean_reversion_signals(indicators),
+        "momentum": calculate_momentum_signals(indicators),
+        "volatility": calculate_volatility_signals(indicators),
+        "stat_arb": calculate_stat_arb_signals(indicators),
+    }
+    return strategy_signals, weighted_signal_combination(strategy_signals, STRATEGY_WEIGHTS)
 
-    # Create the technical analyst message
-    message = HumanMessage(
-        content=json.dumps(technical_analysis),
-        name="technical_analyst_agent",
-    )
 
-    if state["metadata"]["show_reasoning"]:
-        show_agent_reasoning(technical_analysis, "Technical Analyst")
+def build_ticker_report(strategy_signals: dict, combined_signal: dict, index: tuple) -> dict:
+    """Extract one ticker's analysis report from batched strategy results.
+
+    ``index`` is ``()`` for unbatched indicators and ``(i,)`` for the i-th ticker.
+    """
 
-    # Add the signal to the analyst_signals list
-    state["data"]["analyst_signals"]["technical_analyst_agent"] = technical_analysis
+    def at(value):
+        return np.asarray(value)[index]
 
-    progress.update_status("technical_analyst_agent", None, "Done")
+    def strategy_report(signals):
+        return {
+            "signal": str(at(signals["signal"])),
+            "confidence": round(float(at(signals["confidence"])) * 100),
+            "metrics": {name: safe_float(at(value)) for name, value in signals["metrics"].items()},
+        }
 
     return {
-        "messages": state["messages"] + [message],
-        "data": data,
+        "signal": str(at(combined_signal["signal"])),
+        "confidence": round(float(at(combined_signal["confidence"])) * 100),
+        "reasoning": {
+            "trend_following": strategy_report(strategy_signals["trend"]),
+            "mean_reversion": strategy_report(strategy_signals["mean_reversion"]),
+            "momentum": strategy_report(strategy_signals["momentum"]),
+            "volatility": strategy_report(strategy_signals["volatility"]),
+            "statistical_arbitrage": strategy_report(strategy_signals["stat_arb"]),
+        },
     }
 
 
-def calculate_trend_signals(prices_df):
+def _strategy_result(bullish, bearish, confidence, metrics):
+    """Package vectorized strategy conditions; neutral cases get 0.5 confidence."""
+    direction = np.where(bullish, 1, np.where(bearish, -1, 0))
+    return {
+        "signal": SIGNAL_LABELS[direction + 1],
+        "direction": direction,
+        "confidence": np.where(direction != 0, confidence, 0.5),
+        "metrics": metrics,
+    }
+
+
+def calculate_trend_signals(indicators: IndicatorSet):
     """
     Advanced trend following strategy using multiple timeframes and indicators
     """
-    # Calculate EMAs for multiple timeframes
-    ema_8 = calculate_ema(prices_df, 8)
-    ema_21 = calculate_ema(prices_df, 21)
-    ema_55 = calculate_ema(prices_df, 55)
-
-    # Calculate ADX for trend strength
-    adx = calculate_adx(prices_df, 14)
-
-    # Determine trend direction and strength
-    short_trend = ema_8 > ema_21
-    medium_trend = ema_21 > ema_55
-
-    # Combine signals with confidence weighting
-    trend_strength = adx["adx"].iloc[-1] / 100.0
-
-    if short_trend.iloc[-1] and medium_trend.iloc[-1]:
-        signal = "看涨"
-        confidence = trend_strength
-    elif not short_trend.iloc[-1] and not medium_trend.iloc[-1]:
-        signal = "看跌"
-        confidence = trend_strength
-    else:
-        signal = "中立"
-        confidence = 0.5
-
-    return {
-        "signal": signal,
-        "confidence": confidence,
-        "metrics": {
-            "adx": safe_float(adx["adx"].iloc[-1]),
-            "trend_strength": safe_float(trend_strength),
+    # Determine trend direction and strength from EMA 8/21/55
+    short_trend = indicators.ema_8 > indicators.ema_21
+    medium_trend = indicators.ema_21 > indicators.ema_55
+
+    # ADX measures trend strength
+    trend_strength = indicators.adx / 100.0
+
+    return _strategy_result(
+        short_trend & medium_trend,
+        ~short_trend & ~medium_trend,
+        trend_strength,
+        {
+            "adx": indicators.adx,
+            "trend_strength": trend_strength,
         },
-    }
+    )
 
 
-def calculate_mean_reversion_signals(prices_df):
+def calculate_mean_reversion_signals(indicators: IndicatorSet):
     """
     Mean reversion strategy using statistical measures and Bollinger Bands
     """
-    # Calculate z-score of price relative to moving average
-    ma_50 = prices_df["close"].rolling(window=50).mean()
-    std_50 = prices_df["close"].rolling(window=50).std()
-    z_score = (prices_df["close"] - ma_50) / std_50
-
-    # Calculate Bollinger Bands
-    bb_upper, bb_lower = calculate_bollinger_bands(prices_df)
-
-    # Calculate RSI with multiple timeframes
-    rsi_14 = calculate_rsi(prices_df, 14)
-    rsi_28 = calculate_rsi(prices_df, 28)
-
-    # Mean reversion signals
-    price_vs_bb = (prices_df["close"].iloc[-1] - bb_lower.iloc[-1]) / (bb_upper.iloc[-1] - bb_lower.iloc[-1])
-
-    # Combine signals
-    if z_score.iloc[-1] < -2 and price_vs_bb < 0.2:
-        signal = "看涨"
-        confidence = min(abs(z_score.iloc[-1]) / 4, 1.0)
-    elif z_score.iloc[-1] > 2 and price_vs_bb > 0.8:
-        signal = "看跌"
-        confidence = min(abs(z_score.iloc[-1]) / 4, 1.0)
-    else:
-        signal = "中立"
-        confidence = 0.5
-
-    return {
-        "signal": signal,
-        "confidence": confidence,
-        "metrics": {
-            "z_score": safe_float(z_score.iloc[-1]),
-            "price_vs_bb": safe_float(price_vs_bb),
-            "rsi_14": safe_float(rsi_14.iloc[-1]),
-            "rsi_28": safe_float(rsi_28.iloc[-1]),
+    # z-score of price relative to its 50-day moving average
+    z_score = indicators.z_score
+
+    # Position of price within the Bollinger Bands
+    with np.errstate(divide="ignore", invalid="ignore"):
+        price_vs_bb = (indicators.close - indicators.bb_lower) / (indicators.bb_upper - indicators.bb_lower)
+
+    return _strategy_result(
+        (z_score < -2) & (price_vs_bb < 0.2),
+        (z_score > 2) & (price_vs_bb > 0.8),
+        np.minimum(np.abs(z_score) / 4, 1.0),
+        {
+            "z_score": z_score,
+            "price_vs_bb": price_vs_bb,
+            "rsi_14": indicators.rsi_14,
+            "rsi_28": indicators.rsi_28,
         },
-    }
+    )
 
 
-def calculate_momentum_signals(prices_df):
+def calculate_momentum_signals(indicators: IndicatorSet):
     """
     Multi-factor momentum strategy
     """
-    # Price momentum
-    returns = prices_df["close"].pct_change()
-    mom_1m = returns.rolling(21).sum()
-    mom_3m = returns.rolling(63).sum()
-    mom_6m = returns.rolling(126).sum()
-
-    # Volume momentum
-    volume_ma = prices_df["volume"].rolling(21).mean()
-    volume_momentum = prices_df["volume"] / volume_ma
+    # Price momentum over 1, 3 and 6 months
+    momentum_score = 0.4 * indicators.momentum_1m + 0.3 * indicators.momentum_3m + 0.3 * indicators.momentum_6m
 
     # Relative strength
     # (would compare to market/sector in real implementation)
 
-    # Calculate momentum score
-    momentum_score = (0.4 * mom_1m + 0.3 * mom_3m + 0.3 * mom_6m).iloc[-1]
-
     # Volume confirmation
-    volume_confirmation = volume_momentum.iloc[-1] > 1.0
-
-    if momentum_score > 0.05 and volume_confirmation:
-        signal = "看涨"
-        confidence = min(abs(momentum_score) * 5, 1.0)
-    elif momentum_score < -0.05 and volume_confirmation:
-        signal = "看跌"
-        confidence = min(abs(momentum_score) * 5, 1.0)
-    else:
-        signal = "中立"
-        confidence = 0.5
-
-    return {
-        "signal": signal,
-        "confidence": confidence,
-        "metrics": {
-            "momentum_1m": safe_float(mom_1m.iloc[-1]),
-            "momentum_3m": safe_float(mom_3m.iloc[-1]),
-            "momentum_6m": safe_float(mom_6m.iloc[-1]),
-            "volume_momentum": safe_float(volume_momentum.iloc[-1]),
+    volume_confirmation = indicators.volume_momentum > 1.0
+
+    return _strategy_result(
+        (momentum_score > 0.05) & volume_confirmation,
+        (momentum_score < -0.05) & volume_confirmation,
+        np.minimum(np.abs(momentum_score) * 5, 1.0),
+        {
+            "momentum_1m": indicators.momentum_1m,
+            "momentum_3m": indicators.momentum_3m,
+            "momentum_6m": indicators.momentum_6m,
+            "volume_momentum": indicators.volume_momentum,
         },
-    }
+    )
 
 
-def calculate_volatility_signals(prices_df):
+def calculate_volatility_signals(indicators: IndicatorSet):
     """
     Volatility-based trading strategy
     """
-    # Calculate various volatility metrics
-    returns = prices_df["close"].pct_change()
-
-    # Historical volatility
-    hist_vol = returns.rolling(21).std() * math.sqrt(252)
-
-    # Volatility regime detection
-    vol_ma = hist_vol.rolling(63).mean()
-    vol_regime = hist_vol / vol_ma
-
-    # Volatility mean reversion
-    vol_z_score = (hist_vol - vol_ma) / hist_vol.rolling(63).std()
+    # Volatility regime and its z-score relative to the 63-day average
+    vol_regime = indicators.volatility_regime
+    vol_z = indicators.volatility_z_score
 
     # ATR ratio
-    atr = calculate_atr(prices_df)
-    atr_ratio = atr / prices_df["close"]
-
-    # Generate signal based on volatility regime
-    current_vol_regime = vol_regime.iloc[-1]
-    vol_z = vol_z_score.iloc[-1]
-
-    if current_vol_regime < 0.8 and vol_z < -1:
-        signal = "看涨"  # Low vol regime, potential for expansion
-        confidence = min(abs(vol_z) / 3, 1.0)
-    elif current_vol_regime > 1.2 and vol_z > 1:
-        signal = "看跌"  # High vol regime, potential for contraction
-        confidence = min(abs(vol_z) / 3, 1.0)
-    else:
-        signal = "中立"
-        confidence = 0.5
-
-    return {
-        "signal": signal,
-        "confidence": confidence,
-        "metrics": {
-            "historical_volatility": safe_float(hist_vol.iloc[-1]),
-            "volatility_regime": safe_float(current_vol_regime),
-            "volatility_z_score": safe_float(vol_z),
-            "atr_ratio": safe_float(atr_ratio.iloc[-1]),
+    with np.errstate(divide="ignore", invalid="ignore"):
+        atr_ratio = indicators.atr / indicators.close
+
+    return _strategy_result(
+        (vol_regime < 0.8) & (vol_z < -1),  # Low vol regime, potential for expansion
+        (vol_regime > 1.2) & (vol_z > 1),  # High vol regime, potential for contraction
+        np.minimum(np.abs(vol_z) / 3, 1.0),
+        {
+            "historical_volatility": indicators.historical_volatility,
+            "volatility_regime": vol_regime,
+            "volatility_z_score": vol_z,
+            "atr_ratio": atr_ratio,
         },
-    }
+    )
 
 
-def calculate_stat_arb_signals(prices_df):
+def calculate_stat_arb_signals(indicators: IndicatorSet):
     """
     Statistical arbitrage signals based on price action analysis
     """
-    # Calculate price distribution statistics
-    returns = prices_df["close"].pct_change()
-
-    # Skewness and kurtosis
-    skew = returns.rolling(63).skew()
-    kurt = returns.rolling(63).kurt()
-
-    # Test for mean reversion using Hurst exponent
-    hurst = calculate_hurst_exponent(prices_df["close"])
+    # Return distribution and mean-reversion tendency (Hurst exponent)
+    hurst = indicators.hurst
+    skew = indicators.skewness
 
     # Correlation analysis
     # (would include correlation with related securities in real implementation)
 
-    # Generate signal based on statistical properties
-    if hurst < 0.4 and skew.iloc[-1] > 1:
-        signal = "看涨"
-        confidence = (0.5 - hurst) * 2
-    elif hurst < 0.4 and skew.iloc[-1] < -1:
-        signal = "看跌"
-        confidence = (0.5 - hurst) * 2
-    else:
-        signal = "中立"
-        confidence = 0.5
-
-    return {
-        "signal": signal,
-        "confidence": confidence,
-        "metrics": {
-            "hurst_exponent": safe_float(hurst),
-            "skewness": safe_float(skew.iloc[-1]),
-            "kurtosis": safe_float(kurt.iloc[-1]),
+    return _strategy_result(
+        (hurst < 0.4) & (skew > 1),
+        (hurst < 0.4) & (skew < -1),
+        (0.5 - hurst) * 2,
+        {
+            "hurst_exponent": hurst,
+            "skewness": skew,
+            "kurtosis": indicators.kurtosis,
         },
-    }
+    )
 
 
 def weighted_signal_combination(signals, weights):
     """
     Combines multiple trading signals using a weighted approach
     """
-    # Convert signals to numeric values
-    signal_values = {"看涨": 1, "中立": 0, "看跌": -1}
-
     weighted_sum = 0
     total_confidence = 0
 
     for strategy, signal in signals.items():
-        numeric_signal = signal_values[signal["signal"]]
         weight = weights[strategy]
         confidence = signal["confidence"]
 
-        weighted_sum += numeric_signal * weight * confidence
-        total_confidence += weight * confidence
+        weighted_sum = weighted_sum + signal["direction"] * weight * confidence
+        total_confidence = total_confidence + weight * confidence
 
     # Normalize the weighted sum
-    if total_confidence > 0:
-        final_score = weighted_sum / total_confidence
-    else:
-        final_score = 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        final_score = np.where(total_confidence > 0, weighted_sum / total_confidence, 0.0)
 
     # Convert back to signal
-    if final_score > 0.2:
-        signal = "看涨"
-    elif final_score < -0.2:
-        signal = "看跌"
-    else:
-        signal = "中立"
-
-    return {"signal": signal, "confidence": abs(final_score)}
+    direction = np.where(final_score > 0.2, 1, np.where(final_score < -0.2, -1, 0))
+    return {"signal": SIGNAL_LABELS[direction + 1], "direction": direction, "confidence": np.abs(final_score)}
 
 
 def normalize_pandas(obj):
@@ -414,117 +338,3 @@ def normalize_pandas(obj):
     elif isinstance(obj, (list, tuple)):
         return [normalize_pandas(item) for item in obj]
     return obj
-
-
-def calculate_rsi(prices_df: pd.DataFrame, period: int = 14) -> pd.Series:
-    delta = prices_df["close"].diff()
-    gain = (delta.where(delta > 0, 0)).fillna(0)
-    loss = (-delta.where(delta < 0, 0)).fillna(0)
-    avg_gain = gain.rolling(window=period).mean()
-    avg_loss = loss.rolling(window=period).mean()
-    rs = avg_gain / avg_loss
-    rsi = 100 - (100 / (1 + rs))
-    return rsi
-
-
-def calculate_bollinger_bands(prices_df: pd.DataFrame, window: int = 20) -> tuple[pd.Series, pd.Series]:
-    sma = prices_df["close"].rolling(window).mean()
-    std_dev = prices_df["close"].rolling(window).std()
-    upper_band = sma + (std_dev * 2)
-    lower_band = sma - (std_dev * 2)
-    return upper_band, lower_band
-
-
-def calculate_ema(df: pd.DataFrame, window: int) -> pd.Series:
-    """
-    Calculate Exponential Moving Average
-
-    Args:
-        df: DataFrame with price data
-        window: EMA period
-
-    Returns:
-        pd.Series: EMA values
-    """
-    return df["close"].ewm(span=window, adjust=False).mean()
-
-
-def calculate_adx(df: pd.DataFrame, period: int = 14) -> pd.DataFrame:
-    """
-    Calculate Average Directional Index (ADX)
-
-    Args:
-        df: DataFrame with OHLC data
-        period: Period for calculations
-
-    Returns:
-        DataFrame with ADX values
-    """
-    # Calculate True Range
-    df["high_low"] = df["high"] - df["low"]
-    df["high_close"] = abs(df["high"] - df["close"].shift())
-    df["low_close"] = abs(df["low"] - df["close"].shift())
-    df["tr"] = df[["high_low", "high_close", "low_close"]].max(axis=1)
-
-    # Calculate Directional Movement
-    df["up_move"] = df["high"] - df["high"].shift()
-    df["down_move"] = df["low"].shift() - df["low"]
-
-    df["plus_dm"] = np.where((df["up_move"] > df["down_move"]) & (df["up_move"] > 0), df["up_move"], 0)
-    df["minus_dm"] = np.where((df["down_move"] > df["up_move"]) & (df["down_move"] > 0), df["down_move"], 0)
-
-    # Calculate ADX
-    df["+di"] = 100 * (df["plus_dm"].ewm(span=period).mean() / df["tr"].ewm(span=period).mean())
-    df["-di"] = 100 * (df["minus_dm"].ewm(span=period).mean() / df["tr"].ewm(span=period).mean())
-    df["dx"] = 100 * abs(df["+di"] - df["-di"]) / (df["+di"] + df["-di"])
-    df["adx"] = df["dx"].ewm(span=period).mean()
-
-    return df[["adx", "+di", "-di"]]
-
-
-def calculate_atr(df: pd.DataFrame, period: int = 14) -> pd.Series:
-    """
-    Calculate Average True Range
-
-    Args:
-        df: DataFrame with OHLC data
-        period: Period for ATR calculation
-
-    Returns:
-        pd.Series: ATR values
-    """
-    high_low = df["high"] - df["low"]
-    high_close = abs(df["high"] - df["close"].shift())
-    low_close = abs(df["low"] - df["close"].shift())
-
-    ranges = pd.concat([high_low, high_close, low_close], axis=1)
-    true_range = ranges.max(axis=1)
-
-    return true_range.rolling(period).mean()
-
-
-def calculate_hurst_exponent(price_series: pd.Series, max_lag: int = 20) -> float:
-    """
-    Calculate Hurst Exponent to determine long-term memory of time series
-    H < 0.5: Mean reverting series
-    H = 0.5: Random walk
-    H > 0.5: Trending series
-
-    Args:
-        price_series: Array-like price data
-        max_lag: Maximum lag for R/S calculation
-
-    Returns:
-        float: Hurst exponent
-    """
-    lags = range(2, max_lag)
-    # Add small epsilon to avoid log(0)
-    tau = [max(1e-8, np.sqrt(np.std(np.subtract(price_series[lag:], price_series[:-lag])))) for lag in lags]
-
-    # Return the Hurst exponent from linear fit
-    try:
-        reg = np.polyfit(np.log(lags), np.log(tau), 1)
-        return reg[0]  # Hurst exponent is the slope
-    except (ValueError, RuntimeWarning):
-        # Return 0.5 (random walk) if calculation fails
-        return 0.5
@@ -3,14 +3,18 @@ from __future__ import annotations
 """Valuation Agent
 
 Implements four complementary valuation methodologies and aggregates them with
-configurable weights. 
+configurable weights. The reasoning also reports how the DCF value spreads
+across a grid of growth, discount and terminal growth assumptions.
 """
 
 from statistics import median
 import json
+import math
 from langchain_core.messages import HumanMessage
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.signal_reuse import signal_key, store_signal, stored_signal
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from src.utils.progress import progress
+from src.utils.dcf import dcf_scenarios, dcf_value, growth_path, present_value, project_cash_flows, terminal_value
 
 from src.tools.api import (
     get_financial_metrics,
@@ -18,6 +22,11 @@ from src.tools.api import (
     search_line_items,
 )
 
+# DCF scenario grid: offsets around the ticker's growth rate, discount and terminal growth rates
+SCENARIO_GROWTH_OFFSETS = (-0.04, -0.02, 0.0, 0.02, 0.04)
+SCENARIO_DISCOUNT_RATES = (0.08, 0.09, 0.10, 0.11, 0.12)
+SCENARIO_TERMINAL_GROWTH_RATES = (0.02, 0.025, 0.03)
+
 def valuation_analyst_agent(state: AgentState):
     """Run valuation across tickers and write signals back to `state`."""
 
@@ -62,6 +71,18 @@ def valuation_analyst_agent(state: AgentState):
             continue
         li_curr, li_prev = line_items[0], line_items[1]
 
+        market_cap = get_market_cap(ticker, end_date)
+        if not market_cap:
+            progress.update_status("valuation_analyst_agent", ticker, "Failed: Market cap unavailable")
+            continue
+
+        # Same metrics, line items and market cap bucket as a stored run: reuse its signal
+        key = signal_key("valuation_analyst_agent", ticker)
+        if (stored := stored_signal(key)) is not None:
+            valuation_analysis[ticker] = stored
+            progress.update_status("valuation_analyst_agent", ticker, "Done", analysis=stored["reasoning"])
+            continue
+
         # ------------------------------------------------------------------
         # Valuation models
         # ------------------------------------------------------------------
@@ -99,11 +120,6 @@ def valuation_analyst_agent(state: AgentState):
         # ------------------------------------------------------------------
         # Aggregate & signal
         # ------------------------------------------------------------------
-        market_cap = get_market_cap(ticker, end_date)
-        if not market_cap:
-            progress.update_status("valuation_analyst_agent", ticker, "Failed: Market cap unavailable")
-            continue
-
         method_values = {
             "dcf": {"value": dcf_val, "weight": 0.35},
             "owner_earnings": {"value": owner_val, "weight": 0.35},
@@ -161,6 +177,13 @@ def valuation_analyst_agent(state: AgentState):
                 reasoning_parts.append(f"• {method_name}: {signal_text}")
                 reasoning_parts.append(f"  估值: ${vals['value']:,.2f}, 差距: {vals['gap']:.1%}, 权重: {vals['weight']*100:.0f}%")
         
+        scenarios = summarize_dcf_scenarios(ticker, li_curr.free_cash_flow, most_recent_metrics.earnings_growth or 0.05, market_cap)
+        if scenarios is not None:
+            reasoning_parts.append(
+                f"\nDCF情景分析 ({scenarios['scenarios']}种假设): P10 ${scenarios['p10']:,.2f}, P50 ${scenarios['p50']:,.2f}, "
+                f"P90 ${scenarios['p90']:,.2f}, 低估情景占比 {scenarios['probability_undervalued']:.0%}"
+            )
+
         reasoning_parts.append(f"\n判断标准: 差距>15%为看涨, 差距<-15%为看跌, 其他为中性")
         
         detailed_reasoning = "\n".join(reasoning_parts)
@@ -170,6 +193,7 @@ def valuation_analyst_agent(state: AgentState):
             "confidence": confidence,
             "reasoning": detailed_reasoning,
         }
+        store_signal(key, valuation_analysis[ticker])
         progress.update_status("valuation_analyst_agent", ticker, "Done", analysis=detailed_reasoning)
 
     # ---- Emit message (for LLM tool chain) ----
@@ -177,12 +201,9 @@ def valuation_analyst_agent(state: AgentState):
     if state["metadata"].get("show_reasoning"):
         show_agent_reasoning(valuation_analysis, "Valuation Analysis Agent")
 
-    # Add the signal to the analyst_signals list
-    state["data"]["analyst_signals"]["valuation_analyst_agent"] = valuation_analysis
-
     progress.update_status("valuation_analyst_agent", None, "Done")
     
-    return {"messages": [msg], "data": data}
+    return {"messages": agent_messages(state, msg), "analyst_signals": {"valuation_analyst_agent": valuation_analysis}}
 
 #############################
 # Helper Valuation Functions
@@ -206,19 +227,15 @@ def calculate_owner_earnings_value(
     if owner_earnings <= 0:
         return 0
 
-    pv = 0.0
-    for yr in range(1, num_years + 1):
-        future = owner_earnings * (1 + growth_rate) ** yr
-        pv += future / (1 + required_return) ** yr
-
-    terminal_growth = min(growth_rate, 0.03)
-    term_val = (owner_earnings * (1 + growth_rate) ** num_years * (1 + terminal_growth)) / (
-        required_return - terminal_growth
+    intrinsic = dcf_value(
+        owner_earnings,
+        growth_rate,
+        required_return,
+        terminal_growth=min(growth_rate, 0.03),
+        num_years=num_years,
+        margin_of_safety=margin_of_safety,
     )
-    pv_term = term_val / (1 + required_return) ** num_years
-
-    intrinsic = pv + pv_term
-    return intrinsic * (1 - margin_of_safety)
+    return _finite_or_zero(intrinsic)
 
 
 def calculate_intrinsic_value(
@@ -232,17 +249,14 @@ def calculate_intrinsic_value(
     if free_cash_flow is None or free_cash_flow <= 0:
         return 0
 
-    pv = 0.0
-    for yr in range(1, num_years + 1):
-        fcft = free_cash_flow * (1 + growth_rate) ** yr
-        pv += fcft / (1 + discount_rate) ** yr
-
-    term_val = (
-        free_cash_flow * (1 + growth_rate) ** num_years * (1 + terminal_growth_rate)
-    ) / (discount_rate - terminal_growth_rate)
-    pv_term = term_val / (1 + discount_rate) ** num_years
-
-    return pv + pv_term
+    intrinsic = dcf_value(
+        free_cash_flow,
+        growth_rate,
+        discount_rate,
+        terminal_growth=terminal_growth_rate,
+        num_years=num_years,
+    )
+    return _finite_or_zero(intrinsic)
 
 
 def calculate_ev_ebitda_value(financial_metrics: list):
@@ -282,15 +296,45 @@ def calculate_residual_income_value(
     if ri0 <= 0:
         return 0
 
-    pv_ri = 0.0
-    for yr in range(1, num_years + 1):
-        ri_t = ri0 * (1 + book_value_growth) ** yr
-        pv_ri += ri_t / (1 + cost_of_equity) ** yr
+    if cost_of_equity <= terminal_growth_rate:
+        return 0
 
-    term_ri = ri0 * (1 + book_value_growth) ** (num_years + 1) / (
-        cost_of_equity - terminal_growth_rate
+    ri = project_cash_flows(ri0, growth_path(book_value_growth, num_years))
+    pv_ri = present_value(ri, cost_of_equity)
+    # Terminal RI grows one more year and is capitalised at (Ke - g)
+    pv_term = terminal_value(
+        ri[-1],
+        cost_of_equity,
+        num_years,
+        terminal_multiple=(1 + book_value_growth) / (cost_of_equity - terminal_growth_rate),
     )
-    pv_term = term_ri / (1 + cost_of_equity) ** num_years
 
     intrinsic = book_val + pv_ri + pv_term
-    return intrinsic * 0.8  # 20% margin of safety
+    return float(intrinsic) * 0.8  # 20% margin of safety
+
+
+def summarize_dcf_scenarios(ticker: str, free_cash_flow: float | None, growth_rate: float, market_cap: float) -> dict | None:
+    """DCF value percentiles and share of undervalued scenarios across the scenario grid."""
+    if free_cash_flow is None or free_cash_flow <= 0:
+        return None
+    grid = dcf_scenarios(
+        {ticker: free_cash_flow},
+        [growth_rate + offset for offset in SCENARIO_GROWTH_OFFSETS],
+        SCENARIO_DISCOUNT_RATES,
+        SCENARIO_TERMINAL_GROWTH_RATES,
+        market_caps={ticker: market_cap},
+    )
+    percentiles = grid.percentiles()[ticker]
+    if percentiles["p50"] is None:
+        return None
+    return {
+        **percentiles,
+        "probability_undervalued": grid.probability_undervalued()[ticker],
+        "scenarios": grid.values[0].size,
+    }
+
+
+def _finite_or_zero(value) -> float:
+    """Collapse undefined scenarios (NaN/inf) to the 0 used for "no value"."""
+    value = float(value)
+    return value if math.isfinite(value) else 0
@@ -1,11 +1,14 @@
-from src.graph.state import AgentState, show_agent_reasoning
+from src.graph.state import AgentState, agent_messages, show_agent_reasoning
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.messages import HumanMessage
 from pydantic import BaseModel
 import json
+import numpy as np
 from typing_extensions import Literal
 from src.tools.api import get_financial_metrics, get_market_cap, search_line_items
-from src.utils.llm import call_llm
+from src.utils.dcf import growth_path, present_value, project_cash_flows, terminal_value
+from src.llm.prompt_budget import prompt_budget, to_prompt_json
+from src.utils.llm import call_llm_for_tickers
 from src.utils.progress import progress
 
 
@@ -119,13 +122,12 @@ def warren_buffett_agent(state: AgentState):
             "margin_of_safety": margin_of_safety,
         }
 
-        progress.update_status("warren_buffett_agent", ticker, "Generating Warren Buffett analysis")
-        buffett_output = generate_buffett_output(
-            ticker=ticker,
-            analysis_data=analysis_data,
-            state=state,
-        )
+    buffett_outputs = generate_buffett_outputs(
+        analysis_data=analysis_data,
+        state=state,
+    )
 
+    for ticker, buffett_output in buffett_outputs.items():
         # Store analysis in consistent format with other agents
         buffett_analysis[ticker] = {
             "signal": buffett_output.signal,
@@ -142,12 +144,9 @@ def warren_buffett_agent(state: AgentState):
     if state["metadata"]["show_reasoning"]:
         show_agent_reasoning(buffett_analysis, "Warren Buffett Agent")
 
-    # Add the signal to the analyst_signals list
-    state["data"]["analyst_signals"]["warren_buffett_agent"] = buffett_analysis
-
     progress.update_status("warren_buffett_agent", None, "Done")
 
-    return {"messages": [message], "data": state["data"]}
+    return {"messages": agent_messages(state, message), "analyst_signals": {"warren_buffett_agent": buffett_analysis}}
 
 
 def analyze_fundamentals(metrics: list) -> dict[str, any]:
@@ -555,30 +554,21 @@ def calculate_intrinsic_value(financial_line_items: list) -> dict[str, any]:
     stage1_years = 5   # High growth phase
     stage2_years = 5   # Transition phase
     
-    present_value = 0
     details.append(f"Using three-stage DCF: Stage 1 ({stage1_growth:.1%}, {stage1_years}y), Stage 2 ({stage2_growth:.1%}, {stage2_years}y), Terminal ({terminal_growth:.1%})")
     
+    # Project owner earnings through both stages in one pass
+    growth = np.concatenate([growth_path(stage1_growth, stage1_years), growth_path(stage2_growth, stage2_years)])
+    earnings = project_cash_flows(owner_earnings, growth)
+
     # Stage 1: Higher growth
-    stage1_pv = 0
-    for year in range(1, stage1_years + 1):
-        future_earnings = owner_earnings * (1 + stage1_growth) ** year
-        pv = future_earnings / (1 + discount_rate) ** year
-        stage1_pv += pv
-    
+    stage1_pv = float(present_value(earnings[:stage1_years], discount_rate))
+
     # Stage 2: Transition growth
-    stage2_pv = 0
-    stage1_final_earnings = owner_earnings * (1 + stage1_growth) ** stage1_years
-    for year in range(1, stage2_years + 1):
-        future_earnings = stage1_final_earnings * (1 + stage2_growth) ** year
-        pv = future_earnings / (1 + discount_rate) ** (stage1_years + year)
-        stage2_pv += pv
-    
+    stage2_pv = float(present_value(earnings[stage1_years:], discount_rate, start_year=stage1_years + 1))
+
     # Terminal value using Gordon Growth Model
-    final_earnings = stage1_final_earnings * (1 + stage2_growth) ** stage2_years
-    terminal_earnings = final_earnings * (1 + terminal_growth)
-    terminal_value = terminal_earnings / (discount_rate - terminal_growth)
-    terminal_pv = terminal_value / (1 + discount_rate) ** (stage1_years + stage2_years)
-    
+    terminal_pv = float(terminal_value(earnings[-1], discount_rate, stage1_years + stage2_years, terminal_growth=terminal_growth))
+
     # Total intrinsic value
     intrinsic_value = stage1_pv + stage2_pv + terminal_pv
     
@@ -723,12 +713,11 @@ def analyze_pricing_power(financial_line_items: list, metrics: list) -> dict[str
     }
 
 
-def generate_buffett_output(
-    ticker: str,
+def generate_buffett_outputs(
     analysis_data: dict[str, any],
     state: AgentState,
-) -> WarrenBuffettSignal:
-    """Get investment decision from LLM with Buffett's principles"""
+) -> dict[str, WarrenBuffettSignal]:
+    """Get investment decisions from LLM with Buffett's principles"""
     template = ChatPromptTemplate.from_messages(
         [
             (
@@ -819,16 +808,18 @@ def generate_buffett_output(
         ]
     )
 
-    prompt = template.invoke({"analysis_data": json.dumps(analysis_data, indent=2), "ticker": ticker})
+    prompts = {ticker: template.invoke({"analysis_data": to_prompt_json({ticker: data}, prompt_budget(state, "warren_buffett_agent")), "ticker": ticker}) for ticker, data in analysis_data.items()}
 
     # Default fallback signal in case parsing fails
     def create_default_warren_buffett_signal():
         return WarrenBuffettSignal(signal="中立", confidence=0.0, reasoning="Error in analysis, defaulting to neutral")
 
-    return call_llm(
-        prompt=prompt,
+    return call_llm_for_tickers(
+        prompts=prompts,
+        analysis_data=analysis_data,
         pydantic_model=WarrenBuffettSignal,
         agent_name="warren_buffett_agent",
         state=state,
         default_factory=create_default_warren_buffett_signal,
+        status="Generating Warren Buffett analysis",
     )
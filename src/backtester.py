@@ -9,20 +9,25 @@ import pandas as pd
 from colorama import Fore, Style, init
 import numpy as np
 import itertools
+from contextlib import nullcontext
 
 from src.llm.models import LLM_ORDER, OLLAMA_LLM_ORDER, get_model_info, ModelProvider
+from src.llm.telemetry import telemetry_run
 from src.utils.analysts import ANALYST_ORDER
 from src.main import run_hedge_fund
 from src.tools.api import (
-    get_company_news,
+    get_company_news_counts,
     get_price_data,
     get_prices,
     get_financial_metrics,
-    get_insider_trades,
+    get_insider_trade_counts,
 )
-from src.utils.display import print_backtest_results, format_backtest_row
+from src.utils.display import print_backtest_results, print_llm_telemetry, print_profile, format_backtest_row
+from src.utils.profiling import profiling_run
+from src.utils.progress import progress
 from typing_extensions import Callable
 from src.utils.ollama import ensure_ollama_and_model
+from src.utils.streaming_indicators import IndicatorBook
 
 init(autoreset=True)
 
@@ -39,6 +44,16 @@ class Backtester:
         model_provider: str = "OpenAI",
         selected_analysts: list[str] = [],
         initial_margin_requirement: float = 0.0,
+        streaming_indicators: bool = False,
+        llm_escalation: str | dict = "always",
+        fan_out: bool = False,
+        max_concurrency: int | None = None,
+        node_timeout: float | None = None,
+        run_timeout: float | None = None,
+        profile: bool = False,
+        profile_output: str | None = None,
+        process_pool: bool = False,
+        reuse_signals: bool = False,
     ):
         """
         :param agent: The trading agent (Callable).
@@ -50,6 +65,16 @@ class Backtester:
         :param model_provider: Which LLM provider (OpenAI, etc).
         :param selected_analysts: List of analyst names or IDs to incorporate.
         :param initial_margin_requirement: The margin ratio (e.g. 0.5 = 50%).
+        :param streaming_indicators: Keep technical indicator state across days and advance it one bar at a time.
+        :param llm_escalation: Persona agent LLM policy ("always", "never", "auto", or a per-agent mapping).
+        :param fan_out: Run every (analyst, ticker) pair as its own graph task.
+        :param max_concurrency: Maximum number of graph tasks running at once.
+        :param node_timeout: Seconds each analyst may take per day before it is reported as missing.
+        :param run_timeout: Seconds all analysts together may take per day.
+        :param profile: Time every graph node over the whole backtest and print a ranked table.
+        :param profile_output: cProfile stats (*.prof) or folded stacks file written when profiling.
+        :param process_pool: Run CPU-bound analysts in a pool of worker processes.
+        :param reuse_signals: Reuse an analyst's signal from an earlier day while its fetched inputs are unchanged.
         """
         self.agent = agent
         self.tickers = tickers
@@ -59,6 +84,18 @@ class Backtester:
         self.model_name = model_name
         self.model_provider = model_provider
         self.selected_analysts = selected_analysts
+        self.indicator_book = IndicatorBook() if streaming_indicators else None
+        self.llm_escalation = llm_escalation
+        self.fan_out = fan_out
+        self.max_concurrency = max_concurrency
+        self.node_timeout = node_timeout
+        self.run_timeout = run_timeout
+        self.process_pool = process_pool
+        self.reuse_signals = reuse_signals
+        self.llm_telemetry = None
+        self.profile = profile
+        self.profile_output = profile_output
+        self.node_profile = None
 
         # Initialize portfolio with support for long/short positions
         self.portfolio_values = []
@@ -279,15 +316,28 @@ class Backtester:
             # Fetch financial metrics
             get_financial_metrics(ticker, self.end_date, limit=10)
 
+            # Index insider trades and company news for the whole period so the
+            # agents' daily windows (up to a year back) are answered without rescans
+            events_start = (datetime.strptime(self.start_date, "%Y-%m-%d") - relativedelta(years=1)).strftime("%Y-%m-%d")
+
             # Fetch insider trades
-            get_insider_trades(ticker, self.end_date, start_date=self.start_date, limit=1000)
+            get_insider_trade_counts(ticker, self.end_date, start_date=events_start, limit=1000)
 
             # Fetch company news
-            get_company_news(ticker, self.end_date, start_date=self.start_date, limit=1000)
+            get_company_news_counts(ticker, self.end_date, start_date=events_start, limit=1000)
 
         print("Data pre-fetch complete.")
 
     def run_backtest(self):
+        # Every day's hedge fund run also reports its LLM calls to the backtest-wide telemetry
+        with telemetry_run() as self.llm_telemetry, profiling_run(self.profile_output) if self.profile else nullcontext() as self.node_profile:
+            performance_metrics = self._run_backtest()
+        print_llm_telemetry(self.llm_telemetry.summary())
+        if self.node_profile is not None:
+            print_profile(self.node_profile.summary())
+        return performance_metrics
+
+    def _run_backtest(self):
         # Pre-fetch all data at the start
         self.prefetch_data()
 
@@ -342,6 +392,23 @@ class Backtester:
             # ---------------------------------------------------------------
             # 1) Execute the agent's trades
             # ---------------------------------------------------------------
+            agent_kwargs = {}
+            if self.indicator_book is not None:
+                agent_kwargs["indicator_book"] = self.indicator_book
+            if self.llm_escalation != "always":
+                agent_kwargs["llm_escalation"] = self.llm_escalation
+            if self.fan_out:
+                agent_kwargs["fan_out"] = True
+            if self.max_concurrency:
+                agent_kwargs["max_concurrency"] = self.max_concurrency
+            if self.node_timeout:
+                agent_kwargs["node_timeout"] = self.node_timeout
+            if self.run_timeout:
+                agent_kwargs["run_timeout"] = self.run_timeout
+            if self.process_pool:
+                agent_kwargs["process_pool"] = True
+            if self.reuse_signals:
+                agent_kwargs["reuse_signals"] = True
             output = self.agent(
                 tickers=self.tickers,
                 start_date=lookback_start,
@@ -350,6 +417,7 @@ class Backtester:
                 model_name=self.model_name,
                 model_provider=self.model_provider,
                 selected_analysts=self.selected_analysts,
+                **agent_kwargs,
             )
             decisions = output["decisions"]
             analyst_signals = output["analyst_signals"]
@@ -652,8 +720,30 @@ if __name__ == "__main__":
         help="Use all available analysts (overrides --analysts)",
     )
     parser.add_argument("--ollama", action="store_true", help="Use Ollama for local LLM inference")
+    parser.add_argument(
+        "--streaming-indicators",
+        action="store_true",
+        help="Advance technical indicators incrementally across days instead of recomputing each lookback window",
+    )
+    parser.add_argument(
+        "--llm-escalation",
+        choices=["always", "never", "auto"],
+        default="always",
+        help="When persona agents call the LLM: always, never (signal from the deterministic score), or auto (only for ambiguous scores)",
+    )
+    parser.add_argument("--fan-out", action="store_true", help="Run every (analyst, ticker) pair as its own concurrent task")
+    parser.add_argument("--max-concurrency", type=int, help="Maximum number of graph tasks running at once")
+    parser.add_argument("--node-timeout", type=float, help="Seconds each analyst may take before it is reported as missing")
+    parser.add_argument("--run-timeout", type=float, help="Seconds all analysts together may take before the missing ones are skipped")
+    parser.add_argument("--process-pool", action="store_true", help="Run CPU-bound analysts (technicals, fundamentals, valuation) in a pool of worker processes")
+    parser.add_argument("--reuse-signals", action="store_true", help="Reuse an analyst's signal from an earlier day while its fetched inputs (metrics, line items, market cap bucket) are unchanged")
+    parser.add_argument("--profile", action="store_true", help="Time every graph node (wall, CPU, data fetch, LLM, memory) and print a ranked table")
+    parser.add_argument("--profile-output", type=str, help="With --profile, write cProfile stats (*.prof) or folded stacks for flamegraphs (any other path)")
+    parser.add_argument("--headless", action="store_true", help="Do not render the live agent progress table (batch jobs, non-interactive logs)")
 
     args = parser.parse_args()
+    if args.headless:
+        progress.headless = True
 
     # Parse tickers from comma-separated string
     tickers = [ticker.strip() for ticker in args.tickers.split(",")] if args.tickers else []
@@ -770,6 +860,16 @@ if __name__ == "__main__":
         model_provider=model_provider,
         selected_analysts=selected_analysts,
         initial_margin_requirement=args.margin_requirement,
+        streaming_indicators=args.streaming_indicators,
+        llm_escalation=args.llm_escalation,
+        fan_out=args.fan_out,
+        max_concurrency=args.max_concurrency,
+        node_timeout=args.node_timeout,
+        run_timeout=args.run_timeout,
+        profile=args.profile,
+        profile_output=args.profile_output,
+        process_pool=args.process_pool,
+        reuse_signals=args.reuse_signals,
     )
 
     performance_metrics = backtester.run_backtest()
@@ -1,3 +1,13 @@
+# Cache name -> field that identifies an entry when merging
+CACHE_KEY_FIELDS = {
+    "prices": "time",
+    "financial_metrics": "report_period",
+    "line_items": "report_period",
+    "insider_trades": "filing_date",
+    "company_news": "date",
+}
+
+
 class Cache:
     """In-memory cache for API responses."""
 
@@ -61,6 +71,20 @@ class Cache:
         """Append new company news to cache."""
         self._company_news_cache[ticker] = self._merge_data(self._company_news_cache.get(ticker), data, key_field="date")
 
+    def export(self, tickers: list[str], end_date: str | None = None) -> dict[str, dict[str, list[dict[str, any]]]]:
+        """Cached entries for ``tickers`` (and queries ending on ``end_date``) by cache name, e.g. to seed another process's cache."""
+        prefixes = tuple(f"{ticker}_" for ticker in tickers)
+        # Every cache key embeds the query's end date
+        marker = f"_{end_date}" if end_date else ""
+        return {name: {key: data for key, data in getattr(self, f"_{name}_cache").items() if key.startswith(prefixes) and marker in key} for name in CACHE_KEY_FIELDS}
+
+    def load(self, entries: dict[str, dict[str, list[dict[str, any]]]]):
+        """Merge entries produced by :meth:`export` into this cache."""
+        for name, cached in entries.items():
+            store = getattr(self, f"_{name}_cache")
+            for key, data in cached.items():
+                store[key] = self._merge_data(store.get(key), data, key_field=CACHE_KEY_FIELDS[name])
+
 
 # Global cache instance
 _cache = Cache()
@@ -0,0 +1,113 @@
+"""Time-indexed aggregates over company news and insider trades.
+
+Events are sorted by date once and stored as cumulative count arrays, so the
+counts for any ``[start_date, end_date]`` window (optionally capped to the
+latest ``limit`` events, the way the API paginates) take two binary searches
+instead of a rescan of every article or trade.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from src.data.models import CompanyNews, InsiderTrade
+
+# Headline keywords the persona agents treat as negative press
+NEGATIVE_HEADLINE_KEYWORDS = ("lawsuit", "fraud", "negative", "downturn", "decline", "investigation", "recall")
+
+POSITIVE_SENTIMENTS = ("positive", "看涨")
+NEGATIVE_SENTIMENTS = ("negative", "看跌")
+
+
+@dataclass(frozen=True)
+class NewsCounts:
+    total: int = 0
+    positive: int = 0
+    negative: int = 0
+    neutral: int = 0  # labelled, but neither positive nor negative
+    negative_headlines: int = 0  # titles containing NEGATIVE_HEADLINE_KEYWORDS
+
+    @property
+    def labelled(self) -> int:
+        return self.positive + self.negative + self.neutral
+
+
+@dataclass(frozen=True)
+class InsiderCounts:
+    total: int = 0
+    buys: int = 0
+    sells: int = 0
+    shares_bought: float = 0.0
+    shares_sold: float = 0.0  # absolute number of shares
+    with_shares: int = 0  # trades that report transaction_shares
+
+
+class EventIndex:
+    """Cumulative per-event columns ordered by event date."""
+
+    counts_type = None
+
+    def __init__(self, dates: list[str], columns: dict[str, list]):
+        order = np.argsort(np.asarray(dates, dtype="datetime64[D]"), kind="stable")
+        self.dates = np.asarray(dates, dtype="datetime64[D]")[order]
+        self.cumulative = {}
+        for name, values in columns.items():
+            values = np.asarray(values, dtype=float)[order]
+            self.cumulative[name] = np.concatenate(([0.0], np.cumsum(values)))
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+    def bounds(self, start_date: str | None = None, end_date: str | None = None, limit: int | None = None) -> tuple[int, int]:
+        """Positions ``[lo, hi)`` of the events in the window."""
+        hi = len(self.dates) if end_date is None else int(np.searchsorted(self.dates, np.datetime64(end_date[:10], "D"), side="right"))
+        lo = 0 if start_date is None else int(np.searchsorted(self.dates, np.datetime64(start_date[:10], "D"), side="left"))
+        if limit is not None:
+            lo = max(lo, hi - limit)
+        return lo, min(max(lo, hi), len(self.dates))
+
+    def window(self, start_date: str | None = None, end_date: str | None = None, limit: int | None = None):
+        lo, hi = self.bounds(start_date, end_date, limit)
+        values = {name: cum[hi] - cum[lo] for name, cum in self.cumulative.items()}
+        values["total"] = hi - lo
+        return self.counts_type(**{name: self._cast(name, value) for name, value in values.items()})
+
+    def _cast(self, name: str, value):
+        return int(round(value))
+
+
+class NewsIndex(EventIndex):
+    counts_type = NewsCounts
+
+    @classmethod
+    def from_news(cls, news: list[CompanyNews]) -> "NewsIndex":
+        columns = {"positive": [], "negative": [], "neutral": [], "negative_headlines": []}
+        for item in news:
+            sentiment = (item.sentiment or "").lower()
+            title = (item.title or "").lower()
+            columns["positive"].append(sentiment in POSITIVE_SENTIMENTS)
+            columns["negative"].append(sentiment in NEGATIVE_SENTIMENTS)
+            columns["neutral"].append(bool(sentiment) and sentiment not in POSITIVE_SENTIMENTS + NEGATIVE_SENTIMENTS)
+            columns["negative_headlines"].append(any(word in title for word in NEGATIVE_HEADLINE_KEYWORDS))
+        return cls([item.date[:10] for item in news], columns)
+
+
+class InsiderIndex(EventIndex):
+    counts_type = InsiderCounts
+
+    @classmethod
+    def from_trades(cls, trades: list[InsiderTrade]) -> "InsiderIndex":
+        columns = {"buys": [], "sells": [], "shares_bought": [], "shares_sold": [], "with_shares": []}
+        for trade in trades:
+            shares = trade.transaction_shares
+            columns["buys"].append(shares is not None and shares > 0)
+            columns["sells"].append(shares is not None and shares < 0)
+            columns["shares_bought"].append(shares if shares is not None and shares > 0 else 0.0)
+            columns["shares_sold"].append(-shares if shares is not None and shares < 0 else 0.0)
+            columns["with_shares"].append(shares is not None)
+        return cls([trade.filing_date[:10] for trade in trades], columns)
+
+    def _cast(self, name: str, value):
+        return round(float(value), 6) if name.startswith("shares_") else int(round(value))
@@ -0,0 +1,357 @@
+"""Persistent LangGraph checkpoints so failed runs can be resumed by run ID.
+
+A run started with a run ID is checkpointed after every superstep, and the
+writes of every finished node are saved as soon as it completes. Invoking
+the same run ID again:
+
+* resumes an interrupted run from its last checkpoint; nodes that already
+  finished (e.g. the analysts, when the portfolio manager failed) are not
+  executed again. That includes analysts that missed their deadline
+  (``src.graph.deadlines``): their placeholder signals are kept
+* returns the final state of a run that already completed
+* starts a new run when nothing is stored for the ID
+
+The store is chosen with the ``GRAPH_CHECKPOINT`` environment variable:
+
+* ``sqlite`` (default): ``GRAPH_CHECKPOINT_PATH`` (default ``.cache/checkpoints.sqlite``)
+* ``redis``: ``GRAPH_CHECKPOINT_REDIS_URL``, falling back to ``UPSTASH_REDIS_URL``
+* ``memory``: per-process only
+
+``GRAPH_CHECKPOINT_TTL`` sets how long runs are kept in seconds (default one
+week, ``0`` keeps them forever) and ``GRAPH_CHECKPOINT_FINISHED_TTL`` how long
+completed runs are kept (default one day). Runs are only held in memory while
+they execute; with the ``memory`` store, interrupted runs stay in memory until
+they are resumed.
+"""
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import ormsgpack
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+logger = logging.getLogger("ai-hedge-fund")
+
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_FINISHED_TTL = 24 * 60 * 60
+PURGE_INTERVAL = 60 * 60  # seconds between sweeps of expired SQLite runs
+
+
+def _pack(value) -> bytes:
+    return ormsgpack.packb(value)
+
+
+def _unpack(raw: bytes):
+    """Decodes a packed record part; arrays come back as the tuples the saver stores."""
+
+    def tuples(value):
+        return tuple(tuples(item) for item in value) if isinstance(value, list) else value
+
+    return tuples(ormsgpack.unpackb(raw))
+
+
+class CheckpointStore:
+    """Raw (kind, key) -> value records per run; subclasses implement persistence.
+
+    Keys are tuples of strings and numbers and values hold the saver's serialized
+    (type, bytes) pairs; both are stored as msgpack, so reading a store never
+    runs pickle.
+    """
+
+    def __init__(self, ttl: int = DEFAULT_TTL):
+        self.ttl = ttl
+
+    def load(self, run_id: str) -> list[tuple[str, tuple, object]]:
+        raise NotImplementedError
+
+    def save(self, run_id: str, records: list[tuple[str, tuple, object]]):
+        raise NotImplementedError
+
+    def delete(self, run_id: str):
+        raise NotImplementedError
+
+    def expire(self, run_id: str, seconds: int):
+        """Deletes the run ``seconds`` from now (sooner if the store's TTL runs out first)."""
+        raise NotImplementedError
+
+
+class SQLiteCheckpointStore(CheckpointStore):
+    def __init__(self, path: str | Path, ttl: int = DEFAULT_TTL):
+        super().__init__(ttl)
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._purged_at = 0.0
+        with self._lock, self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS checkpoint_records (run_id TEXT NOT NULL, kind TEXT NOT NULL, key BLOB NOT NULL, value BLOB NOT NULL, created_at REAL NOT NULL, PRIMARY KEY (run_id, kind, key))")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS checkpoint_expiry (run_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+        self.purge()
+
+    def purge(self):
+        """Deletes runs past their expiry or not updated within the TTL."""
+        now = time.time()
+        with self._lock, self.connection:
+            expired = "SELECT run_id FROM checkpoint_expiry WHERE expires_at < ?"
+            self.connection.execute(f"DELETE FROM checkpoint_records WHERE run_id IN ({expired})", (now,))
+            self.connection.execute("DELETE FROM checkpoint_expiry WHERE expires_at < ?", (now,))
+            if self.ttl:
+                self.connection.execute("DELETE FROM checkpoint_records WHERE run_id IN (SELECT run_id FROM checkpoint_records GROUP BY run_id HAVING MAX(created_at) < ?)", (now - self.ttl,))
+            self._purged_at = now
+
+    def load(self, run_id: str) -> list[tuple[str, tuple, object]]:
+        with self._lock:
+            rows = self.connection.execute("SELECT kind, key, value FROM checkpoint_records WHERE run_id = ?", (run_id,)).fetchall()
+        return [(kind, _unpack(key), _unpack(value)) for kind, key, value in rows]
+
+    def save(self, run_id: str, records: list[tuple[str, tuple, object]]):
+        now = time.time()
+        rows = [(run_id, kind, _pack(key), _pack(value), now) for kind, key, value in records]
+        with self._lock, self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO checkpoint_records VALUES (?, ?, ?, ?, ?)", rows)
+        if now - self._purged_at > PURGE_INTERVAL:
+            self.purge()
+
+    def delete(self, run_id: str):
+        with self._lock, self.connection:
+            self.connection.execute("DELETE FROM checkpoint_records WHERE run_id = ?", (run_id,))
+            self.connection.execute("DELETE FROM checkpoint_expiry WHERE run_id = ?", (run_id,))
+
+    def expire(self, run_id: str, seconds: int):
+        with self._lock, self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO checkpoint_expiry VALUES (?, ?)", (run_id, time.time() + seconds))
+
+
+class RedisCheckpointStore(CheckpointStore):
+    prefix = "graph_checkpoint:"
+
+    def __init__(self, redis_url: str, ttl: int = DEFAULT_TTL):
+        super().__init__(ttl)
+        import redis
+
+        self.client = redis.from_url(redis_url)
+
+    def load(self, run_id: str) -> list[tuple[str, tuple, object]]:
+        entries = self.client.hgetall(self.prefix + run_id)
+        return [(*_unpack(field), _unpack(value)) for field, value in entries.items()]
+
+    def save(self, run_id: str, records: list[tuple[str, tuple, object]]):
+        name = self.prefix + run_id
+        pipeline = self.client.pipeline()
+        pipeline.hset(name, mapping={_pack((kind, key)): _pack(value) for kind, key, value in records})
+        if self.ttl:
+            pipeline.expire(name, self.ttl)
+        pipeline.execute()
+
+    def delete(self, run_id: str):
+        self.client.delete(self.prefix + run_id)
+
+    def expire(self, run_id: str, seconds: int):
+        if not self.ttl or seconds < self.ttl:
+            self.client.expire(self.prefix + run_id, seconds)
+
+
+class PersistentCheckpointSaver(InMemorySaver):
+    """LangGraph's in-memory saver, with every checkpoint and write also saved to a :class:`CheckpointStore`.
+
+    Runs are loaded from the store the first time their thread (run ID) is accessed.
+    ``pickle_fallback`` lets state values msgpack cannot encode (the
+    backtester's IndicatorBook) be pickled; only enable it for runs whose store
+    nobody else can write to, since loading such a run unpickles it.
+    """
+
+    def __init__(self, store: CheckpointStore | None, finished_ttl: int = DEFAULT_FINISHED_TTL, pickle_fallback: bool = False):
+        super().__init__(serde=JsonPlusSerializer(pickle_fallback=pickle_fallback))
+        self.store = store
+        self.finished_ttl = finished_ttl
+        self._loaded: set[str] = set()
+        self._lock = threading.RLock()
+
+    def _ensure_loaded(self, config):
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        if self.store is None or thread_id is None or thread_id in self._loaded:
+            return
+        with self._lock:
+            if thread_id in self._loaded:
+                return
+            try:
+                records = self.store.load(thread_id)
+            except Exception as e:
+                logger.warning(f"检查点读取失败 (run {thread_id}), 重新开始: {e}")
+                records = []
+            for kind, key, value in records:
+                if kind == "checkpoint":
+                    checkpoint_ns, checkpoint_id = key
+                    self.storage[thread_id][checkpoint_ns][checkpoint_id] = value
+                elif kind == "write":
+                    checkpoint_ns, checkpoint_id, task_id, index = key
+                    self.writes[(thread_id, checkpoint_ns, checkpoint_id)][(task_id, index)] = value
+                elif kind == "blob":
+                    self.blobs[(thread_id, *key)] = value
+            self._loaded.add(thread_id)
+
+    def get_tuple(self, config):
+        self._ensure_loaded(config)
+        return super().get_tuple(config)
+
+    def list(self, config, **kwargs):
+        self._ensure_loaded(config)
+        return super().list(config, **kwargs)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        self._ensure_loaded(config)
+        with self._lock:
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+        if self.store is not None:
+            thread_id, checkpoint_ns = config["configurable"]["thread_id"], config["configurable"]["checkpoint_ns"]
+            records = [("checkpoint", (checkpoint_ns, checkpoint["id"]), self.storage[thread_id][checkpoint_ns][checkpoint["id"]])]
+            records += [("blob", (checkpoint_ns, channel, version), self.blobs[(thread_id, checkpoint_ns, channel, version)]) for channel, version in new_versions.items()]
+            self._save(thread_id, records)
+        return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        self._ensure_loaded(config)
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+        if self.store is not None:
+            thread_id = config["configurable"]["thread_id"]
+            checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+            checkpoint_id = config["configurable"]["checkpoint_id"]
+            saved = self.writes[(thread_id, checkpoint_ns, checkpoint_id)]
+            records = [("write", (checkpoint_ns, checkpoint_id, *inner_key), value) for inner_key, value in saved.items() if inner_key[0] == task_id]
+            self._save(thread_id, records)
+
+    def delete_thread(self, thread_id: str):
+        with self._lock:
+            super().delete_thread(thread_id)
+            self.blobs = type(self.blobs)({key: value for key, value in self.blobs.items() if key[0] != thread_id})
+        if self.store is not None:
+            self.store.delete(thread_id)
+
+    def release(self, thread_id: str, finished: bool):
+        """Drops a run from memory once it stops executing; the store keeps it for resuming.
+
+        Finished runs are kept in the store for ``finished_ttl`` seconds. Without
+        a store an interrupted run stays in memory so it can still be resumed.
+        """
+        if self.store is None:
+            # Looking up an unknown run leaves empty entries behind
+            if finished or not any(self.storage.get(thread_id, {}).values()):
+                with self._lock:
+                    super().delete_thread(thread_id)
+            return
+        with self._lock:
+            super().delete_thread(thread_id)
+            self._loaded.discard(thread_id)
+        if finished and self.finished_ttl:
+            try:
+                self.store.expire(thread_id, self.finished_ttl)
+            except Exception as e:
+                logger.warning(f"检查点过期设置失败 (run {thread_id}): {e}")
+
+    def _save(self, thread_id: str, records: list):
+        try:
+            self.store.save(thread_id, records)
+        except Exception as e:
+            # The run itself can go on; it just may not be resumable
+            logger.warning(f"检查点保存失败 (run {thread_id}): {e}")
+
+
+def create_checkpoint_store_from_env() -> CheckpointStore | None:
+    backend = os.getenv("GRAPH_CHECKPOINT", "sqlite").lower()
+    ttl = int(os.getenv("GRAPH_CHECKPOINT_TTL", DEFAULT_TTL))
+    if backend == "redis":
+        redis_url = os.getenv("GRAPH_CHECKPOINT_REDIS_URL") or os.getenv("UPSTASH_REDIS_URL", "redis://localhost:6379")
+        try:
+            return RedisCheckpointStore(redis_url, ttl)
+        except Exception as e:
+            logger.warning(f"Redis checkpoint store unavailable ({e}), falling back to sqlite")
+    if backend == "memory":
+        return None
+    return SQLiteCheckpointStore(os.getenv("GRAPH_CHECKPOINT_PATH", ".cache/checkpoints.sqlite"), ttl)
+
+
+_checkpointers: dict[bool, PersistentCheckpointSaver] = {}
+_checkpointer_lock = threading.Lock()
+
+
+def get_checkpointer(pickle_fallback: bool = False) -> PersistentCheckpointSaver:
+    """The process-wide checkpoint saver, created from the environment on first use.
+
+    ``pickle_fallback`` is only for state that msgpack cannot encode (the
+    backtester's IndicatorBook); the API server never uses it.
+    """
+    with _checkpointer_lock:
+        if pickle_fallback not in _checkpointers:
+            finished_ttl = int(os.getenv("GRAPH_CHECKPOINT_FINISHED_TTL", DEFAULT_FINISHED_TTL))
+            _checkpointers[pickle_fallback] = PersistentCheckpointSaver(create_checkpoint_store_from_env(), finished_ttl, pickle_fallback)
+        return _checkpointers[pickle_fallback]
+
+
+class RunInProgressError(RuntimeError):
+    pass
+
+
+_running: set[str] = set()
+_running_lock = threading.Lock()
+
+
+@contextmanager
+def _claim(run_id: str):
+    """Marks run ``run_id`` as being executed for the duration of the block."""
+    with _running_lock:
+        if run_id in _running:
+            raise RunInProgressError(f"运行 {run_id} 正在进行中")
+        _running.add(run_id)
+    try:
+        yield
+    finally:
+        with _running_lock:
+            _running.discard(run_id)
+
+
+def stored_run(graph, run_id: str) -> dict | None:
+    """State checkpointed for run ``run_id``, or ``None`` when nothing is stored for it.
+
+    The run is not kept in memory afterwards. Raises :class:`RunInProgressError`
+    if the run is being executed.
+    """
+    with _claim(run_id):
+        try:
+            return graph.get_state({"configurable": {"thread_id": run_id}}).values or None
+        finally:
+            if isinstance(graph.checkpointer, PersistentCheckpointSaver):
+                graph.checkpointer.release(run_id, finished=False)
+
+
+def invoke_resumable(graph, graph_input: dict, run_id: str, config: dict | None = None) -> dict:
+    """Runs ``graph`` as run ``run_id``: resumes it if it was interrupted, returns its result if it already finished.
+
+    Raises :class:`RunInProgressError` if the run is already being executed.
+    """
+    with _claim(run_id):
+        finished = False
+        try:
+            result = _invoke_resumable(graph, graph_input, run_id, config)
+            finished = True
+            return result
+        finally:
+            if isinstance(graph.checkpointer, PersistentCheckpointSaver):
+                graph.checkpointer.release(run_id, finished)
+
+
+def _invoke_resumable(graph, graph_input: dict, run_id: str, config: dict | None) -> dict:
+    config = {**(config or {}), "configurable": {"thread_id": run_id}}
+    snapshot = graph.get_state(config)
+    if snapshot.values and not snapshot.next:
+        logger.info(f"运行 {run_id} 已完成, 直接返回检查点结果")
+        return snapshot.values
+    if snapshot.next:
+        logger.info(f"从检查点恢复运行 {run_id}, 待执行节点: {', '.join(snapshot.next)}")
+        return graph.invoke(None, config)
+    return graph.invoke(graph_input, config)
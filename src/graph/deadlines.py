@@ -0,0 +1,111 @@
+"""Per-node and per-run time budgets for analyst nodes.
+
+An analyst node wrapped with :func:`with_deadline` runs in its own thread and
+gets until the earlier of its node budget and the run's deadline. When it
+misses the deadline the graph moves on with a neutral placeholder signal
+marked ``"missing": True`` for each of its tickers; the portfolio manager
+leaves those out and is told which analysts are missing. The late thread is
+not killed (a blocked provider call cannot be interrupted) but runs under a
+:func:`~src.utils.cancellation.work_deadline`: its in-flight LLM call is
+abandoned at the deadline (and recorded as cancelled), it makes no further
+attempts, and its progress updates are dropped. Its result is discarded.
+
+The placeholder is the node's result as far as the graph is concerned, so it
+is checkpointed like any other: resuming the run (``src.graph.checkpoint``)
+does not run a timed-out analyst again. Start a new run to retry it.
+
+Budgets (seconds) come from ``state["metadata"]["node_timeout"]`` (a number,
+or a mapping of agent name to number with an optional ``"default"``) and the
+``run_deadline`` block entered around the graph invocation, falling back to
+``NODE_TIMEOUT`` / ``RUN_TIMEOUT``. ``0`` or unset means no limit.
+"""
+
+import functools
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+
+from src.utils.cancellation import work_deadline
+from src.utils.progress import progress
+
+logger = logging.getLogger("ai-hedge-fund")
+
+MISSING_SIGNAL = "中立"
+
+_run_deadline: ContextVar[float | None] = ContextVar("run_deadline", default=None)
+
+
+@contextmanager
+def run_deadline(seconds: float | None = None):
+    """Sets the deadline for every node executed inside the block; ``None`` reads ``RUN_TIMEOUT``."""
+    if seconds is None:
+        seconds = float(os.getenv("RUN_TIMEOUT", "0"))
+    token = _run_deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _run_deadline.reset(token)
+
+
+def node_timeout(state, agent_name: str) -> float | None:
+    """Seconds ``agent_name`` may take, from its own budget and the remaining run budget."""
+    setting = (state or {}).get("metadata", {}).get("node_timeout")
+    if isinstance(setting, dict):
+        setting = setting.get(agent_name, setting.get("default"))
+    if setting is None:
+        setting = os.getenv("NODE_TIMEOUT", "0")
+    budgets = [float(setting)] if float(setting) > 0 else []
+    deadline = _run_deadline.get()
+    if deadline is not None:
+        budgets.append(max(deadline - time.monotonic(), 0.0))
+    return min(budgets) if budgets else None
+
+
+def missing_signals(agent_name: str, tickers: list[str], timeout: float) -> dict:
+    """Neutral placeholder signals for an analyst that did not finish in time."""
+    return {
+        ticker: {
+            "signal": MISSING_SIGNAL,
+            "confidence": 0,
+            "reasoning": f"{agent_name} 未在 {timeout:.0f} 秒内完成, 无信号",
+            "missing": True,
+        }
+        for ticker in tickers
+    }
+
+
+def with_deadline(node_name: str, func):
+    """Wraps an analyst node so it returns placeholder signals instead of stalling the graph past its deadline."""
+
+    @functools.wraps(func)
+    def wrapper(state):
+        timeout = node_timeout(state, node_name)
+        if timeout is None:
+            return func(state)
+
+        outcome = {}
+
+        def run():
+            try:
+                with work_deadline(timeout):
+                    outcome["result"] = func(state)
+            except BaseException as e:
+                outcome["error"] = e
+
+        worker = threading.Thread(target=copy_context().run, args=(run,), name=f"{node_name}-deadline", daemon=True)
+        worker.start()
+        worker.join(timeout)
+        if worker.is_alive():
+            tickers = state["data"]["tickers"]
+            logger.warning(f"{node_name} 超过 {timeout:.1f}s 未完成, 以缺失信号继续 ({', '.join(tickers)})")
+            for ticker in tickers:
+                progress.update_status(node_name, ticker, "Timed out")
+            return {"analyst_signals": {node_name: missing_signals(node_name, tickers, timeout)}}
+        if "error" in outcome:
+            raise outcome["error"]
+        return outcome["result"]
+
+    return wrapper
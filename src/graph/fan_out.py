@@ -0,0 +1,57 @@
+"""Per-(analyst, ticker) fan-out for the hedge fund graph.
+
+Instead of one node per analyst looping over every ticker, the start node
+sends one ``analyst_task`` per (analyst, ticker) pair with LangGraph's Send
+API. Each task runs the analyst on a single-ticker copy of the state; its
+signals are merged into the ``analyst_signals`` channel by the channel's
+reducer before risk management runs. How many tasks run at once is bounded
+by the ``max_concurrency`` run config.
+"""
+
+from typing import Callable
+
+from langgraph.graph import StateGraph
+from langgraph.types import Send
+
+from src.graph.state import AgentState
+
+
+def add_analyst_fan_out(
+    workflow: StateGraph,
+    analyst_nodes: dict[str, Callable],
+    source: str = "start_node",
+    target: str = "risk_management_agent",
+):
+    """
+    Wires ``source`` -> one task per (analyst, ticker) -> ``target``.
+
+    Args:
+        analyst_nodes: Analyst node name -> agent function
+    """
+
+    def dispatch(state: AgentState) -> list[Send] | str:
+        data = state["data"]
+        if not analyst_nodes or not data["tickers"]:
+            return target
+        return [
+            Send(
+                "analyst_task",
+                {
+                    "analyst": node_name,
+                    "messages": state["messages"],
+                    # Each task sees only its ticker
+                    "data": {**data, "tickers": [ticker]},
+                    "metadata": state["metadata"],
+                },
+            )
+            for node_name in analyst_nodes
+            for ticker in data["tickers"]
+        ]
+
+    def analyst_task(task: dict) -> dict:
+        agent_state = {"messages": task["messages"], "data": task["data"], "metadata": task["metadata"]}
+        return analyst_nodes[task["analyst"]](agent_state)
+
+    workflow.add_node("analyst_task", analyst_task)
+    workflow.add_conditional_edges(source, dispatch, ["analyst_task", target])
+    workflow.add_edge("analyst_task", target)
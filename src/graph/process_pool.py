@@ -0,0 +1,136 @@
+"""Runs CPU-bound analyst nodes in a warm process pool.
+
+The numeric analysts (technicals, fundamentals, valuation) are pure Python and
+pandas work that contends for the GIL with the threads LangGraph and the API
+server run nodes on. With ``metadata["process_pool"]`` set, nodes wrapped with
+:func:`in_process_pool` run in a long-lived pool of worker processes instead,
+so their CPU work scales with cores:
+
+* the worker's data cache is seeded with the parent's cached API responses for
+  the node's tickers and end date (the only ones it can read), and responses
+  the worker fetched itself are merged back into the parent's cache
+* signals stored for reuse (``--reuse-signals``) go to the disk signal store,
+  since a worker's in-memory store is not seen by the other workers
+* progress updates and LLM call records made in the worker are replayed in the
+  parent once the node finishes, so handlers and telemetry still see them
+* a node deadline (``src.graph.deadlines``) applies in the worker too
+* the node's state update (signals and messages) comes back as plain data
+
+Workers are spawned on first use and kept for the life of the process.
+``PROCESS_POOL_WORKERS`` sets their number (default: CPU count) and
+``PROCESS_POOL_NODES`` (comma-separated node names) which nodes use the pool.
+Calls whose metadata holds an object the node updates in place (the
+backtester's ``indicator_book``) run in the calling thread.
+"""
+
+import functools
+import logging
+import multiprocessing
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from src.data.cache import get_cache
+from src.graph.signal_reuse import signal_inputs
+from src.llm.telemetry import record_call, telemetry_run
+from src.utils.cancellation import time_left, work_deadline
+from src.utils.progress import progress, progress_run
+
+logger = logging.getLogger("ai-hedge-fund")
+
+DEFAULT_PROCESS_NODES = ("technical_analyst_agent", "fundamentals_analyst_agent", "valuation_analyst_agent")
+
+# Metadata objects updated in place -> nodes that update them; other nodes run without them
+STATEFUL_METADATA = {"indicator_book": ("technical_analyst_agent",)}
+
+
+def process_nodes() -> set[str]:
+    """Names of the nodes that run in the pool when it is enabled."""
+    setting = os.getenv("PROCESS_POOL_NODES")
+    if not setting:
+        return set(DEFAULT_PROCESS_NODES)
+    return {name.strip() for name in setting.split(",") if name.strip()}
+
+
+_pool: ProcessPoolExecutor | None = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool() -> ProcessPoolExecutor:
+    """The process-wide worker pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            workers = int(os.getenv("PROCESS_POOL_WORKERS", "0")) or os.cpu_count() or 1
+            # spawn: forking a process that is running threads can deadlock the child
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_warm_worker)
+        return _pool
+
+
+def shutdown_process_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _warm_worker():
+    # Workers share reusable signals through the disk store; an in-memory one would be per worker
+    os.environ["SIGNAL_STORE"] = "disk"
+    # Import every agent (pandas, numpy, LangChain) once per worker rather than on its first task
+    import src.utils.analysts  # noqa: F401
+
+
+def _run_in_worker(func, state: dict, cache_entries: dict, timeout: float | None = None) -> dict:
+    """Runs ``func(state)`` in a worker process and returns its update with the side effects to replay."""
+    cache = get_cache()
+    cache.load(cache_entries)
+    events = []
+    task_id = uuid.uuid4().hex
+    handler = progress.register_handler(lambda agent_name, ticker, status, analysis, timestamp: events.append((agent_name, ticker, status, analysis)), run_id=task_id)
+    try:
+        with progress_run(task_id), telemetry_run() as telemetry, signal_inputs(state), work_deadline(timeout):
+            update = func(state)
+    finally:
+        progress.unregister_handler(handler, run_id=task_id)
+
+    # Only send back what the parent does not already have
+    fetched = {}
+    for name, entries in cache.export(state["data"]["tickers"], state["data"]["end_date"]).items():
+        seeded = cache_entries.get(name, {})
+        fetched[name] = {key: data for key, data in entries.items() if len(data) != len(seeded.get(key, ()))}
+    return {"update": update, "progress": events, "llm_calls": telemetry.records, "cache": fetched}
+
+
+def in_process_pool(node_name: str, func):
+    """Wraps a graph node so it runs in the worker pool when ``metadata["process_pool"]`` is set."""
+
+    @functools.wraps(func)
+    def wrapper(state):
+        metadata = state["metadata"]
+        if not metadata.get("process_pool") or node_name not in process_nodes():
+            return func(state)
+        if any(metadata.get(key) is not None and node_name in nodes for key, nodes in STATEFUL_METADATA.items()):
+            return func(state)
+
+        worker_state = {**state, "metadata": {key: value for key, value in metadata.items() if key not in STATEFUL_METADATA}}
+        cache = get_cache()
+        try:
+            cache_entries = cache.export(state["data"]["tickers"], state["data"]["end_date"])
+            outcome = get_process_pool().submit(_run_in_worker, func, worker_state, cache_entries, time_left()).result()
+        except BrokenProcessPool as e:
+            logger.warning(f"{node_name} 进程池不可用 ({e}), 改为在当前线程运行")
+            shutdown_process_pool()
+            return func(state)
+
+        cache.load(outcome["cache"])
+        for agent_name, ticker, status, analysis in outcome["progress"]:
+            progress.update_status(agent_name, ticker, status, analysis)
+        for record in outcome["llm_calls"]:
+            record_call(record)
+        return outcome["update"]
+
+    return wrapper
@@ -0,0 +1,193 @@
+"""Reuse of analyst signals whose inputs have not changed.
+
+Fundamentals-driven analysts produce the same analysis every day until a new
+report lands, yet a backtest asks them again (LLM calls included) on every
+business day. With ``metadata["reuse_signals"]`` set, nodes wrapped with
+:func:`with_signal_reuse` record what the data fetchers in ``src.tools.api``
+(decorated with :func:`record_input`) return for each ticker: financial
+metrics, line items, the market cap rounded to a ``MARKET_CAP_BUCKET`` step,
+and any price, news or insider data the agent reads. A fingerprint of those
+inputs, together with the agent, ticker and whatever else determines the
+answer (model, escalation policy), keys a stored signal:
+
+* :func:`src.utils.llm.call_llm_for_tickers` answers tickers that have a stored
+  signal without calling the LLM, and stores the new ones
+* the valuation agent skips its models for such tickers
+
+Agents that read prices or news get a new fingerprint whenever those change, so
+their signals are only reused when nothing they look at moved.
+
+The store is chosen with ``SIGNAL_STORE``: ``memory`` (default, per process)
+or ``disk`` (``SIGNAL_STORE_DIR``, default ``.cache/signals``), which lets
+backtest reruns share signals. Process pool workers always use the disk store.
+``SIGNAL_STORE_SIZE`` caps how many signals are held in memory (default
+10000, least recently used dropped first, ``0`` for no cap); the disk store
+keeps every signal on disk.
+"""
+
+import dataclasses
+import functools
+import hashlib
+import json
+import math
+import os
+import threading
+from collections import OrderedDict, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+# Relative width of a market cap bucket; caps within the same bucket fingerprint equally
+MARKET_CAP_BUCKET = 0.05
+
+DEFAULT_STORE_SIZE = 10_000
+
+_inputs: ContextVar[dict | None] = ContextVar("signal_inputs", default=None)
+_in_fetch: ContextVar[bool] = ContextVar("signal_input_in_fetch", default=False)
+
+
+def market_cap_bucket(market_cap: float | None) -> int | None:
+    if not market_cap or market_cap <= 0:
+        return None
+    return round(math.log(market_cap) / math.log1p(MARKET_CAP_BUCKET))
+
+
+def _canonical(value):
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    if hasattr(value, "model_dump"):
+        return value.model_dump()
+    if dataclasses.is_dataclass(value):
+        return dataclasses.asdict(value)
+    return value
+
+
+@contextmanager
+def signal_inputs(state):
+    """Records the fetched inputs of the agent run inside the block when the run reuses signals."""
+    if not (state or {}).get("metadata", {}).get("reuse_signals"):
+        yield
+        return
+    token = _inputs.set(defaultdict(list))
+    try:
+        yield
+    finally:
+        _inputs.reset(token)
+
+
+def with_signal_reuse(node_name: str, func):
+    """Wraps an analyst node so its fetched inputs can be fingerprinted."""
+
+    @functools.wraps(func)
+    def wrapper(state):
+        with signal_inputs(state):
+            return func(state)
+
+    return wrapper
+
+
+def record_input(func):
+    """Adds the result of a data fetch (first argument: ticker) to the calling agent's inputs for that ticker."""
+
+    @functools.wraps(func)
+    def wrapper(ticker, *args, **kwargs):
+        inputs = _inputs.get()
+        if inputs is None or _in_fetch.get():
+            return func(ticker, *args, **kwargs)
+        # Fetches made by this one (get_market_cap reading metrics) are covered by its result
+        token = _in_fetch.set(True)
+        try:
+            result = func(ticker, *args, **kwargs)
+        finally:
+            _in_fetch.reset(token)
+        value = market_cap_bucket(result) if func.__name__ == "get_market_cap" else _canonical(result)
+        inputs[ticker].append((func.__name__, value))
+        return result
+
+    return wrapper
+
+
+def signal_key(agent_name: str, ticker: str, *context) -> str | None:
+    """Key of ``agent_name``'s signal for the inputs recorded for ``ticker``, or ``None`` when nothing was recorded."""
+    inputs = _inputs.get()
+    if inputs is None or ticker not in inputs:
+        return None
+    payload = {"agent": agent_name, "ticker": ticker, "context": context, "inputs": inputs[ticker]}
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class SignalStore:
+    """Per-process signal store holding up to ``max_size`` signals; subclasses persist signals across runs."""
+
+    def __init__(self, max_size: int = DEFAULT_STORE_SIZE):
+        self.max_size = max_size
+        self._signals: OrderedDict[str, dict] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> dict | None:
+        with self._lock:
+            signal = self._signals.get(key)
+            if signal is not None:
+                self._signals.move_to_end(key)
+            return signal
+
+    def set(self, key: str, signal: dict):
+        with self._lock:
+            self._signals[key] = signal
+            self._signals.move_to_end(key)
+            while self.max_size and len(self._signals) > self.max_size:
+                self._signals.popitem(last=False)
+
+
+class DiskSignalStore(SignalStore):
+    def __init__(self, directory: str | Path, max_size: int = DEFAULT_STORE_SIZE):
+        super().__init__(max_size)
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        if (signal := super().get(key)) is not None:
+            return signal
+        path = self._path(key)
+        if not path.exists():
+            return None
+        signal = json.loads(path.read_text(encoding="utf-8"))
+        super().set(key, signal)
+        return signal
+
+    def set(self, key: str, signal: dict):
+        super().set(key, signal)
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(signal, ensure_ascii=False, default=str), encoding="utf-8")
+        tmp.replace(path)
+
+
+_store: SignalStore | None = None
+_store_lock = threading.Lock()
+
+
+def get_signal_store() -> SignalStore:
+    """The process-wide signal store, created from the environment on first use."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            max_size = int(os.getenv("SIGNAL_STORE_SIZE", DEFAULT_STORE_SIZE))
+            if os.getenv("SIGNAL_STORE", "memory").lower() == "disk":
+                _store = DiskSignalStore(os.getenv("SIGNAL_STORE_DIR", ".cache/signals"), max_size)
+            else:
+                _store = SignalStore(max_size)
+        return _store
+
+
+def stored_signal(key: str | None) -> dict | None:
+    return None if key is None else get_signal_store().get(key)
+
+
+def store_signal(key: str | None, signal: dict):
+    if key is not None:
+        get_signal_store().set(key, signal)
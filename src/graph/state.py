@@ -1,7 +1,7 @@
 from typing_extensions import Annotated, Sequence, TypedDict
 
-import operator
 from langchain_core.messages import BaseMessage
+from langgraph.graph.message import add_messages
 
 
 import json
@@ -11,11 +11,31 @@ def merge_dicts(a: dict[str, any], b: dict[str, any]) -> dict[str, any]:
     return {**a, **b}
 
 
+def merge_analyst_signals(a: dict[str, dict], b: dict[str, dict]) -> dict[str, dict]:
+    """Merges ``{agent: {ticker: signal}}`` maps one level deep."""
+    merged = {agent: dict(signals) for agent, signals in (a or {}).items()}
+    for agent, signals in (b or {}).items():
+        merged.setdefault(agent, {}).update(signals)
+    return merged
+
+
+def agent_messages(state, message: BaseMessage) -> list[BaseMessage]:
+    """An agent's output message, kept only when ``metadata["keep_agent_messages"]`` is set.
+
+    Signals travel through the ``analyst_signals`` channel, so the message
+    history normally holds just the input and the portfolio manager's decisions.
+    """
+    return [message] if state["metadata"].get("keep_agent_messages") else []
+
+
 # Define agent state
 class AgentState(TypedDict):
-    messages: Annotated[Sequence[BaseMessage], operator.add]
+    # Deduplicated by message ID, so copies made by checkpoints or worker processes are not appended again
+    messages: Annotated[Sequence[BaseMessage], add_messages]
     data: Annotated[dict[str, any], merge_dicts]
     metadata: Annotated[dict[str, any], merge_dicts]
+    # agent -> ticker -> signal, written by each analyst and the risk manager
+    analyst_signals: Annotated[dict[str, dict], merge_analyst_signals]
 
 
 def show_agent_reasoning(output, agent_name):
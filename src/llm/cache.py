@@ -0,0 +1,224 @@
+"""Content-addressed cache for structured LLM responses.
+
+Responses are keyed by a hash of the provider, model, fully rendered prompt
+and output schema, so identical requests (backtest reruns, several users
+analysing the same ticker on the same date) are answered without calling the
+provider. The backend is chosen with the ``LLM_CACHE`` environment variable:
+
+* ``memory`` (default): per-process dictionary
+* ``disk``: one JSON file per entry under ``LLM_CACHE_DIR`` (default ``.cache/llm``)
+* ``redis``: ``LLM_CACHE_REDIS_URL``, falling back to ``UPSTASH_REDIS_URL``
+* ``off``: disabled
+
+``LLM_CACHE_TTL`` sets the entry lifetime in seconds (default one day, ``0``
+keeps entries forever). ``LLM_CACHE_SIZE`` caps the entries of the memory
+cache (default 10000, least recently used dropped first, ``0`` for no cap).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from pydantic import BaseModel
+
+logger = logging.getLogger("ai-hedge-fund")
+
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MEMORY_SIZE = 10_000
+SWEEP_INTERVAL = 60  # seconds between sweeps of expired memory entries
+
+
+def render_prompt(prompt) -> list[dict[str, str]]:
+    """Normalize a prompt (string, message list or prompt value) to role/content pairs."""
+    if hasattr(prompt, "to_messages"):
+        prompt = prompt.to_messages()
+    if isinstance(prompt, str):
+        return [{"role": "human", "content": prompt}]
+    rendered = []
+    for message in prompt:
+        if isinstance(message, tuple):
+            role, content = message
+        else:
+            role, content = getattr(message, "type", type(message).__name__), getattr(message, "content", message)
+        rendered.append({"role": str(role), "content": content if isinstance(content, str) else json.dumps(content, sort_keys=True, default=str)})
+    return rendered
+
+
+def cache_key(model_provider: str, model_name: str, prompt, pydantic_model: type[BaseModel]) -> str:
+    """SHA-256 of everything that determines the response."""
+    payload = {
+        "provider": str(model_provider),
+        "model": model_name,
+        "messages": render_prompt(prompt),
+        "schema": pydantic_model.model_json_schema(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """Stores serialized responses; subclasses implement the raw get/set."""
+
+    def __init__(self, ttl: int = DEFAULT_TTL):
+        self.ttl = ttl
+
+    def get(self, key: str, pydantic_model: type[BaseModel]) -> BaseModel | None:
+        try:
+            raw = self._get(key)
+        except Exception as e:
+            logger.warning(f"LLM cache read failed: {e}")
+            return None
+        if raw is None:
+            return None
+        try:
+            return pydantic_model.model_validate_json(raw)
+        except ValueError:
+            # Schema changed in a compatible-looking way; treat as a miss
+            return None
+
+    def set(self, key: str, value: BaseModel):
+        try:
+            self._set(key, value.model_dump_json())
+        except Exception as e:
+            logger.warning(f"LLM cache write failed: {e}")
+
+    def _expires_at(self) -> float | None:
+        return time.time() + self.ttl if self.ttl else None
+
+    def _get(self, key: str) -> str | None:
+        raise NotImplementedError
+
+    def _set(self, key: str, raw: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryLLMCache(LLMCache):
+    def __init__(self, ttl: int = DEFAULT_TTL, max_size: int = DEFAULT_MEMORY_SIZE):
+        super().__init__(ttl)
+        self.max_size = max_size
+        self._entries: OrderedDict[str, tuple[float | None, str]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._swept_at = time.time()
+
+    def _get(self, key: str) -> str | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, raw = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return raw
+
+    def _set(self, key: str, raw: str):
+        now = time.time()
+        with self._lock:
+            if self.ttl and now - self._swept_at > SWEEP_INTERVAL:
+                # Entries that are never read again would otherwise stay until evicted
+                for expired in [k for k, (expires_at, _) in self._entries.items() if expires_at is not None and expires_at < now]:
+                    del self._entries[expired]
+                self._swept_at = now
+            self._entries[key] = (self._expires_at(), raw)
+            self._entries.move_to_end(key)
+            while self.max_size and len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class DiskLLMCache(LLMCache):
+    def __init__(self, directory: str | Path, ttl: int = DEFAULT_TTL):
+        super().__init__(ttl)
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _get(self, key: str) -> str | None:
+        path = self._path(key)
+        if not path.exists():
+            return None
+        entry = json.loads(path.read_text(encoding="utf-8"))
+        if entry["expires_at"] is not None and entry["expires_at"] < time.time():
+            path.unlink(missing_ok=True)
+            return None
+        return entry["response"]
+
+    def _set(self, key: str, raw: str):
+        path = self._path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent readers never see a partial file
+        tmp = path.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps({"expires_at": self._expires_at(), "response": raw}), encoding="utf-8")
+        tmp.replace(path)
+
+    def clear(self):
+        for path in self.directory.glob("*/*.json"):
+            path.unlink(missing_ok=True)
+
+
+class RedisLLMCache(LLMCache):
+    prefix = "llm_cache:"
+
+    def __init__(self, redis_url: str, ttl: int = DEFAULT_TTL):
+        super().__init__(ttl)
+        import redis
+
+        self.client = redis.from_url(redis_url, decode_responses=True)
+
+    def _get(self, key: str) -> str | None:
+        return self.client.get(self.prefix + key)
+
+    def _set(self, key: str, raw: str):
+        self.client.set(self.prefix + key, raw, ex=self.ttl or None)
+
+    def clear(self):
+        for key in self.client.scan_iter(f"{self.prefix}*"):
+            self.client.delete(key)
+
+
+def create_llm_cache_from_env() -> LLMCache | None:
+    backend = os.getenv("LLM_CACHE", "memory").lower()
+    ttl = int(os.getenv("LLM_CACHE_TTL", DEFAULT_TTL))
+    if backend in ("off", "none", "0", "false"):
+        return None
+    if backend == "disk":
+        return DiskLLMCache(os.getenv("LLM_CACHE_DIR", ".cache/llm"), ttl)
+    if backend == "redis":
+        redis_url = os.getenv("LLM_CACHE_REDIS_URL") or os.getenv("UPSTASH_REDIS_URL", "redis://localhost:6379")
+        try:
+            return RedisLLMCache(redis_url, ttl)
+        except Exception as e:
+            logger.warning(f"Redis LLM cache unavailable ({e}), falling back to memory")
+    return MemoryLLMCache(ttl, int(os.getenv("LLM_CACHE_SIZE", DEFAULT_MEMORY_SIZE)))
+
+
+_llm_cache: LLMCache | None = None
+_configured = False
+
+
+def get_llm_cache() -> LLMCache | None:
+    """The process-wide response cache, created from the environment on first use."""
+    global _llm_cache, _configured
+    if not _configured:
+        _llm_cache = create_llm_cache_from_env()
+        _configured = True
+    return _llm_cache
+
+
+def set_llm_cache(cache: LLMCache | None):
+    """Replace the process-wide cache (``None`` disables caching)."""
+    global _llm_cache, _configured
+    _llm_cache = cache
+    _configured = True
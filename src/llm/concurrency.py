@@ -0,0 +1,55 @@
+"""Per-provider and per-model concurrency limits for async LLM calls.
+
+Limits are asyncio semaphores, kept per event loop so the backend loop and
+the loop that serves synchronous callers do not share (or break) each other's
+primitives. Defaults can be overridden with ``LLM_PROVIDER_CONCURRENCY`` and
+``LLM_MODEL_CONCURRENCY``.
+"""
+
+import asyncio
+import os
+import threading
+import weakref
+from contextlib import asynccontextmanager
+
+DEFAULT_PROVIDER_CONCURRENCY = 16
+DEFAULT_MODEL_CONCURRENCY = 8
+
+# Providers that need a tighter limit than the default (local inference)
+PROVIDER_CONCURRENCY = {
+    "ollama": 2,
+}
+
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+_lock = threading.Lock()
+
+
+def provider_limit(model_provider: str) -> int:
+    if value := os.getenv("LLM_PROVIDER_CONCURRENCY"):
+        return max(1, int(value))
+    return PROVIDER_CONCURRENCY.get(str(model_provider).lower(), DEFAULT_PROVIDER_CONCURRENCY)
+
+
+def model_limit(model_name: str) -> int:
+    if value := os.getenv("LLM_MODEL_CONCURRENCY"):
+        return max(1, int(value))
+    return DEFAULT_MODEL_CONCURRENCY
+
+
+def _semaphore(kind: str, name: str, limit: int) -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    with _lock:
+        per_loop = _semaphores.setdefault(loop, {})
+        key = (kind, name)
+        if key not in per_loop:
+            per_loop[key] = asyncio.Semaphore(limit)
+        return per_loop[key]
+
+
+@asynccontextmanager
+async def llm_slot(model_provider: str, model_name: str):
+    """Hold one provider slot and one model slot for the duration of a call."""
+    provider = str(model_provider).lower()
+    async with _semaphore("provider", provider, provider_limit(provider)):
+        async with _semaphore("model", f"{provider}:{model_name}", model_limit(model_name)):
+            yield
@@ -0,0 +1,101 @@
+"""Confidence-gated LLM escalation for the persona agents.
+
+Every persona agent reduces its analysis to a deterministic ``score`` out of
+``max_score`` before asking the LLM for a signal. The escalation policy decides
+which tickers actually need that call:
+
+* ``always`` (default): every ticker goes to the LLM
+* ``never``: the signal comes straight from the score, no LLM calls at all
+* ``auto``: decisive scores (within ``margin`` of either end of the scale) are
+  turned into a signal directly; only ambiguous ones go to the LLM
+
+The policy is read from ``state["metadata"]["llm_escalation"]``, either a
+single policy name or a mapping of agent name to policy with an optional
+``"default"`` entry. ``state["metadata"]["llm_escalation_margin"]`` overrides
+the auto-mode margin.
+"""
+
+from typing import Any
+
+from pydantic import BaseModel
+
+ESCALATION_POLICIES = ("always", "never", "auto")
+
+DEFAULT_POLICY = "always"
+DEFAULT_MARGIN = 0.2
+
+# Score ratios the persona agents use to map a total score to a signal
+BULLISH_RATIO = 0.7
+BEARISH_RATIO = 0.3
+
+
+def escalation_policy(state, agent_name: str | None) -> str:
+    """The policy that applies to ``agent_name`` for this run."""
+    setting = (state or {}).get("metadata", {}).get("llm_escalation") or DEFAULT_POLICY
+    if isinstance(setting, dict):
+        setting = setting.get(agent_name) or setting.get("default") or DEFAULT_POLICY
+    policy = str(setting).lower()
+    if policy not in ESCALATION_POLICIES:
+        raise ValueError(f"Unknown LLM escalation policy '{setting}', expected one of {', '.join(ESCALATION_POLICIES)}")
+    return policy
+
+
+def score_ratio(analysis: dict[str, Any] | None) -> float | None:
+    """``score / max_score`` clipped to [0, 1], or ``None`` when the analysis has no usable score."""
+    if not analysis:
+        return None
+    score, max_score = analysis.get("score"), analysis.get("max_score")
+    if score is None or not max_score:
+        return None
+    return min(max(float(score) / float(max_score), 0.0), 1.0)
+
+
+def score_signal(analysis: dict[str, Any], ratio: float) -> str:
+    """The agent's own deterministic signal, or the standard 70/30 mapping when it has none."""
+    if analysis.get("signal") in ("看涨", "看跌", "中立"):
+        return analysis["signal"]
+    if ratio >= BULLISH_RATIO:
+        return "看涨"
+    if ratio <= BEARISH_RATIO:
+        return "看跌"
+    return "中立"
+
+
+def is_decisive(ratio: float | None, margin: float = DEFAULT_MARGIN) -> bool:
+    return ratio is not None and (ratio >= 1 - margin or ratio <= margin)
+
+
+def deterministic_signal(analysis: dict[str, Any] | None, pydantic_model: type[BaseModel], agent_name: str | None = None) -> BaseModel:
+    """Builds the agent's signal from its score with templated reasoning."""
+    ratio = score_ratio(analysis)
+    if ratio is None:
+        return pydantic_model(signal="中立", confidence=0.0, reasoning="No deterministic score available; defaulting to neutral without LLM review")
+
+    signal = score_signal(analysis, ratio)
+    confidence = 50.0 if signal == "中立" else max(ratio, 1 - ratio) * 100
+    name = (agent_name or "agent").replace("_agent", "").replace("_", " ").title()
+    reasoning = f"{name} deterministic score {analysis['score']:.1f}/{analysis['max_score']:.1f} ({ratio:.0%}) maps to a {signal} signal; issued without LLM review."
+    return pydantic_model(signal=signal, confidence=round(confidence, 1), reasoning=reasoning)
+
+
+def split_by_escalation(
+    analysis_data: dict[str, dict[str, Any]] | None,
+    tickers: list[str],
+    state,
+    agent_name: str | None,
+) -> tuple[list[str], list[str]]:
+    """Partitions ``tickers`` into (escalated to the LLM, resolved deterministically)."""
+    policy = escalation_policy(state, agent_name)
+    if policy == "always" or analysis_data is None:
+        return list(tickers), []
+    if policy == "never":
+        return [], list(tickers)
+
+    margin = (state or {}).get("metadata", {}).get("llm_escalation_margin", DEFAULT_MARGIN)
+    escalated, resolved = [], []
+    for ticker in tickers:
+        if is_decisive(score_ratio(analysis_data.get(ticker)), margin):
+            resolved.append(ticker)
+        else:
+            escalated.append(ticker)
+    return escalated, resolved
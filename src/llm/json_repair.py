@@ -0,0 +1,159 @@
+"""Tolerant JSON extraction for models without a native JSON/schema mode.
+
+:func:`extract_json` finds the JSON object in a free-text reply (inside a
+```json fence, any fence, or bare) and repairs the defects local models
+commonly produce instead of re-asking the model:
+
+* ``<think>`` reasoning blocks and text around the object
+* single-quoted strings and Python literals (``True``/``False``/``None``)
+* bare words (unquoted keys or enum values, in any script), which are quoted
+* trailing commas, ``//`` and ``/* */`` comments
+* raw newlines inside strings
+* output cut off mid-object (open strings and brackets are closed and a
+  dangling key is dropped)
+
+The repair is a single incremental pass over the text that tracks string,
+escape and bracket state.
+"""
+
+import json
+import re
+
+_THINK_BLOCK = re.compile(r"<think>.*?</think>", re.DOTALL | re.IGNORECASE)
+_FENCE = re.compile(r"```(?:json|JSON)?\s*\n?(.*?)(?:```|$)", re.DOTALL)
+_PY_LITERALS = {"True": "true", "False": "false", "None": "null"}
+_JSON_LITERALS = {"true", "false", "null", "NaN", "Infinity"}
+_WORD = re.compile(r"[^\W\d]\w*")
+_DANGLING_KEY = re.compile(r',?\s*"(?:[^"\\]|\\.)*"\s*:?\s*$')
+
+
+def _candidates(text: str) -> list[str]:
+    text = _THINK_BLOCK.sub("", text)
+    candidates = [match.group(1) for match in _FENCE.finditer(text) if match.group(1).strip()]
+    candidates.append(text)
+    return candidates
+
+
+def _start(text: str) -> int:
+    positions = [pos for pos in (text.find("{"), text.find("[")) if pos != -1]
+    return min(positions) if positions else -1
+
+
+def repair_json(text: str) -> str | None:
+    """Rewrites the first JSON value in ``text`` into valid JSON, or ``None`` when there is none."""
+    start = _start(text)
+    if start == -1:
+        return None
+
+    out: list[str] = []
+    stack: list[str] = []
+    quote: str | None = None  # delimiter of the string being read
+    escaped = False
+    i = start
+    while i < len(text):
+        char = text[i]
+        if quote is not None:
+            if escaped:
+                out.append(char)
+                escaped = False
+            elif char == "\\":
+                out.append(char)
+                escaped = True
+            elif char == quote:
+                out.append('"')
+                quote = None
+            elif char == '"':
+                out.append('\\"')  # inside a single-quoted string
+            elif char == "\n":
+                out.append("\\n")
+            elif char == "\r":
+                pass
+            elif char == "\t":
+                out.append("\\t")
+            else:
+                out.append(char)
+            i += 1
+            continue
+
+        if char in "\"'":
+            quote = char
+            out.append('"')
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+            out.append(char)
+        elif char in "}]":
+            _strip_trailing_comma(out)
+            if stack:
+                out.append(stack.pop())
+            if not stack:
+                break
+        elif text.startswith("//", i):
+            newline = text.find("\n", i)
+            i = len(text) if newline == -1 else newline
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i + 2)
+            i = len(text) if end == -1 else end + 2
+            continue
+        elif char.isalpha():
+            word = _WORD.match(text, i).group(0)
+            word = _PY_LITERALS.get(word, word)
+            out.append(word if word in _JSON_LITERALS else json.dumps(word, ensure_ascii=False))
+            i += len(word)
+            continue
+        else:
+            out.append(char)
+        i += 1
+
+    # Truncated output: close the open string, drop a dangling key, close brackets
+    if quote is not None:
+        if escaped:
+            out.pop()
+        out.append('"')
+    repaired = "".join(out).rstrip()
+    while stack:
+        repaired = repaired.rstrip().rstrip(",")
+        if stack[-1] == "}":
+            repaired = _DANGLING_KEY.sub("", repaired) if _ends_with_key(repaired) else repaired
+        repaired = repaired.rstrip().rstrip(",") + stack.pop()
+    return repaired
+
+
+def _strip_trailing_comma(out: list[str]):
+    j = len(out) - 1
+    while j >= 0 and out[j].isspace():
+        j -= 1
+    if j >= 0 and out[j] == ",":
+        del out[j]
+
+
+def _ends_with_key(text: str) -> bool:
+    """Whether ``text`` (inside an object) ends with a key that has no value yet."""
+    text = text.rstrip()
+    if text.endswith(":"):
+        return True
+    if not text.endswith('"'):
+        return False
+    # A string directly after '{' or ',' is a key, after ':' it is a value
+    match = re.search(r'([{,:])\s*"(?:[^"\\]|\\.)*"$', text)
+    return bool(match) and match.group(1) != ":"
+
+
+def extract_json(text: str) -> dict | list | None:
+    """The JSON value in a model reply, repaired if necessary; ``None`` when nothing parses."""
+    if not text:
+        return None
+    for candidate in _candidates(text):
+        stripped = candidate.strip()
+        try:
+            return json.loads(stripped)
+        except ValueError:
+            pass
+        repaired = repair_json(stripped)
+        if repaired is None:
+            continue
+        try:
+            return json.loads(repaired)
+        except ValueError:
+            continue
+    return None
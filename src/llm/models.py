@@ -1,10 +1,15 @@
+import asyncio
+import hashlib
 import json
 import os
 import logging
+import threading
+import weakref
 from enum import Enum
 from pathlib import Path
 from typing import Tuple, List
 
+import httpx
 from langchain_anthropic import ChatAnthropic
 from langchain_deepseek import ChatDeepSeek
 from langchain_google_genai import ChatGoogleGenerativeAI
@@ -13,6 +18,8 @@ from langchain_ollama import ChatOllama
 from langchain_openai import ChatOpenAI
 from pydantic import BaseModel
 
+from src.llm.concurrency import provider_limit
+
 # 获取日志记录器
 logger = logging.getLogger("ai-hedge-fund")
 
@@ -52,6 +59,19 @@ class LLMModel(BaseModel):
             return "llama3" in self.model_name or "neural-chat" in self.model_name
         return True
 
+    def structured_output_method(self) -> str | None:
+        """
+        How to get schema-shaped output from the model: ``"json_schema"`` (Ollama
+        constrains decoding with the JSON schema via ``format``), ``"json_mode"``,
+        or ``None`` to parse JSON out of a free-text reply.
+        """
+        if self.is_ollama():
+            return "json_schema"
+        if self.model_name == "deepseek-chat":
+            # DeepSeek's JSON output mode (response_format=json_object)
+            return "json_mode"
+        return "json_mode" if self.has_json_mode() else None
+
     def is_deepseek(self) -> bool:
         """Check if the model is a DeepSeek model"""
         return self.model_name.startswith("deepseek")
@@ -128,7 +148,108 @@ def get_models_list():
     ]
 
 
+# Configured clients per event loop (async HTTP connections cannot move between
+# loops); calls made outside any loop share one pool.
+_model_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict]" = weakref.WeakKeyDictionary()
+_loopless_pool: dict = {}
+_sync_http_clients: dict[tuple, httpx.Client] = {}
+_pool_lock = threading.Lock()
+
+# Environment variable holding each provider's API key
+PROVIDER_API_KEYS = {
+    ModelProvider.GROQ.value: "GROQ_API_KEY",
+    ModelProvider.OPENAI.value: "OPENAI_API_KEY",
+    ModelProvider.GEMINI.value: "OPENAI_API_KEY",
+    ModelProvider.ANTHROPIC.value: "ANTHROPIC_API_KEY",
+    ModelProvider.DEEPSEEK.value: "DEEPSEEK_API_KEY",
+}
+
+
+def _model_pool() -> dict:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return _loopless_pool
+    with _pool_lock:
+        return _model_pools.setdefault(loop, {})
+
+
+def _provider_base_url(model_provider: str) -> str | None:
+    if model_provider == ModelProvider.OLLAMA:
+        return os.getenv("OLLAMA_BASE_URL", f"http://{os.getenv('OLLAMA_HOST', 'localhost')}:11434")
+    return os.getenv("MODEL_BASE_URL")
+
+
+def _pool_key(model_name: str, model_provider: str) -> tuple:
+    provider = getattr(model_provider, "value", model_provider)
+    # A rotated API key gets a fresh client; only a digest of the key is kept
+    api_key = os.getenv(PROVIDER_API_KEYS[provider], "") if provider in PROVIDER_API_KEYS else ""
+    return (provider, model_name, _provider_base_url(provider), hashlib.sha256(api_key.encode()).hexdigest()[:16])
+
+
+def _http_limits(model_provider: str) -> httpx.Limits:
+    # Keep enough idle connections for every concurrent call the provider allows
+    keepalive = provider_limit(getattr(model_provider, "value", model_provider))
+    return httpx.Limits(max_connections=max(100, keepalive), max_keepalive_connections=keepalive)
+
+
+def shared_http_clients(model_provider: str, base_url: str | None) -> tuple[httpx.Client, httpx.AsyncClient]:
+    """Process-wide sync and per-loop async HTTP clients for one provider endpoint."""
+    key = (getattr(model_provider, "value", model_provider), base_url)
+    with _pool_lock:
+        if key not in _sync_http_clients:
+            _sync_http_clients[key] = httpx.Client(limits=_http_limits(model_provider))
+        sync_client = _sync_http_clients[key]
+    pool = _model_pool()
+    with _pool_lock:
+        if ("http", key) not in pool:
+            pool[("http", key)] = httpx.AsyncClient(limits=_http_limits(model_provider))
+        return sync_client, pool[("http", key)]
+
+
 def get_model(model_name: str, model_provider: ModelProvider) -> ChatOpenAI | ChatGroq | ChatOllama | None:
+    """
+    Returns a configured chat model from the process-wide client pool.
+
+    Clients are keyed by (provider, model, base URL) and share HTTP connection
+    pools per provider endpoint, so repeated calls across agents and tickers
+    reuse connections instead of opening new ones.
+    """
+    key = _pool_key(model_name, model_provider)
+    pool = _model_pool()
+    with _pool_lock:
+        model = pool.get(("model", key))
+    if model is None:
+        model = _create_model(model_name, model_provider)
+        with _pool_lock:
+            model = pool.setdefault(("model", key), model)
+    return model
+
+
+def get_structured_model(model_name: str, model_provider: ModelProvider, pydantic_model: type[BaseModel], method: str = "json_mode"):
+    """The pooled model wrapped with ``with_structured_output`` for ``pydantic_model``, cached per schema."""
+    key = ("structured", _pool_key(model_name, model_provider), pydantic_model, method)
+    pool = _model_pool()
+    with _pool_lock:
+        structured = pool.get(key)
+    if structured is None:
+        structured = get_model(model_name, model_provider).with_structured_output(pydantic_model, method=method)
+        with _pool_lock:
+            structured = pool.setdefault(key, structured)
+    return structured
+
+
+def clear_model_pool():
+    """Drop all pooled clients (e.g. after changing provider configuration)."""
+    with _pool_lock:
+        _model_pools.clear()
+        _loopless_pool.clear()
+        for client in _sync_http_clients.values():
+            client.close()
+        _sync_http_clients.clear()
+
+
+def _create_model(model_name: str, model_provider: ModelProvider) -> ChatOpenAI | ChatGroq | ChatOllama | None:
     logger.info(f"初始化模型: model_name={model_name}, model_provider={model_provider}")
     base_url = os.getenv("MODEL_BASE_URL")
     if base_url:
@@ -142,7 +263,8 @@ def get_model(model_name: str, model_provider: ModelProvider) -> ChatOpenAI | Ch
             logger.error(error_msg)
             raise ValueError(error_msg)
         logger.info(f"成功获取Groq API密钥")
-        return ChatGroq(model=model_name, api_key=api_key, base_url=base_url)
+        http_client, http_async_client = shared_http_clients(model_provider, base_url)
+        return ChatGroq(model=model_name, api_key=api_key, base_url=base_url, http_client=http_client, http_async_client=http_async_client)
     elif model_provider == ModelProvider.OPENAI or model_provider == ModelProvider.GEMINI:
         logger.info(f"初始化OpenAI模型: {model_name}")
         # Get and validate API key
@@ -153,7 +275,8 @@ def get_model(model_name: str, model_provider: ModelProvider) -> ChatOpenAI | Ch
             raise ValueError(error_msg)
         logger.info(f"成功获取OpenAI API密钥")
         try:
-            model = ChatOpenAI(model=model_name, api_key=api_key)
+            http_client, http_async_client = shared_http_clients(model_provider, None)
+            model = ChatOpenAI(model=model_name, api_key=api_key, http_client=http_client, http_async_client=http_async_client, stream_usage=True)
             logger.info(f"成功初始化OpenAI模型")
             return model
         except Exception as e:
@@ -183,7 +306,8 @@ def get_model(model_name: str, model_provider: ModelProvider) -> ChatOpenAI | Ch
             raise ValueError(error_msg)
         logger.info(f"成功获取DeepSeek API密钥")
         try:
-            model = ChatDeepSeek(model=model_name, api_key=api_key, base_url=base_url)
+            http_client, http_async_client = shared_http_clients(model_provider, base_url)
+            model = ChatDeepSeek(model=model_name, api_key=api_key, base_url=base_url, http_client=http_client, http_async_client=http_async_client, stream_usage=True)
             logger.info(f"成功初始化DeepSeek模型")
             return model
         except Exception as e:
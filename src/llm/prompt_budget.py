@@ -0,0 +1,152 @@
+"""Compact serialization and token budgeting for agent prompt data.
+
+Analysis dicts are serialized for the LLM with numbers rounded to a few
+significant digits, empty and ``None`` fields dropped and no indentation.
+List items are never dropped (an empty one becomes ``null``), since their
+position often means something, e.g. the period of a value in a series.
+When the result exceeds the agent's token budget it is shrunk
+deterministically: the longest lists and strings are halved first, then the
+largest remaining fields are dropped, so the same data always produces the
+same prompt (and the same LLM cache key).
+
+Budgets come from ``state["metadata"]["prompt_token_budget"]`` (a number, or a
+mapping of agent name to number with an optional ``"default"``), falling back
+to ``LLM_PROMPT_TOKEN_BUDGET`` and then :data:`DEFAULT_TOKEN_BUDGET`.
+"""
+
+import json
+import logging
+import math
+import os
+from typing import Any
+
+logger = logging.getLogger("ai-hedge-fund")
+
+DEFAULT_TOKEN_BUDGET = 4000
+DEFAULT_DIGITS = 4
+
+# Fields that carry the deterministic verdict and are never dropped
+PROTECTED_KEYS = ("signal", "score", "max_score")
+
+TRUNCATION_MARKER = "…"
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count: ~4 characters per token for ASCII, one token per other character."""
+    ascii_chars = sum(1 for char in text if ord(char) < 128)
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def round_significant(value: float, digits: int = DEFAULT_DIGITS) -> float | int:
+    if value == 0 or not math.isfinite(value):
+        return value
+    rounded = round(value, digits - 1 - int(math.floor(math.log10(abs(value)))))
+    return int(rounded) if rounded == int(rounded) and abs(rounded) >= 10 ** (digits - 1) else rounded
+
+
+def compact(value: Any, digits: int = DEFAULT_DIGITS) -> Any:
+    """Rounds floats and drops ``None``/NaN values and empty containers from dicts, recursively.
+
+    Empty list items become ``None`` rather than being dropped, so the items keep their positions.
+    """
+    if isinstance(value, dict):
+        items = ((str(key), compact(item, digits)) for key, item in value.items())
+        return {key: item for key, item in items if not _is_empty(item)}
+    if isinstance(value, (list, tuple)):
+        items = (compact(item, digits) for item in value)
+        return [None if _is_empty(item) else item for item in items]
+    if hasattr(value, "model_dump"):
+        return compact(value.model_dump(), digits)
+    if isinstance(value, bool) or value is None or isinstance(value, str):
+        return value
+    if hasattr(value, "item") and not isinstance(value, (list, dict)):
+        value = value.item()  # numpy scalar
+    if isinstance(value, float):
+        return None if math.isnan(value) else round_significant(value, digits)
+    return value
+
+
+def _is_empty(value: Any) -> bool:
+    if isinstance(value, list):
+        return all(item is None for item in value)
+    return value is None or value == {} or value == ""
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _reducible(value: Any, path: tuple = ()):
+    """Yields (size, path) for every list with more than one item and every long string."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            yield from _reducible(item, path + (key,))
+    elif isinstance(value, list):
+        if len(value) > 1:
+            yield len(_dumps(value)), path
+        for index, item in enumerate(value):
+            yield from _reducible(item, path + (index,))
+    elif isinstance(value, str) and len(value) > 80:
+        yield len(value), path
+
+
+def _droppable(value: Any, path: tuple = ()):
+    """Yields (size, path) for every dict field that is neither protected nor holds protected fields."""
+    if isinstance(value, dict):
+        for key, item in value.items():
+            if key not in PROTECTED_KEYS and not (isinstance(item, dict) and any(k in item for k in PROTECTED_KEYS)):
+                yield len(_dumps(item)), path + (key,)
+            yield from _droppable(item, path + (key,))
+
+
+def _get(value: Any, path: tuple):
+    for key in path:
+        value = value[key]
+    return value
+
+
+def _shrink(value: Any, path: tuple):
+    parent, key = _get(value, path[:-1]), path[-1]
+    item = parent[key]
+    if isinstance(item, list):
+        parent[key] = item[: len(item) // 2]
+    else:
+        parent[key] = item[: len(item) // 2] + TRUNCATION_MARKER
+
+
+def fit_to_budget(data: Any, budget: int) -> Any:
+    """Deterministically shrinks compacted ``data`` until its JSON fits in ``budget`` tokens."""
+    data = json.loads(_dumps(data))
+    while estimate_tokens(_dumps(data)) > budget:
+        # Largest first; ties broken by path so the outcome never depends on dict order
+        candidates = sorted(_reducible(data), key=lambda entry: (-entry[0], str(entry[1])))
+        if candidates and candidates[0][1]:
+            _shrink(data, candidates[0][1])
+            continue
+        candidates = sorted(_droppable(data), key=lambda entry: (-entry[0], str(entry[1])))
+        if not candidates:
+            break
+        path = candidates[0][1]
+        del _get(data, path[:-1])[path[-1]]
+    return data
+
+
+def prompt_budget(state, agent_name: str | None) -> int | None:
+    """Token budget for ``agent_name``'s analysis data; ``None`` or ``0`` disables truncation."""
+    setting = (state or {}).get("metadata", {}).get("prompt_token_budget")
+    if isinstance(setting, dict):
+        setting = setting.get(agent_name, setting.get("default"))
+    if setting is None:
+        setting = os.getenv("LLM_PROMPT_TOKEN_BUDGET", DEFAULT_TOKEN_BUDGET)
+    return int(setting) or None
+
+
+def to_prompt_json(data: Any, budget: int | None = None, digits: int = DEFAULT_DIGITS) -> str:
+    """Compact JSON for a prompt, truncated to ``budget`` estimated tokens."""
+    compacted = compact(data, digits)
+    text = _dumps(compacted)
+    if budget and estimate_tokens(text) > budget:
+        before = estimate_tokens(text)
+        text = _dumps(fit_to_budget(compacted, budget))
+        logger.info(f"提示数据超出预算, 已截断: 约{before} -> {estimate_tokens(text)} tokens (预算 {budget})")
+    return text
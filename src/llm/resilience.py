@@ -0,0 +1,230 @@
+"""Retry, circuit-breaking and hedging primitives for LLM calls.
+
+* :func:`backoff_delay`: exponential backoff with full jitter between attempts
+* :class:`CircuitBreaker`: per-provider breaker that stops sending requests to a
+  provider after repeated failures and lets a single probe through once the
+  reset timeout has passed; only provider failures (:func:`is_provider_failure`)
+  count, not replies that fail to parse or validate
+* :func:`fallback_chain`: the primary model followed by the configured fallbacks
+  (``LLM_FALLBACK_MODELS`` or ``state["metadata"]["llm_fallback_models"]``)
+* :func:`race`: runs a call against the chain, moving to the next model when one
+  fails and hedging a duplicate request to it once ``hedge_after`` seconds pass
+  without an answer; the first successful response wins
+
+Tunables come from the environment: ``LLM_RETRY_BASE_DELAY``,
+``LLM_RETRY_MAX_DELAY``, ``LLM_BREAKER_THRESHOLD``, ``LLM_BREAKER_RESET``
+and ``LLM_HEDGE_AFTER`` (seconds, ``0`` disables hedging).
+"""
+
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from typing import Awaitable, Callable, NamedTuple, TypeVar
+
+logger = logging.getLogger("ai-hedge-fund")
+
+T = TypeVar("T")
+
+DEFAULT_BASE_DELAY = 1.0
+DEFAULT_MAX_DELAY = 20.0
+DEFAULT_BREAKER_THRESHOLD = 5
+DEFAULT_BREAKER_RESET = 30.0
+
+
+class ModelTarget(NamedTuple):
+    model_name: str
+    model_provider: str
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+
+# Exception class names (of the SDKs and httpx) that mean the provider could not serve the request
+PROVIDER_ERROR_NAMES = ("Timeout", "Connect", "Transport", "RateLimit", "InternalServer", "ServiceUnavailable", "Overloaded", "ResourceExhausted", "DeadlineExceeded")
+
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Whether ``error`` is a transport, timeout, rate-limit or 5xx failure rather than an unusable reply."""
+    if isinstance(error, (TimeoutError, asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(getattr(error, "response", None), "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int) and not isinstance(status, bool):
+        return status == 429 or status >= 500
+    return any(name in cls.__name__ for cls in type(error).__mro__ for name in PROVIDER_ERROR_NAMES)
+
+
+def backoff_delay(attempt: int, base: float | None = None, cap: float | None = None) -> float:
+    """Full-jitter delay before retry ``attempt`` (0-based): uniform in [0, min(cap, base * 2**attempt)]."""
+    base = float(os.getenv("LLM_RETRY_BASE_DELAY", DEFAULT_BASE_DELAY)) if base is None else base
+    cap = float(os.getenv("LLM_RETRY_MAX_DELAY", DEFAULT_MAX_DELAY)) if cap is None else cap
+    return random.uniform(0, min(cap, base * 2**attempt))
+
+
+class CircuitBreaker:
+    """Closed -> open after ``failure_threshold`` consecutive failures -> half-open after ``reset_timeout``."""
+
+    def __init__(self, failure_threshold: int = DEFAULT_BREAKER_THRESHOLD, reset_timeout: float = DEFAULT_BREAKER_RESET):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: float | None = None
+        self.probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now; in half-open state only one probe at a time."""
+        with self._lock:
+            state = self.state
+            if state == "closed":
+                return True
+            if state == "half-open" and not self.probing:
+                self.probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self.probing = False
+
+    def release(self):
+        """A probe ended without a verdict (e.g. it was cancelled)."""
+        with self._lock:
+            self.probing = False
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def circuit_breaker(model_provider: str) -> CircuitBreaker:
+    """The process-wide breaker for ``model_provider``."""
+    provider = str(getattr(model_provider, "value", model_provider)).lower()
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(
+                int(os.getenv("LLM_BREAKER_THRESHOLD", DEFAULT_BREAKER_THRESHOLD)),
+                float(os.getenv("LLM_BREAKER_RESET", DEFAULT_BREAKER_RESET)),
+            )
+        return _breakers[provider]
+
+
+def reset_circuit_breakers():
+    with _breakers_lock:
+        _breakers.clear()
+
+
+def parse_targets(spec: str) -> list[ModelTarget]:
+    """Parses ``"Provider:model,Provider:model"``."""
+    targets = []
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        provider, _, model_name = item.strip().partition(":")
+        if not model_name:
+            raise ValueError(f"Invalid fallback model '{item}', expected Provider:model")
+        targets.append(ModelTarget(model_name.strip(), provider.strip()))
+    return targets
+
+
+def fallback_chain(model_name: str, model_provider: str, state=None) -> list[ModelTarget]:
+    """Primary model followed by the configured fallbacks, without duplicates."""
+    configured = (state or {}).get("metadata", {}).get("llm_fallback_models")
+    if configured is None:
+        fallbacks = parse_targets(os.getenv("LLM_FALLBACK_MODELS", ""))
+    elif isinstance(configured, str):
+        fallbacks = parse_targets(configured)
+    else:
+        fallbacks = [ModelTarget(*target) for target in configured]
+    chain = [ModelTarget(model_name, str(getattr(model_provider, "value", model_provider)))]
+    for target in fallbacks:
+        if target not in chain:
+            chain.append(target)
+    return chain
+
+
+def hedge_delay(state=None) -> float | None:
+    """Seconds to wait for an answer before hedging to the next model, or ``None`` when disabled."""
+    value = (state or {}).get("metadata", {}).get("llm_hedge_after")
+    if value is None:
+        value = os.getenv("LLM_HEDGE_AFTER", "0")
+    value = float(value)
+    return value if value > 0 else None
+
+
+async def guarded(target: ModelTarget, call: Callable[[ModelTarget], Awaitable[T]]) -> T:
+    """Runs ``call(target)`` through the provider's circuit breaker."""
+    breaker = circuit_breaker(target.model_provider)
+    if not breaker.allow():
+        raise CircuitOpenError(f"Circuit open for provider {target.model_provider}")
+    try:
+        result = await call(target)
+    except asyncio.CancelledError:
+        breaker.release()
+        raise
+    except Exception as e:
+        # A reply that does not parse or validate says nothing about the provider's health
+        if is_provider_failure(e):
+            breaker.record_failure()
+        else:
+            breaker.release()
+        raise
+    breaker.record_success()
+    return result
+
+
+async def race(targets: list[ModelTarget], call: Callable[[ModelTarget], Awaitable[T]], hedge_after: float | None = None) -> tuple[T, ModelTarget]:
+    """
+    Calls the targets in order until one succeeds.
+
+    The next target is started as soon as a request fails (fallback), or when ``hedge_after`` seconds pass without an answer (hedge).
+    The first successful response wins and the other requests are cancelled.
+    Raises the last error when every target fails.
+    """
+    remaining = list(targets)
+    pending: dict[asyncio.Task, ModelTarget] = {}
+    last_error: BaseException | None = None
+
+    def launch():
+        target = remaining.pop(0)
+        pending[asyncio.ensure_future(guarded(target, call))] = target
+
+    launch()
+    try:
+        while pending:
+            timeout = hedge_after if hedge_after and remaining else None
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            if not done:
+                logger.info(f"LLM请求超过 {hedge_after}s 未返回, 对冲请求 {remaining[0].model_provider}:{remaining[0].model_name}")
+                launch()
+                continue
+            for task in done:
+                target = pending.pop(task)
+                if task.exception() is None:
+                    return task.result(), target
+                last_error = task.exception()
+                logger.warning(f"LLM请求失败 ({target.model_provider}:{target.model_name}): {last_error}")
+                if remaining:
+                    launch()
+        raise last_error
+    finally:
+        for task in pending:
+            task.cancel()
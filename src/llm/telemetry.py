@@ -0,0 +1,203 @@
+"""Structured per-call LLM metrics, aggregated per run.
+
+Every :func:`src.utils.llm.acall_llm` call produces one :class:`LLMCallRecord`
+(provider, model, agent, ticker, token counts, time to first token, latency,
+retries, cache hit, estimated cost, and whether it was cancelled at its node's
+deadline). Records go to the :class:`RunTelemetry` of the enclosing
+:func:`telemetry_run` block, which is tracked in a context variable so
+concurrent runs (backend requests, backtest days) stay separate. Calls
+cancelled at a deadline are recorded as failures with the tokens they used.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass, field
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+# USD per million (input, output) tokens
+MODEL_PRICES = {
+    "claude-3-5-haiku-20241022": (0.80, 4.00),
+    "claude-sonnet-4-20250514": (3.00, 15.00),
+    "claude-opus-4-20250514": (15.00, 75.00),
+    "deepseek-chat": (0.27, 1.10),
+    "deepseek-reasoner": (0.55, 2.19),
+    "gemini-2.5-flash-preview-05-20": (0.15, 0.60),
+    "gemini-2.5-pro-preview-06-05": (1.25, 10.00),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4.1-2025-04-14": (2.00, 8.00),
+    "gpt-4.5-preview": (75.00, 150.00),
+    "o3": (2.00, 8.00),
+    "o4-mini": (1.10, 4.40),
+}
+
+# Providers that run locally and cost nothing per token
+FREE_PROVIDERS = ("ollama",)
+
+
+def estimate_cost(model_provider: str, model_name: str, prompt_tokens: int, completion_tokens: int) -> float | None:
+    """Estimated USD cost, or ``None`` for models without a known price."""
+    if str(model_provider).lower() in FREE_PROVIDERS:
+        return 0.0
+    prices = MODEL_PRICES.get(model_name)
+    if prices is None:
+        return None
+    return (prompt_tokens * prices[0] + completion_tokens * prices[1]) / 1_000_000
+
+
+@dataclass
+class LLMCallRecord:
+    provider: str
+    model: str
+    agent: str | None = None
+    ticker: str | None = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    time_to_first_token: float | None = None  # seconds; only known for streamed responses
+    latency: float = 0.0  # seconds
+    retries: int = 0
+    cache_hit: bool = False
+    answered_by: str | None = None  # provider:model that produced the response, if not the primary
+    success: bool = True
+    cancelled: bool = False  # stopped at its work deadline (see src.utils.cancellation)
+    cost: float | None = None
+    started_at: float = field(default_factory=time.time)
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+
+class TokenUsageCallback(BaseCallbackHandler):
+    """Collects token usage and the first-token time of every model run it is attached to."""
+
+    run_inline = True
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.first_token_at: float | None = None
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    def on_llm_new_token(self, token, **kwargs):
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+
+    def on_llm_end(self, response, **kwargs):
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    self.prompt_tokens += usage.get("input_tokens", 0)
+                    self.completion_tokens += usage.get("output_tokens", 0)
+                    return
+        # Older integrations only report usage in llm_output
+        usage = (response.llm_output or {}).get("token_usage") or (response.llm_output or {}).get("usage") or {}
+        self.prompt_tokens += usage.get("prompt_tokens", usage.get("input_tokens", 0)) or 0
+        self.completion_tokens += usage.get("completion_tokens", usage.get("output_tokens", 0)) or 0
+
+    @property
+    def time_to_first_token(self) -> float | None:
+        return None if self.first_token_at is None else self.first_token_at - self.started
+
+
+def _summarize(records: list[LLMCallRecord]) -> dict:
+    costs = [r.cost for r in records if r.cost is not None]
+    return {
+        "calls": len(records),
+        "cache_hits": sum(r.cache_hit for r in records),
+        "failures": sum(not r.success for r in records),
+        "cancelled": sum(r.cancelled for r in records),
+        "retries": sum(r.retries for r in records),
+        "prompt_tokens": sum(r.prompt_tokens for r in records),
+        "completion_tokens": sum(r.completion_tokens for r in records),
+        "latency": round(sum(r.latency for r in records), 3),
+        "cost": round(sum(costs), 6),
+        "unpriced_calls": sum(r.cost is None and not r.cache_hit for r in records),
+    }
+
+
+class RunTelemetry:
+    """Thread-safe collection of the LLM calls made during one run.
+
+    Calls are also added to ``parent`` (e.g. a backtest that spans many runs).
+    """
+
+    def __init__(self, parent: "RunTelemetry | None" = None):
+        self.records: list[LLMCallRecord] = []
+        self.parent = parent
+        self._lock = threading.Lock()
+
+    def add(self, record: LLMCallRecord):
+        with self._lock:
+            self.records.append(record)
+        if self.parent is not None:
+            self.parent.add(record)
+
+    def summary(self) -> dict:
+        """Totals plus breakdowns by agent, model and ticker, most expensive first."""
+        with self._lock:
+            records = list(self.records)
+        groups = {"by_agent": defaultdict(list), "by_model": defaultdict(list), "by_ticker": defaultdict(list)}
+        for record in records:
+            groups["by_agent"][record.agent or "unknown"].append(record)
+            groups["by_model"][f"{record.provider}:{record.model}"].append(record)
+            groups["by_ticker"][record.ticker or "unknown"].append(record)
+        summary = {"total": _summarize(records)}
+        for name, grouped in groups.items():
+            rows = {key: _summarize(items) for key, items in grouped.items()}
+            summary[name] = dict(sorted(rows.items(), key=lambda item: (item[1]["cost"], item[1]["latency"]), reverse=True))
+        return summary
+
+    def to_dict(self) -> dict:
+        """Summary plus every individual call record."""
+        with self._lock:
+            calls = [asdict(record) for record in self.records]
+        return {**self.summary(), "calls": calls}
+
+
+_current_run: ContextVar[RunTelemetry | None] = ContextVar("llm_telemetry_run", default=None)
+_current_ticker: ContextVar[str | None] = ContextVar("llm_telemetry_ticker", default=None)
+
+
+@contextmanager
+def telemetry_run():
+    """Collects every LLM call made inside the block (and threads/tasks started from it).
+
+    Nested runs also report to the enclosing run.
+    """
+    telemetry = RunTelemetry(parent=_current_run.get())
+    token = _current_run.set(telemetry)
+    try:
+        yield telemetry
+    finally:
+        _current_run.reset(token)
+
+
+@contextmanager
+def telemetry_ticker(ticker: str | None):
+    """Attributes LLM calls made inside the block to ``ticker``."""
+    token = _current_ticker.set(ticker)
+    try:
+        yield
+    finally:
+        _current_ticker.reset(token)
+
+
+def current_ticker() -> str | None:
+    return _current_ticker.get()
+
+
+def record_call(record: LLMCallRecord):
+    """Adds ``record`` to the active run, if any."""
+    if record.cost is None and not record.cache_hit:
+        # Priced by the model that actually answered (a fallback, if one won)
+        provider, model = record.answered_by.split(":", 1) if record.answered_by else (record.provider, record.model)
+        record.cost = estimate_cost(provider, model, record.prompt_tokens, record.completion_tokens)
+    telemetry = _current_run.get()
+    if telemetry is not None:
+        telemetry.add(record)
@@ -7,11 +7,18 @@ from colorama import Fore, Style, init
 import questionary
 from src.agents.portfolio_manager import portfolio_management_agent
 from src.agents.risk_manager import risk_management_agent
+from src.graph.checkpoint import get_checkpointer, invoke_resumable
+from src.graph.deadlines import run_deadline, with_deadline
+from src.graph.fan_out import add_analyst_fan_out
+from src.graph.process_pool import in_process_pool
+from src.graph.signal_reuse import with_signal_reuse
 from src.graph.state import AgentState
-from src.utils.display import print_trading_output
+from src.utils.display import print_llm_telemetry, print_profile, print_trading_output
 from src.utils.analysts import ANALYST_ORDER, get_analyst_nodes
+from src.utils.profiling import profile_node, profiling_run
 from src.utils.progress import progress
 from src.llm.models import LLM_ORDER, OLLAMA_LLM_ORDER, get_model_info, ModelProvider
+from src.llm.telemetry import telemetry_run
 from src.utils.ollama import ensure_ollama_and_model
 
 import argparse
@@ -19,12 +26,17 @@ from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from src.utils.visualize import save_graph_as_png
 import json
+from contextlib import nullcontext
+from functools import lru_cache
 
 # Load environment variables from .env file
 load_dotenv()
 
 init(autoreset=True)
 
+# Number of compiled workflows (distinct analyst selections and options) kept in memory
+GRAPH_CACHE_SIZE = 32
+
 
 def parse_hedge_fund_response(response):
     """Parses a JSON string and returns a dictionary."""
@@ -51,43 +63,68 @@ def run_hedge_fund(
     selected_analysts: list[str] = [],
     model_name: str = "gpt-4o",
     model_provider: str = "OpenAI",
+    cross_sectional_technicals: bool = False,
+    indicator_book=None,
+    batch_llm_prompts: bool = False,
+    llm_escalation: str | dict = "always",
+    fan_out: bool = False,
+    max_concurrency: int | None = None,
+    keep_agent_messages: bool = False,
+    profile: bool = False,
+    profile_output: str | None = None,
+    run_id: str | None = None,
+    node_timeout: float | dict | None = None,
+    run_timeout: float | None = None,
+    process_pool: bool = False,
+    reuse_signals: bool = False,
 ):
     # Start progress tracking
     progress.start()
 
     try:
-        # Create a new workflow if analysts are customized
-        if selected_analysts:
-            workflow = create_workflow(selected_analysts)
-            agent = workflow.compile()
-        else:
-            agent = app
-
-        final_state = agent.invoke(
-            {
-                "messages": [
-                    HumanMessage(
-                        content="Make trading decisions based on the provided data.",
-                    )
-                ],
-                "data": {
-                    "tickers": tickers,
-                    "portfolio": portfolio,
-                    "start_date": start_date,
-                    "end_date": end_date,
-                    "analyst_signals": {},
-                },
-                "metadata": {
-                    "show_reasoning": show_reasoning,
-                    "model_name": model_name,
-                    "model_provider": model_provider,
-                },
+        # An IndicatorBook in the state can only be checkpointed by pickling it
+        agent = get_compiled_workflow(selected_analysts or None, fan_out=fan_out, checkpointed=run_id is not None, pickle_checkpoints=indicator_book is not None)
+        graph_input = {
+            "messages": [
+                HumanMessage(
+                    content="Make trading decisions based on the provided data.",
+                )
+            ],
+            "data": {
+                "tickers": tickers,
+                "portfolio": portfolio,
+                "start_date": start_date,
+                "end_date": end_date,
             },
-        )
+            "metadata": {
+                "show_reasoning": show_reasoning,
+                "model_name": model_name,
+                "model_provider": model_provider,
+                "cross_sectional_technicals": cross_sectional_technicals,
+                "indicator_book": indicator_book,
+                "batch_llm_prompts": batch_llm_prompts,
+                "llm_escalation": llm_escalation,
+                "keep_agent_messages": keep_agent_messages,
+                "node_timeout": node_timeout,
+                "process_pool": process_pool,
+                "reuse_signals": reuse_signals,
+            },
+            "analyst_signals": {},
+        }
+        config = {"max_concurrency": max_concurrency} if max_concurrency else None
+
+        with telemetry_run() as telemetry, profiling_run(profile_output) if profile else nullcontext() as run_profile, run_deadline(run_timeout):
+            if run_id is not None:
+                # Resumes the run from its last checkpoint if an earlier attempt failed
+                final_state = invoke_resumable(agent, graph_input, run_id, config)
+            else:
+                final_state = agent.invoke(graph_input, config=config)
 
         return {
             "decisions": parse_hedge_fund_response(final_state["messages"][-1].content),
-            "analyst_signals": final_state["data"]["analyst_signals"],
+            "analyst_signals": final_state["analyst_signals"],
+            "llm_telemetry": telemetry.summary(),
+            "profile": run_profile.summary() if profile else None,
         }
     finally:
         # Stop progress tracking
@@ -99,31 +136,53 @@ def start(state: AgentState):
     return state
 
 
-def create_workflow(selected_analysts=None):
-    """Create the workflow with selected analysts."""
+def get_compiled_workflow(selected_analysts=None, fan_out: bool = False, checkpointed: bool = False, pickle_checkpoints: bool = False):
+    """Compiled workflow for the analyst selection, cached by the sorted analyst set and options.
+
+    ``checkpointed`` workflows save their state to the shared checkpointer (see src/graph/checkpoint.py);
+    ``pickle_checkpoints`` uses the one that may pickle state msgpack cannot encode.
+    """
+    if selected_analysts is None:
+        selected_analysts = get_analyst_nodes().keys()
+    return _compile_workflow(tuple(sorted(set(selected_analysts))), fan_out, checkpointed, pickle_checkpoints)
+
+
+@lru_cache(maxsize=GRAPH_CACHE_SIZE)
+def _compile_workflow(selected_analysts: tuple[str, ...], fan_out: bool, checkpointed: bool, pickle_checkpoints: bool):
+    checkpointer = get_checkpointer(pickle_fallback=pickle_checkpoints) if checkpointed else None
+    return create_workflow(list(selected_analysts), fan_out=fan_out).compile(checkpointer=checkpointer)
+
+
+def create_workflow(selected_analysts=None, fan_out: bool = False):
+    """Create the workflow with selected analysts.
+
+    With ``fan_out`` every (analyst, ticker) pair runs as its own task instead
+    of one node per analyst looping over the tickers.
+    """
     workflow = StateGraph(AgentState)
     workflow.add_node("start_node", start)
 
-    # Get analyst nodes from the configuration
-    analyst_nodes = get_analyst_nodes()
+    # Get analyst nodes from the configuration (timed when a profiling run is active, bounded by node deadlines,
+    # inputs fingerprinted for signal reuse, CPU-bound ones moved to the process pool when the run enables it)
+    analyst_nodes = {key: (node_name, with_deadline(node_name, profile_node(node_name, with_signal_reuse(node_name, in_process_pool(node_name, node_func))))) for key, (node_name, node_func) in get_analyst_nodes().items()}
 
     # Default to all analysts if none selected
     if selected_analysts is None:
         selected_analysts = list(analyst_nodes.keys())
-    # Add selected analyst nodes
-    for analyst_key in selected_analysts:
-        node_name, node_func = analyst_nodes[analyst_key]
-        workflow.add_node(node_name, node_func)
-        workflow.add_edge("start_node", node_name)
 
     # Always add risk and portfolio management
-    workflow.add_node("risk_management_agent", risk_management_agent)
-    workflow.add_node("portfolio_manager", portfolio_management_agent)
+    workflow.add_node("risk_management_agent", profile_node("risk_management_agent", risk_management_agent))
+    workflow.add_node("portfolio_manager", profile_node("portfolio_manager", portfolio_management_agent))
 
-    # Connect selected analysts to risk management
-    for analyst_key in selected_analysts:
-        node_name = analyst_nodes[analyst_key][0]
-        workflow.add_edge(node_name, "risk_management_agent")
+    if fan_out:
+        add_analyst_fan_out(workflow, dict(analyst_nodes[analyst_key] for analyst_key in selected_analysts))
+    else:
+        # Add selected analyst nodes and connect them to risk management
+        for analyst_key in selected_analysts:
+            node_name, node_func = analyst_nodes[analyst_key]
+            workflow.add_node(node_name, node_func)
+            workflow.add_edge("start_node", node_name)
+            workflow.add_edge(node_name, "risk_management_agent")
 
     workflow.add_edge("risk_management_agent", "portfolio_manager")
     workflow.add_edge("portfolio_manager", END)
@@ -146,8 +205,28 @@ if __name__ == "__main__":
     parser.add_argument("--show-reasoning", action="store_true", help="Show reasoning from each agent")
     parser.add_argument("--show-agent-graph", action="store_true", help="Show the agent graph")
     parser.add_argument("--ollama", action="store_true", help="Use Ollama for local LLM inference")
+    parser.add_argument("--cross-sectional-technicals", action="store_true", help="Evaluate technical signals for all tickers at once on a shared calendar")
+    parser.add_argument("--batch-llm-prompts", action="store_true", help="Send each analyst's tickers to the LLM in a single batched request")
+    parser.add_argument(
+        "--llm-escalation",
+        choices=["always", "never", "auto"],
+        default="always",
+        help="When persona agents call the LLM: always, never (signal from the deterministic score), or auto (only for ambiguous scores)",
+    )
+    parser.add_argument("--fan-out", action="store_true", help="Run every (analyst, ticker) pair as its own concurrent task")
+    parser.add_argument("--max-concurrency", type=int, help="Maximum number of graph tasks running at once")
+    parser.add_argument("--node-timeout", type=float, help="Seconds each analyst may take before it is reported as missing")
+    parser.add_argument("--run-timeout", type=float, help="Seconds all analysts together may take before the missing ones are skipped")
+    parser.add_argument("--process-pool", action="store_true", help="Run CPU-bound analysts (technicals, fundamentals, valuation) in a pool of worker processes")
+    parser.add_argument("--reuse-signals", action="store_true", help="Reuse an analyst's stored signal when its fetched inputs (metrics, line items, market cap bucket) are unchanged")
+    parser.add_argument("--run-id", type=str, help="Checkpoint the run under this ID; rerunning with the same ID resumes it after a failure")
+    parser.add_argument("--profile", action="store_true", help="Time every graph node (wall, CPU, data fetch, LLM, memory) and print a ranked table")
+    parser.add_argument("--profile-output", type=str, help="With --profile, write cProfile stats (*.prof) or folded stacks for flamegraphs (any other path)")
+    parser.add_argument("--headless", action="store_true", help="Do not render the live agent progress table (batch jobs, non-interactive logs)")
 
     args = parser.parse_args()
+    if args.headless:
+        progress.headless = True
 
     # Parse tickers from comma-separated string
     tickers = [ticker.strip() for ticker in args.tickers.split(",")]
@@ -250,8 +329,7 @@ if __name__ == "__main__":
             print(f"\nSelected model: {Fore.GREEN + Style.BRIGHT}{model_name}{Style.RESET_ALL}\n")
 
     # Create the workflow with selected analysts
-    workflow = create_workflow(selected_analysts)
-    app = workflow.compile()
+    app = get_compiled_workflow(selected_analysts, fan_out=args.fan_out)
 
     if args.show_agent_graph:
         file_path = ""
@@ -317,5 +395,19 @@ if __name__ == "__main__":
         selected_analysts=selected_analysts,
         model_name=model_name,
         model_provider=model_provider,
+        cross_sectional_technicals=args.cross_sectional_technicals,
+        batch_llm_prompts=args.batch_llm_prompts,
+        llm_escalation=args.llm_escalation,
+        fan_out=args.fan_out,
+        max_concurrency=args.max_concurrency,
+        profile=args.profile,
+        profile_output=args.profile_output,
+        run_id=args.run_id,
+        node_timeout=args.node_timeout,
+        run_timeout=args.run_timeout,
+        process_pool=args.process_pool,
+        reuse_signals=args.reuse_signals,
     )
     print_trading_output(result)
+    print_llm_telemetry(result.get("llm_telemetry"))
+    print_profile(result.get("profile"))
@@ -4,6 +4,10 @@ import pandas as pd
 import requests
 
 from src.data.cache import get_cache
+from src.data.event_index import InsiderCounts, InsiderIndex, NewsCounts, NewsIndex
+from src.utils.indicators import PriceMatrix
+from src.graph.signal_reuse import record_input
+from src.utils.profiling import profile_fetch
 from src.data.models import (
     CompanyNews,
     CompanyNewsResponse,
@@ -21,7 +25,13 @@ from src.data.models import (
 # Global cache instance
 _cache = get_cache()
 
+# Per-ticker event indexes: ticker -> (covered start date or None, covered end date, index)
+_news_indexes: dict[str, tuple] = {}
+_insider_indexes: dict[str, tuple] = {}
 
+
+@profile_fetch
+@record_input
 def get_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
     """Fetch price data from cache or API."""
     # Create a cache key that includes all parameters to ensure exact matches
@@ -53,6 +63,8 @@ def get_prices(ticker: str, start_date: str, end_date: str) -> list[Price]:
     return prices
 
 
+@profile_fetch
+@record_input
 def get_financial_metrics(
     ticker: str,
     end_date: str,
@@ -89,6 +101,8 @@ def get_financial_metrics(
     return financial_metrics
 
 
+@profile_fetch
+@record_input
 def search_line_items(
     ticker: str,
     line_items: list[str],
@@ -124,6 +138,8 @@ def search_line_items(
     return search_results[:limit]
 
 
+@profile_fetch
+@record_input
 def get_insider_trades(
     ticker: str,
     end_date: str,
@@ -184,6 +200,8 @@ def get_insider_trades(
     return all_trades
 
 
+@profile_fetch
+@record_input
 def get_company_news(
     ticker: str,
     end_date: str,
@@ -244,6 +262,74 @@ def get_company_news(
     return all_news
 
 
+def _covering_index(indexes: dict, ticker: str, start_date: str | None, end_date: str, limit: int):
+    """Return the ticker's event index if it holds every event the query would fetch."""
+    entry = indexes.get(ticker)
+    if entry is None:
+        return None
+    covered_start, covered_end, index = entry
+    if end_date > covered_end:
+        return None
+    if covered_start is None:
+        return index
+    if start_date is not None:
+        return index if start_date >= covered_start else None
+    # Latest `limit` events: covered once the indexed range holds that many
+    _, hi = index.bounds(end_date=end_date)
+    return index if hi >= limit else None
+
+
+def _register_index(indexes: dict, ticker: str, start_date: str | None, end_date: str, limit: int, index):
+    """Keep ``index`` for later queries if its fetch was complete and covers more than the current one."""
+    if start_date is None and len(index) >= limit:
+        return  # truncated at the oldest date, coverage is unknown
+    existing = indexes.get(ticker)
+    if existing is not None:
+        covered_start, covered_end, _ = existing
+        if end_date < covered_end or (start_date is not None and (covered_start is None or start_date > covered_start)):
+            return
+    indexes[ticker] = (start_date, end_date, index)
+
+
+@profile_fetch
+@record_input
+def get_company_news_counts(
+    ticker: str,
+    end_date: str,
+    start_date: str | None = None,
+    limit: int = 1000,
+) -> NewsCounts:
+    """Sentiment and headline counts for the news :func:`get_company_news` would return.
+
+    Answered from the ticker's news index when an earlier, wider fetch covers
+    the window, so repeated daily queries do not rescan the articles.
+    """
+    index = _covering_index(_news_indexes, ticker, start_date, end_date, limit)
+    if index is None:
+        index = NewsIndex.from_news(get_company_news(ticker, end_date, start_date=start_date, limit=limit))
+        _register_index(_news_indexes, ticker, start_date, end_date, limit, index)
+    # With a start date the API paginates through the whole window
+    return index.window(start_date, end_date, limit=None if start_date else limit)
+
+
+@profile_fetch
+@record_input
+def get_insider_trade_counts(
+    ticker: str,
+    end_date: str,
+    start_date: str | None = None,
+    limit: int = 1000,
+) -> InsiderCounts:
+    """Buy/sell counts and share totals for the trades :func:`get_insider_trades` would return."""
+    index = _covering_index(_insider_indexes, ticker, start_date, end_date, limit)
+    if index is None:
+        index = InsiderIndex.from_trades(get_insider_trades(ticker, end_date, start_date=start_date, limit=limit))
+        _register_index(_insider_indexes, ticker, start_date, end_date, limit, index)
+    return index.window(start_date, end_date, limit=None if start_date else limit)
+
+
+@profile_fetch
+@record_input
 def get_market_cap(
     ticker: str,
     end_date: str,
@@ -290,7 +376,13 @@ def prices_to_df(prices: list[Price]) -> pd.DataFrame:
     return df
 
 
+def prices_to_matrix(prices_by_ticker: dict[str, list[Price]]) -> PriceMatrix:
+    """Lay out many tickers' prices as (tickers × dates) arrays on one trading calendar."""
+    return PriceMatrix.from_frames({ticker: prices_to_df(prices) for ticker, prices in prices_by_ticker.items()})
+
+
 # Update the get_price_data function to use the new functions
+@profile_fetch
 def get_price_data(ticker: str, start_date: str, end_date: str) -> pd.DataFrame:
     prices = get_prices(ticker, start_date, end_date)
     return prices_to_df(prices)
@@ -0,0 +1,39 @@
+"""Cooperative cancellation of work whose result is no longer wanted.
+
+Work run inside a :func:`work_deadline` block checks :func:`cancelled` (or
+:func:`time_left`) and stops once the deadline has passed: LLM calls are not
+attempted or retried (and are recorded as cancelled), and progress updates are
+dropped, since whoever waited for the result has already moved on without it.
+"""
+
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_deadline: ContextVar[float | None] = ContextVar("work_deadline", default=None)
+
+
+@contextmanager
+def work_deadline(seconds: float | None):
+    """Work inside the block is cancelled ``seconds`` from now; ``None`` keeps the enclosing deadline."""
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    enclosing = _deadline.get()
+    token = _deadline.set(deadline if enclosing is None else min(deadline, enclosing))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def time_left() -> float | None:
+    """Seconds until the current work is cancelled, or ``None`` without a deadline."""
+    deadline = _deadline.get()
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+
+def cancelled() -> bool:
+    """Whether the current work's deadline has passed."""
+    return time_left() == 0.0
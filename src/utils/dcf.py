@@ -0,0 +1,242 @@
+"""Vectorized DCF / owner-earnings engine.
+
+All functions broadcast over NumPy arrays so a whole ticker universe can be
+valued across a grid of growth, discount and terminal assumptions in one
+call. The scalar helpers used by the individual agents are thin wrappers
+around the same kernels.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+#############################
+# Core kernels
+#############################
+
+
+def growth_path(growth_rate, num_years: int, fade_to=None) -> np.ndarray:
+    """Per-year growth rates with shape ``(..., num_years)``.
+
+    With ``fade_to`` the rate moves linearly from ``growth_rate`` in year 1
+    to ``fade_to`` in the final year, otherwise it is held constant.
+    """
+    growth_rate = np.asarray(growth_rate, dtype=float)[..., np.newaxis]
+    if fade_to is None or num_years == 1:
+        return np.broadcast_to(growth_rate, growth_rate.shape[:-1] + (num_years,))
+    fade_to = np.asarray(fade_to, dtype=float)[..., np.newaxis]
+    steps = np.arange(num_years) / (num_years - 1)
+    return growth_rate + (fade_to - growth_rate) * steps
+
+
+def project_cash_flows(base_cash_flow, growth_rates: np.ndarray) -> np.ndarray:
+    """Compound ``base_cash_flow`` along ``growth_rates`` (last axis = years)."""
+    base_cash_flow = np.asarray(base_cash_flow, dtype=float)[..., np.newaxis]
+    return base_cash_flow * np.cumprod(1 + np.asarray(growth_rates, dtype=float), axis=-1)
+
+
+def present_value(cash_flows: np.ndarray, discount_rate, start_year: int = 1) -> np.ndarray:
+    """Sum of ``cash_flows`` discounted at ``discount_rate`` from ``start_year``."""
+    cash_flows = np.asarray(cash_flows, dtype=float)
+    discount_rate = np.asarray(discount_rate, dtype=float)[..., np.newaxis]
+    years = np.arange(start_year, start_year + cash_flows.shape[-1])
+    return np.sum(cash_flows / (1 + discount_rate) ** years, axis=-1)
+
+
+def terminal_value(final_cash_flow, discount_rate, num_years, terminal_growth=None, terminal_multiple=None) -> np.ndarray:
+    """Present value of the terminal value at the end of ``num_years``.
+
+    Uses the Gordon growth model unless ``terminal_multiple`` is given.
+    Scenarios where the discount rate does not exceed terminal growth are
+    undefined and returned as NaN.
+    """
+    final_cash_flow = np.asarray(final_cash_flow, dtype=float)
+    discount_rate = np.asarray(discount_rate, dtype=float)
+    if terminal_multiple is not None:
+        value = final_cash_flow * np.asarray(terminal_multiple, dtype=float)
+    else:
+        terminal_growth = np.asarray(terminal_growth, dtype=float)
+        spread = discount_rate - terminal_growth
+        with np.errstate(divide="ignore", invalid="ignore"):
+            value = np.where(spread > 0, final_cash_flow * (1 + terminal_growth) / spread, np.nan)
+    return value / (1 + discount_rate) ** np.asarray(num_years, dtype=float)
+
+
+def dcf_value(
+    base_cash_flow,
+    growth_rate,
+    discount_rate,
+    terminal_growth=None,
+    num_years: int = 5,
+    terminal_multiple=None,
+    margin_of_safety=0.0,
+) -> np.ndarray:
+    """Constant-growth DCF broadcast over every input."""
+    cash_flows = project_cash_flows(base_cash_flow, growth_path(growth_rate, num_years))
+    pv = present_value(cash_flows, discount_rate)
+    tv = terminal_value(cash_flows[..., -1], discount_rate, num_years, terminal_growth, terminal_multiple)
+    return (pv + tv) * (1 - np.asarray(margin_of_safety, dtype=float))
+
+
+def staged_dcf_value(
+    base_cash_flow,
+    stages: list[tuple],
+    discount_rate,
+    terminal_growth=None,
+    terminal_multiple=None,
+    margin_of_safety=0.0,
+) -> np.ndarray:
+    """Multi-stage DCF; ``stages`` is a list of ``(growth_rate, num_years)``."""
+    paths = [growth_path(growth, years) for growth, years in stages]
+    shape = np.broadcast_shapes(*(p.shape[:-1] for p in paths))
+    path = np.concatenate([np.broadcast_to(p, shape + p.shape[-1:]) for p in paths], axis=-1)
+    cash_flows = project_cash_flows(base_cash_flow, path)
+    num_years = path.shape[-1]
+    pv = present_value(cash_flows, discount_rate)
+    tv = terminal_value(cash_flows[..., -1], discount_rate, num_years, terminal_growth, terminal_multiple)
+    return (pv + tv) * (1 - np.asarray(margin_of_safety, dtype=float))
+
+
+def owner_earnings(net_income, depreciation, capex, working_capital_change) -> np.ndarray:
+    """Buffett owner earnings: NI + D&A - capex - ΔWC."""
+    return np.asarray(net_income, dtype=float) + np.asarray(depreciation, dtype=float) - np.asarray(capex, dtype=float) - np.asarray(working_capital_change, dtype=float)
+
+
+#############################
+# Scenario grid
+#############################
+
+
+@dataclass
+class DCFScenarios:
+    """Intrinsic values for every ticker across a grid of assumptions.
+
+    ``values`` has shape ``(tickers, growth_rates, discount_rates, terminal_growth_rates)``.
+    Scenarios without a positive base cash flow or with an undefined terminal
+    value are NaN and ignored by the summary helpers.
+    """
+
+    tickers: list[str]
+    growth_rates: np.ndarray
+    discount_rates: np.ndarray
+    terminal_growth_rates: np.ndarray
+    values: np.ndarray
+    market_caps: np.ndarray | None = field(default=None)
+
+    def percentiles(self, q=(10, 50, 90)) -> dict[str, dict[str, float | None]]:
+        """Percentiles of intrinsic value per ticker across all scenarios."""
+        flat = self.values.reshape(len(self.tickers), -1)
+        valid = ~np.all(np.isnan(flat), axis=1)
+        result = np.full((len(self.tickers), len(q)), np.nan)
+        if valid.any():
+            result[valid] = np.nanpercentile(flat[valid], q, axis=1).T
+        return {ticker: {f"p{p}": (None if np.isnan(v) else float(v)) for p, v in zip(q, row)} for ticker, row in zip(self.tickers, result)}
+
+    def upside(self) -> np.ndarray:
+        """Valuation gap versus market cap for every scenario (same shape as ``values``)."""
+        if self.market_caps is None:
+            raise ValueError("market_caps were not provided")
+        caps = self.market_caps.reshape(-1, 1, 1, 1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(caps > 0, (self.values - caps) / caps, np.nan)
+
+    def probability_undervalued(self, threshold: float = 0.0) -> dict[str, float | None]:
+        """Share of scenarios per ticker in which the gap exceeds ``threshold``."""
+        gap = self.upside().reshape(len(self.tickers), -1)
+        counted = np.sum(~np.isnan(gap), axis=1)
+        hits = np.sum(gap > threshold, axis=1)
+        return {ticker: (float(h / c) if c else None) for ticker, h, c in zip(self.tickers, hits, counted)}
+
+    def sensitivity(self, ticker: str, terminal_growth: float | None = None) -> pd.DataFrame:
+        """Growth × discount table for one ticker at a single terminal growth rate.
+
+        Defaults to the middle terminal growth rate of the grid.
+        """
+        i = self.tickers.index(ticker)
+        if terminal_growth is None:
+            k = len(self.terminal_growth_rates) // 2
+        else:
+            k = int(np.argmin(np.abs(self.terminal_growth_rates - terminal_growth)))
+        return pd.DataFrame(
+            self.values[i, :, :, k],
+            index=pd.Index(self.growth_rates, name="growth_rate"),
+            columns=pd.Index(self.discount_rates, name="discount_rate"),
+        )
+
+
+def _grid_axes(base_cash_flows: dict[str, float], growth_rates, discount_rates, terminal_growth_rates):
+    tickers = list(base_cash_flows)
+    base = np.array([np.nan if base_cash_flows[t] is None else base_cash_flows[t] for t in tickers], dtype=float)
+    base = np.where(base > 0, base, np.nan)
+    g = np.atleast_1d(np.asarray(growth_rates, dtype=float))
+    r = np.atleast_1d(np.asarray(discount_rates, dtype=float))
+    tg = np.atleast_1d(np.asarray(terminal_growth_rates, dtype=float))
+    return tickers, base, g, r, tg
+
+
+def _market_cap_array(tickers: list[str], market_caps: dict[str, float] | None) -> np.ndarray | None:
+    if market_caps is None:
+        return None
+    return np.array([market_caps.get(t) or np.nan for t in tickers], dtype=float)
+
+
+def dcf_scenarios(
+    base_cash_flows: dict[str, float],
+    growth_rates,
+    discount_rates,
+    terminal_growth_rates,
+    num_years: int = 5,
+    margin_of_safety: float = 0.0,
+    market_caps: dict[str, float] | None = None,
+) -> DCFScenarios:
+    """Value every ticker's base cash flow across the full assumption grid."""
+    tickers, base, g, r, tg = _grid_axes(base_cash_flows, growth_rates, discount_rates, terminal_growth_rates)
+    values = dcf_value(
+        base[:, None, None, None],
+        g[None, :, None, None],
+        r[None, None, :, None],
+        tg[None, None, None, :],
+        num_years=num_years,
+        margin_of_safety=margin_of_safety,
+    )
+    return DCFScenarios(tickers, g, r, tg, values, _market_cap_array(tickers, market_caps))
+
+
+def owner_earnings_scenarios(
+    components: dict[str, dict[str, float]],
+    growth_rates,
+    required_returns,
+    terminal_growth_rates,
+    num_years: int = 5,
+    margin_of_safety: float = 0.25,
+    market_caps: dict[str, float] | None = None,
+) -> DCFScenarios:
+    """Owner-earnings valuation grid.
+
+    ``components`` maps ticker to ``net_income``, ``depreciation``, ``capex``
+    and ``working_capital_change``. Terminal growth never exceeds the
+    scenario's growth rate, matching the single-ticker model.
+    """
+    keys = ("net_income", "depreciation", "capex", "working_capital_change")
+    base_cash_flows = {}
+    for ticker, parts in components.items():
+        if any(parts.get(k) is None for k in keys):
+            base_cash_flows[ticker] = None
+        else:
+            base_cash_flows[ticker] = float(owner_earnings(*(parts[k] for k in keys)))
+
+    tickers, base, g, r, tg = _grid_axes(base_cash_flows, growth_rates, required_returns, terminal_growth_rates)
+    growth = g[None, :, None, None]
+    values = dcf_value(
+        base[:, None, None, None],
+        growth,
+        r[None, None, :, None],
+        np.minimum(tg[None, None, None, :], growth),
+        num_years=num_years,
+        margin_of_safety=margin_of_safety,
+    )
+    return DCFScenarios(tickers, g, r, tg, values, _market_cap_array(tickers, market_caps))
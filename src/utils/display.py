@@ -226,6 +226,66 @@ def print_trading_output(result: dict) -> None:
         print(f"{Fore.CYAN}{wrapped_reasoning}{Style.RESET_ALL}")
 
 
+def print_llm_telemetry(summary: dict | None) -> None:
+    """Print LLM usage totals and the per-agent breakdown, most expensive first."""
+    if not summary or not summary.get("total", {}).get("calls"):
+        return
+    total = summary["total"]
+    print(f"\n{Fore.WHITE}{Style.BRIGHT}LLM USAGE:{Style.RESET_ALL}")
+    rows = []
+    for agent, stats in summary.get("by_agent", {}).items():
+        rows.append(
+            [
+                f"{Fore.CYAN}{agent}{Style.RESET_ALL}",
+                stats["calls"],
+                stats["cache_hits"],
+                stats["prompt_tokens"],
+                stats["completion_tokens"],
+                f"{stats['latency']:.1f}s",
+                f"${stats['cost']:.4f}",
+            ]
+        )
+    rows.append(
+        [
+            f"{Style.BRIGHT}Total{Style.RESET_ALL}",
+            total["calls"],
+            total["cache_hits"],
+            total["prompt_tokens"],
+            total["completion_tokens"],
+            f"{total['latency']:.1f}s",
+            f"{Fore.YELLOW}${total['cost']:.4f}{Style.RESET_ALL}",
+        ]
+    )
+    headers = [f"{Fore.WHITE}Agent", "Calls", "Cache Hits", "Prompt Tokens", "Completion Tokens", "Latency", "Est. Cost"]
+    print(tabulate(rows, headers=headers, tablefmt="grid", colalign=("left", "right", "right", "right", "right", "right", "right")))
+
+
+def print_profile(rows: list[dict] | None, limit: int = 30) -> None:
+    """Print per-(node, ticker) timings, slowest first."""
+    if not rows:
+        return
+
+    def seconds(value):
+        return "-" if value is None else f"{value:.2f}s"
+
+    print(f"\n{Fore.WHITE}{Style.BRIGHT}NODE PROFILE:{Style.RESET_ALL}")
+    table = [
+        [
+            f"{Fore.CYAN}{row['node']}{Style.RESET_ALL}",
+            row["ticker"],
+            row["calls"] or "-",
+            seconds(row["wall"]),
+            seconds(row["cpu"]),
+            seconds(row["fetch"]),
+            seconds(row["llm"]),
+            "-" if row["peak_memory"] is None else f"{row['peak_memory'] / 2**20:.1f} MB",
+        ]
+        for row in rows[:limit]
+    ]
+    headers = [f"{Fore.WHITE}Node", "Ticker", "Calls", "Wall", "CPU", "Data Fetch", "LLM", "Peak Memory"]
+    print(tabulate(table, headers=headers, tablefmt="grid", colalign=("left", "center", "right", "right", "right", "right", "right", "right")))
+
+
 def print_backtest_results(table_rows: list) -> None:
     """Print the backtest results in a nicely formatted table"""
     # Clear the screen
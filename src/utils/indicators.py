@@ -0,0 +1,332 @@
+"""Vectorized technical indicator engine.
+
+Computes the full indicator set used by the technical analyst in a single
+pass over NumPy arrays. Every function works along the last axis (time), so
+the same code handles one ticker (shape ``(T,)``) or a whole universe laid
+out as ``(tickers, T)``. Inputs are never modified.
+
+Rolling statistics follow pandas semantics (``min_periods == window``, NaN
+propagates through a window), EMAs follow ``ewm(adjust=False)`` and the ADX
+smoothing follows ``ewm(adjust=True)`` so results match the previous
+per-indicator pandas implementation. The one exception is
+:func:`hurst_exponent`, which regresses on the standard deviation of the
+lagged differences; the previous implementation took its square root and so
+reported half the exponent.
+"""
+
+from __future__ import annotations
+
+import math
+import warnings
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+@dataclass(frozen=True, slots=True)
+class IndicatorSet:
+    """Last-bar indicator values; each field has the input's leading shape."""
+
+    close: np.ndarray
+    ema_8: np.ndarray
+    ema_21: np.ndarray
+    ema_55: np.ndarray
+    adx: np.ndarray
+    plus_di: np.ndarray
+    minus_di: np.ndarray
+    atr: np.ndarray
+    rsi_14: np.ndarray
+    rsi_28: np.ndarray
+    bb_upper: np.ndarray
+    bb_lower: np.ndarray
+    z_score: np.ndarray
+    momentum_1m: np.ndarray
+    momentum_3m: np.ndarray
+    momentum_6m: np.ndarray
+    volume_momentum: np.ndarray
+    historical_volatility: np.ndarray
+    volatility_regime: np.ndarray
+    volatility_z_score: np.ndarray
+    skewness: np.ndarray
+    kurtosis: np.ndarray
+    hurst: np.ndarray
+
+
+def compute_indicators(close, high, low, volume, adx_period: int = 14, atr_period: int = 14, hurst_max_lag: int = 20) -> IndicatorSet:
+    """Compute every technical indicator for the last bar of each series."""
+    close = np.asarray(close, dtype=float)
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    volume = np.asarray(volume, dtype=float)
+
+    ema_8, ema_21, ema_55, adx, plus_di, minus_di = _recursive_pass(close, high, low, adx_period)
+
+    returns = pct_change(close)
+    gains, losses = _gains_losses(close)
+
+    ma_50 = last_mean(close, 50)
+    std_50 = last_std(close, 50)
+    sma_20 = last_mean(close, 20)
+    std_20 = last_std(close, 20)
+
+    hist_vol_tail = rolling_std(returns[..., -(63 + 21 - 1) :], 21) * math.sqrt(252)
+    hist_vol = last_std(returns, 21) * math.sqrt(252)
+    vol_ma = last_mean(hist_vol_tail, 63)
+    vol_std = last_std(hist_vol_tail, 63)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return IndicatorSet(
+            close=close[..., -1],
+            ema_8=ema_8,
+            ema_21=ema_21,
+            ema_55=ema_55,
+            adx=adx,
+            plus_di=plus_di,
+            minus_di=minus_di,
+            atr=last_mean(true_range(close, high, low), atr_period),
+            rsi_14=_rsi(gains, losses, 14),
+            rsi_28=_rsi(gains, losses, 28),
+            bb_upper=sma_20 + 2 * std_20,
+            bb_lower=sma_20 - 2 * std_20,
+            z_score=(close[..., -1] - ma_50) / std_50,
+            momentum_1m=last_sum(returns, 21),
+            momentum_3m=last_sum(returns, 63),
+            momentum_6m=last_sum(returns, 126),
+            volume_momentum=volume[..., -1] / last_mean(volume, 21),
+            historical_volatility=hist_vol,
+            volatility_regime=hist_vol / vol_ma,
+            volatility_z_score=(hist_vol - vol_ma) / vol_std,
+            skewness=last_skew(returns, 63),
+            kurtosis=last_kurt(returns, 63),
+            hurst=hurst_exponent(close, hurst_max_lag),
+        )
+
+
+def compute_indicators_from_df(prices_df: pd.DataFrame, **kwargs) -> IndicatorSet:
+    """Convenience wrapper for a single ticker's OHLCV DataFrame."""
+    return compute_indicators(
+        prices_df["close"].to_numpy(dtype=float),
+        prices_df["high"].to_numpy(dtype=float),
+        prices_df["low"].to_numpy(dtype=float),
+        prices_df["volume"].to_numpy(dtype=float),
+        **kwargs,
+    )
+
+
+
+@dataclass(frozen=True)
+class PriceMatrix:
+    """OHLCV for many tickers laid out as ``(tickers, dates)`` on one calendar.
+
+    Days on which a ticker has no bar are NaN.
+    """
+
+    tickers: list[str]
+    dates: pd.DatetimeIndex
+    close: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    volume: np.ndarray
+
+    @classmethod
+    def from_frames(cls, frames: dict[str, pd.DataFrame]) -> PriceMatrix:
+        """Align per-ticker OHLCV DataFrames (indexed by date) on the union of their dates."""
+        tickers = list(frames)
+        dates = pd.DatetimeIndex([])
+        for df in frames.values():
+            dates = dates.union(df.index)
+        columns = {}
+        for column in ("close", "high", "low", "volume"):
+            columns[column] = np.array([frames[t][column].reindex(dates).to_numpy(dtype=float) for t in tickers]).reshape(len(tickers), len(dates))
+        return cls(tickers=tickers, dates=dates, **columns)
+
+    def indicators(self, **kwargs) -> IndicatorSet:
+        """Indicator set for every ticker at once, shape ``(tickers,)`` per field.
+
+        Each ticker is evaluated on its own bars only (calendar gaps are
+        dropped), grouped by history length so every group is one dense
+        array operation. Results are identical to evaluating each ticker's
+        DataFrame separately.
+        """
+        observed = ~np.isnan(self.close)
+        lengths = observed.sum(axis=1)
+        fields = {name: np.full(len(self.tickers), np.nan) for name in IndicatorSet.__dataclass_fields__}
+        for length in np.unique(lengths):
+            if length == 0:
+                continue
+            rows = np.flatnonzero(lengths == length)
+            mask = observed[rows]
+            block = [a[rows][mask].reshape(len(rows), length) for a in (self.close, self.high, self.low, self.volume)]
+            result = compute_indicators(*block, **kwargs)
+            for name in fields:
+                fields[name][rows] = getattr(result, name)
+        return IndicatorSet(**fields)
+
+#############################
+# Building blocks
+#############################
+
+
+def _nan_like_leading(x: np.ndarray) -> np.ndarray:
+    return np.full(x.shape[:-1], np.nan)
+
+
+def last_mean(x: np.ndarray, window: int) -> np.ndarray:
+    """``x.rolling(window).mean().iloc[-1]`` along the last axis."""
+    if x.shape[-1] < window:
+        return _nan_like_leading(x)
+    return x[..., -window:].mean(axis=-1)
+
+
+def last_sum(x: np.ndarray, window: int) -> np.ndarray:
+    """``x.rolling(window).sum().iloc[-1]`` along the last axis."""
+    if x.shape[-1] < window:
+        return _nan_like_leading(x)
+    return x[..., -window:].sum(axis=-1)
+
+
+def last_std(x: np.ndarray, window: int) -> np.ndarray:
+    """``x.rolling(window).std().iloc[-1]`` (sample std) along the last axis."""
+    if x.shape[-1] < window or window < 2:
+        return _nan_like_leading(x)
+    return x[..., -window:].std(axis=-1, ddof=1)
+
+
+def rolling_std(x: np.ndarray, window: int) -> np.ndarray:
+    """Full rolling sample std; positions without a complete window are NaN."""
+    out = np.full(x.shape, np.nan)
+    if x.shape[-1] >= window:
+        out[..., window - 1 :] = sliding_window_view(x, window, axis=-1).std(axis=-1, ddof=1)
+    return out
+
+
+def _central_moments(x: np.ndarray, window: int):
+    tail = x[..., -window:]
+    d = tail - tail.mean(axis=-1, keepdims=True)
+    return (d**2).mean(axis=-1), (d**3).mean(axis=-1), (d**4).mean(axis=-1)
+
+
+def last_skew(x: np.ndarray, window: int) -> np.ndarray:
+    """Bias-corrected rolling skewness of the last window (pandas ``rolling.skew``)."""
+    if x.shape[-1] < window or window < 3:
+        return _nan_like_leading(x)
+    m2, m3, _ = _central_moments(x, window)
+    n = float(window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        skew = math.sqrt(n * (n - 1)) / (n - 2) * m3 / (m2 * np.sqrt(m2))
+    return np.where(m2 > 1e-14, skew, np.nan)
+
+
+def last_kurt(x: np.ndarray, window: int) -> np.ndarray:
+    """Bias-corrected excess kurtosis of the last window (pandas ``rolling.kurt``)."""
+    if x.shape[-1] < window or window < 4:
+        return _nan_like_leading(x)
+    m2, _, m4 = _central_moments(x, window)
+    n = float(window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        kurt = ((n * n - 1) * m4 / (m2 * m2) - 3 * (n - 1) ** 2) / ((n - 2) * (n - 3))
+    return np.where(m2 > 1e-14, kurt, np.nan)
+
+
+def pct_change(close: np.ndarray) -> np.ndarray:
+    """Simple returns; the first bar is NaN."""
+    returns = np.full(close.shape, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[..., 1:] = close[..., 1:] / close[..., :-1] - 1
+    return returns
+
+
+def true_range(close: np.ndarray, high: np.ndarray, low: np.ndarray) -> np.ndarray:
+    """True range; the first bar falls back to high - low."""
+    tr = high - low
+    prev_close = close[..., :-1]
+    tr[..., 1:] = np.fmax(tr[..., 1:], np.fmax(np.abs(high[..., 1:] - prev_close), np.abs(low[..., 1:] - prev_close)))
+    return tr
+
+
+def directional_movement(high: np.ndarray, low: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """+DM / -DM; the first bar has no movement."""
+    plus_dm = np.zeros(high.shape)
+    minus_dm = np.zeros(high.shape)
+    up = high[..., 1:] - high[..., :-1]
+    down = low[..., :-1] - low[..., 1:]
+    plus_dm[..., 1:] = np.where((up > down) & (up > 0), up, 0.0)
+    minus_dm[..., 1:] = np.where((down > up) & (down > 0), down, 0.0)
+    return plus_dm, minus_dm
+
+
+def _gains_losses(close: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    delta = np.zeros(close.shape)
+    delta[..., 1:] = close[..., 1:] - close[..., :-1]
+    return np.where(delta > 0, delta, 0.0), np.where(delta < 0, -delta, 0.0)
+
+
+def _rsi(gains: np.ndarray, losses: np.ndarray, period: int) -> np.ndarray:
+    rs = last_mean(gains, period) / last_mean(losses, period)
+    return 100 - 100 / (1 + rs)
+
+
+def _recursive_pass(close: np.ndarray, high: np.ndarray, low: np.ndarray, adx_period: int):
+    """One time loop for every recursive indicator (EMA 8/21/55 and ADX).
+
+    Each step is vectorized across the leading (ticker) axes.
+    """
+    tr = true_range(close, high, low)
+    plus_dm, minus_dm = directional_movement(high, low)
+
+    ema_decay = np.array([1 - 2 / (8 + 1), 1 - 2 / (21 + 1), 1 - 2 / (55 + 1)]).reshape((3,) + (1,) * (close.ndim - 1))
+    decay = 1 - 2 / (adx_period + 1)
+
+    ema = np.broadcast_to(close[..., 0], (3,) + close.shape[:-1]).copy()
+    # ewm(adjust=True) keeps a running weighted sum per series and a shared weight total
+    plus_num = np.zeros(close.shape[:-1])
+    minus_num = np.zeros(close.shape[:-1])
+    tr_num = np.zeros(close.shape[:-1])
+    dx_num = np.zeros(close.shape[:-1])
+    dx_den = np.zeros(close.shape[:-1])
+    plus_di = minus_di = np.full(close.shape[:-1], np.nan)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for t in range(close.shape[-1]):
+            if t:
+                ema = ema_decay * ema + (1 - ema_decay) * close[..., t]
+            plus_num = decay * plus_num + plus_dm[..., t]
+            minus_num = decay * minus_num + minus_dm[..., t]
+            tr_num = decay * tr_num + tr[..., t]
+            plus_di = 100 * plus_num / tr_num
+            minus_di = 100 * minus_num / tr_num
+            dx = 100 * np.abs(plus_di - minus_di) / (plus_di + minus_di)
+            observed = ~np.isnan(dx)
+            dx_num = decay * dx_num + np.where(observed, dx, 0.0)
+            dx_den = decay * dx_den + observed
+        adx = np.where(dx_den > 0, dx_num / dx_den, np.nan)
+
+    return ema[0], ema[1], ema[2], adx, plus_di, minus_di
+
+
+def hurst_exponent(close: np.ndarray, max_lag: int = 20) -> np.ndarray:
+    """Hurst exponent from the slope of log(std of lagged differences) on log(lag).
+
+    H < 0.5: mean reverting, H = 0.5: random walk, H > 0.5: trending.
+    All lags are evaluated at once on a NaN-padded (lags, T) array.
+    """
+    lags = np.arange(2, max_lag)
+    n = close.shape[-1]
+    diffs = np.full(close.shape[:-1] + (len(lags), n), np.nan)
+    for i, lag in enumerate(lags):
+        if lag < n:
+            diffs[..., i, : n - lag] = close[..., lag:] - close[..., :-lag]
+    with warnings.catch_warnings():
+        # Lags longer than the series leave all-NaN rows
+        warnings.simplefilter("ignore", RuntimeWarning)
+        tau = np.nanstd(diffs, axis=-1)
+    # Add small epsilon to avoid log(0)
+    tau = np.where(np.isnan(tau), 1e-8, np.maximum(tau, 1e-8))
+
+    x = np.log(lags)
+    x_centered = x - x.mean()
+    slope = (np.log(tau) * x_centered).sum(axis=-1) / (x_centered**2).sum()
+    # Fall back to a random walk if the fit is undefined
+    return np.where(np.isfinite(slope), slope, 0.5)
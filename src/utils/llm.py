@@ -1,10 +1,25 @@
 """Helper functions for LLM"""
 
+import asyncio
+import concurrent.futures
+import contextvars
 import json
 import logging
+import threading
+import time
 from typing import TypeVar, Type, Optional, Any
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.messages import HumanMessage, SystemMessage
 from pydantic import BaseModel
-from src.llm.models import get_model, get_model_info
+from src.graph.signal_reuse import signal_key, store_signal, stored_signal
+from src.llm.cache import cache_key, get_llm_cache
+from src.llm.concurrency import llm_slot
+from src.llm.escalation import deterministic_signal, escalation_policy, split_by_escalation
+from src.llm.json_repair import extract_json
+from src.llm.models import get_model, get_model_info, get_structured_model
+from src.llm.resilience import ModelTarget, backoff_delay, fallback_chain, hedge_delay, race
+from src.llm.telemetry import LLMCallRecord, TokenUsageCallback, current_ticker, record_call, telemetry_ticker
+from src.utils.cancellation import cancelled, time_left
 from src.utils.progress import progress
 
 # 获取日志记录器
@@ -21,10 +36,16 @@ def call_llm(
     state: AgentState | None = None,
     max_retries: int = 3,
     default_factory=None,
+    use_cache: bool = True,
+    stream: bool | None = None,
 ) -> BaseModel:
     """
     Makes an LLM call with retry logic, handling both JSON supported and non-JSON supported models.
 
+    Synchronous wrapper around :func:`acall_llm`: the call runs on a shared
+    background event loop, so concurrent callers from any thread share the
+    same provider/model concurrency limits.
+
     Args:
         prompt: The prompt to send to the LLM
         pydantic_model: The Pydantic model class to structure the output
@@ -32,10 +53,76 @@ def call_llm(
         state: Optional state object to extract agent-specific model configuration
         max_retries: Maximum number of retries (default: 3)
         default_factory: Optional factory function to create default response on failure
+        use_cache: Look up / store the response in the LLM response cache (also bypassed
+            when ``state["metadata"]["bypass_llm_cache"]`` is set)
+        stream: Stream the completion and forward each token to
+            :meth:`progress.stream_token`; defaults to ``state["metadata"]["stream_llm_tokens"]``
 
     Returns:
         An instance of the specified Pydantic model
     """
+    return _run_on_sync_loop(acall_llm(prompt, pydantic_model, agent_name, state, max_retries, default_factory, use_cache, stream))
+
+
+async def acall_llm(
+    prompt: any,
+    pydantic_model: type[BaseModel],
+    agent_name: str | None = None,
+    state: AgentState | None = None,
+    max_retries: int = 3,
+    default_factory=None,
+    use_cache: bool = True,
+    stream: bool | None = None,
+) -> BaseModel:
+    """
+    Async LLM call built on ``ainvoke``; arguments and behaviour match :func:`call_llm`.
+
+    Each attempt holds a per-provider and a per-model slot (see
+    :mod:`src.llm.concurrency`), so one event loop can keep many analyst calls
+    in flight without overloading a provider. Failed attempts are retried with
+    jittered exponential backoff, providers with an open circuit breaker are
+    skipped, and the configured fallback models are tried (or hedged) in order;
+    see :mod:`src.llm.resilience`. Each call is recorded in the active
+    :func:`src.llm.telemetry.telemetry_run`, if any.
+    """
+    response, _ = await _acall_llm_recorded(prompt, pydantic_model, agent_name, state, max_retries, default_factory, use_cache, stream)
+    return response
+
+
+async def _acall_llm_recorded(
+    prompt: any,
+    pydantic_model: type[BaseModel],
+    agent_name: str | None,
+    state: AgentState | None,
+    max_retries: int,
+    default_factory,
+    use_cache: bool,
+    stream: bool | None,
+) -> tuple[BaseModel, LLMCallRecord]:
+    """:func:`acall_llm` that also returns the call's record (``record.success`` is false for a default response)."""
+    record = LLMCallRecord(provider="", model="", agent=agent_name, ticker=current_ticker())
+    started = time.perf_counter()
+    try:
+        response = await _acall_llm(prompt, pydantic_model, agent_name, state, max_retries, default_factory, use_cache, stream, record)
+        return response, record
+    finally:
+        record.latency = round(time.perf_counter() - started, 4)
+        record_call(record)
+
+
+async def _acall_llm(
+    prompt: any,
+    pydantic_model: type[BaseModel],
+    agent_name: str | None,
+    state: AgentState | None,
+    max_retries: int,
+    default_factory,
+    use_cache: bool,
+    stream: bool | None,
+    record: LLMCallRecord,
+) -> BaseModel:
+
+    model_name = model_provider = None
 
     # Extract model configuration if state is provided and agent_name is available
     if state and agent_name:
@@ -46,49 +133,93 @@ def call_llm(
         model_name = "gpt-4o"
     if not model_provider:
         model_provider = "OPENAI"
+    model_provider = getattr(model_provider, "value", model_provider)
+    record.provider, record.model = model_provider, model_name
 
     logger.info(f"开始LLM调用: model_name={model_name}, model_provider={model_provider}")
 
     model_info = get_model_info(model_name, model_provider)
     logger.info(f"获取到模型信息: {model_info}")
 
-    try:
-        llm = get_model(model_name, model_provider)
-        logger.info(f"成功初始化LLM模型实例")
-    except Exception as e:
-        logger.error(f"初始化LLM模型失败: {str(e)}\n详细错误: {json.dumps({'model_name': model_name, 'model_provider': model_provider, 'error': str(e)})}")
+    # Serve identical requests from the response cache
+    cache = get_llm_cache() if use_cache and not (state and state.get("metadata", {}).get("bypass_llm_cache")) else None
+    key = None
+    if cache is not None:
+        key = cache_key(model_provider, model_name, prompt, pydantic_model)
+        if (cached := cache.get(key, pydantic_model)) is not None:
+            logger.info(f"LLM缓存命中: {key[:12]}")
+            record.cache_hit = True
+            return cached
+
+    # Primary model followed by the configured fallbacks; models that cannot be initialised are skipped
+    chain = {}
+    for target in fallback_chain(model_name, model_provider, state):
+        try:
+            chain[target] = _structured_llm(target, pydantic_model)
+            logger.info(f"成功初始化LLM模型实例: {target.model_provider}:{target.model_name}")
+        except Exception as e:
+            logger.error(f"初始化LLM模型失败: {str(e)}\n详细错误: {json.dumps({'model_name': target.model_name, 'model_provider': target.model_provider, 'error': str(e)})}")
+    if not chain:
+        record.success = False
         if default_factory:
             return default_factory()
         return create_default_response(pydantic_model)
 
-    # For non-JSON support models, we can use structured output
-    if not (model_info and not model_info.has_json_mode()):
-        logger.info(f"使用JSON模式进行结构化输出")
-        llm = llm.with_structured_output(
-            pydantic_model,
-            method="json_mode",
-        )
+    usage = TokenUsageCallback()
+    callbacks = [usage]
+    if stream is None:
+        stream = bool(state and state.get("metadata", {}).get("stream_llm_tokens"))
+    if stream:
+        ticker = current_ticker()
+        callbacks.append(TokenStreamCallback(lambda text: progress.stream_token(agent_name, ticker, text)))
 
-    # Call the LLM with retries
+    async def invoke(target: ModelTarget) -> BaseModel:
+        llm, method = chain[target]
+        async with llm_slot(target.model_provider, target.model_name):
+            if stream:
+                # Structured chains yield progressively parsed results (the last one is complete);
+                # plain models yield message chunks that add up to the full reply
+                result = None
+                async for chunk in llm.astream(prompt, config={"callbacks": callbacks}):
+                    result = chunk if method is not None or result is None else result + chunk
+            else:
+                result = await llm.ainvoke(prompt, config={"callbacks": callbacks})
+        # For models without a JSON or schema mode, extract (and repair) the JSON locally
+        if method is None:
+            logger.info(f"从响应中提取JSON")
+            parsed_result = extract_json_from_response(result.content)
+            if not parsed_result:
+                raise ValueError(f"无法从响应中提取JSON: {result.content[:200]}...")
+            return pydantic_model(**parsed_result)
+        if not isinstance(result, BaseModel):
+            raise ValueError(f"结构化输出类型错误: {type(result).__name__}")
+        return result
+
+    # Call the LLM with retries: exponential backoff with jitter between rounds, and within a
+    # round the fallback chain is tried in order (hedged after LLM_HEDGE_AFTER seconds)
+    hedge_after = hedge_delay(state)
     for attempt in range(max_retries):
+        # Work past its deadline (a timed-out analyst) makes no further calls
+        if cancelled():
+            logger.warning("LLM调用已取消 (超过截止时间), 返回默认响应")
+            record.retries, record.success, record.cancelled = attempt, False, True
+            _record_usage(record, usage)
+            return default_factory() if default_factory else create_default_response(pydantic_model)
         try:
             logger.info(f"尝试调用LLM (尝试 {attempt + 1}/{max_retries})")
-            # Call the LLM
-            result = llm.invoke(prompt)
-            logger.info(f"LLM调用成功")
-
-            # For non-JSON support models, we need to extract and parse the JSON manually
-            if model_info and not model_info.has_json_mode():
-                logger.info(f"从响应中提取JSON")
-                parsed_result = extract_json_from_response(result.content)
-                if parsed_result:
-                    logger.info(f"成功解析JSON响应")
-                    return pydantic_model(**parsed_result)
-                else:
-                    logger.error(f"无法从响应中提取JSON: {result.content[:200]}...")
-            else:
-                logger.info(f"直接返回结构化结果")
-                return result
+            # An in-flight call is abandoned at the deadline
+            response, target = await asyncio.wait_for(race(list(chain), invoke, hedge_after), time_left())
+            logger.info(f"LLM调用成功: {target.model_provider}:{target.model_name}")
+            record.retries = attempt
+            if target != next(iter(chain)):
+                record.answered_by = f"{target.model_provider}:{target.model_name}"
+            _record_usage(record, usage)
+            if cache is not None:
+                # Stored under the key looked up above too, so reruns hit the cache while the primary is degraded
+                cache.set(key, response)
+                if target != next(iter(chain)):
+                    cache.set(cache_key(target.model_provider, target.model_name, prompt, pydantic_model), response)
+            return response
 
         except Exception as e:
             error_msg = f"LLM调用错误 (尝试 {attempt + 1}/{max_retries}): {str(e)}"
@@ -98,17 +229,237 @@ def call_llm(
                 progress.update_status(agent_name, None, f"Error - retry {attempt + 1}/{max_retries}")
 
             if attempt == max_retries - 1:
-                logger.error(f"LLM调用在{max_retries}次尝试后失败: {str(e)}")
+                logger.error(f"LLM调用在{max_retries}次尝试后失败, 返回默认响应: {str(e)}")
+                record.retries, record.success, record.cancelled = attempt, False, cancelled()
+                _record_usage(record, usage)
                 # Use default_factory if provided, otherwise create a basic default
                 if default_factory:
                     return default_factory()
                 return create_default_response(pydantic_model)
 
+            delay = backoff_delay(attempt)
+            remaining = time_left()
+            await asyncio.sleep(delay if remaining is None else min(delay, remaining))
+
     # This should never be reached due to the retry logic above
     logger.warning("意外情况: 达到了不应该到达的代码点，返回默认响应")
     return create_default_response(pydantic_model)
 
 
+class TokenStreamCallback(BaseCallbackHandler):
+    """Forwards each streamed token to ``on_token(text)``.
+
+    Structured output through tool calls streams the tool arguments rather
+    than message content; those are forwarded when the content is empty.
+    """
+
+    run_inline = True
+
+    def __init__(self, on_token):
+        self.on_token = on_token
+
+    def on_llm_new_token(self, token, *, chunk=None, **kwargs):
+        if not token and chunk is not None:
+            tool_chunks = getattr(getattr(chunk, "message", None), "tool_call_chunks", None) or []
+            token = "".join(tool_chunk.get("args") or "" for tool_chunk in tool_chunks)
+        if token:
+            self.on_token(token)
+
+
+def _record_usage(record: LLMCallRecord, usage: TokenUsageCallback):
+    record.prompt_tokens, record.completion_tokens = usage.prompt_tokens, usage.completion_tokens
+    record.time_to_first_token = usage.time_to_first_token
+
+
+def _structured_llm(target: ModelTarget, pydantic_model: type[BaseModel]):
+    """
+    Pooled client for ``target`` and its structured-output method.
+
+    Models with a native JSON or schema mode get a structured-output wrapper
+    (Ollama decodes against the pydantic JSON schema); the rest return free
+    text that is parsed with :func:`extract_json_from_response`.
+    """
+    target_info = get_model_info(target.model_name, target.model_provider)
+    method = target_info.structured_output_method() if target_info else "json_mode"
+    if method is None:
+        return get_model(target.model_name, target.model_provider), None
+    return get_structured_model(target.model_name, target.model_provider, pydantic_model, method=method), method
+
+
+_sync_loop: asyncio.AbstractEventLoop | None = None
+_sync_loop_lock = threading.Lock()
+
+
+def _get_sync_loop() -> asyncio.AbstractEventLoop:
+    """Background event loop that serves :func:`call_llm` for synchronous callers."""
+    global _sync_loop
+    with _sync_loop_lock:
+        if _sync_loop is None:
+            _sync_loop = asyncio.new_event_loop()
+            threading.Thread(target=_sync_loop.run_forever, name="llm-sync-loop", daemon=True).start()
+        return _sync_loop
+
+
+def _run_on_sync_loop(coro):
+    """Run ``coro`` on the background loop in the caller's context and wait for the result."""
+    loop = _get_sync_loop()
+    context = contextvars.copy_context()
+    done = concurrent.futures.Future()
+
+    def on_done(task: asyncio.Task):
+        if task.cancelled():
+            done.cancel()
+        elif task.exception() is not None:
+            done.set_exception(task.exception())
+        else:
+            done.set_result(task.result())
+
+    def start():
+        loop.create_task(coro, context=context).add_done_callback(on_done)
+
+    loop.call_soon_threadsafe(start)
+    return done.result()
+
+
+class BatchedSignals(BaseModel):
+    """Reply schema for a multi-ticker request: ticker -> per-ticker result object."""
+
+    signals: dict[str, dict[str, Any]]
+
+
+def call_llm_for_tickers(
+    prompts: dict[str, Any],
+    pydantic_model: type[BaseModel],
+    agent_name: str | None = None,
+    state: AgentState | None = None,
+    max_retries: int = 3,
+    default_factory=None,
+    status: str = "Generating analysis",
+    max_batch_rounds: int = 2,
+    analysis_data: dict[str, dict[str, Any]] | None = None,
+) -> dict[str, BaseModel]:
+    """
+    Runs one structured LLM request per ticker prompt.
+
+    With ``state["metadata"]["batch_llm_prompts"]`` set, the per-ticker prompts
+    are merged into a single request that returns a ``{ticker: result}`` map.
+    Each entry is validated against ``pydantic_model``; tickers that are
+    missing or malformed are re-asked as a smaller batch, and anything still
+    unresolved after ``max_batch_rounds`` falls back to a per-ticker call.
+
+    When ``analysis_data`` (the agent's per-ticker dict with ``score`` and
+    ``max_score``) is given, the LLM escalation policy (see
+    :mod:`src.llm.escalation`) may resolve some tickers from their score
+    without calling the LLM.
+
+    In a run with ``state["metadata"]["reuse_signals"]``, tickers whose fetched
+    inputs match a stored signal (see :mod:`src.graph.signal_reuse`) get that
+    signal without calling the LLM, and new results are stored.
+
+    Args:
+        prompts: Rendered prompt per ticker (all sharing the same system prompt)
+        status: Progress message shown for each ticker while its call is pending
+        analysis_data: Deterministic analysis per ticker used for escalation gating
+
+    Returns:
+        A result for every ticker, in the order of ``prompts``
+    """
+    results: dict[str, BaseModel] = {}
+    keys = {}
+    if state and state.get("metadata", {}).get("reuse_signals"):
+        context = (*get_agent_model_config(state, agent_name), escalation_policy(state, agent_name))
+        keys = {ticker: signal_key(agent_name, ticker, *context) for ticker in prompts}
+        for ticker, key in keys.items():
+            if (stored := stored_signal(key)) is None:
+                continue
+            try:
+                results[ticker] = pydantic_model.model_validate(stored)
+            except ValueError:
+                pass  # stored with an older schema; ask again
+        if results:
+            logger.info(f"{agent_name} 输入数据未变化, 复用已存储的信号: {list(results)}")
+    reused = set(results)
+
+    pending, resolved = split_by_escalation(analysis_data, [ticker for ticker in prompts if ticker not in reused], state, agent_name)
+    for ticker in resolved:
+        results[ticker] = deterministic_signal(analysis_data.get(ticker), pydantic_model, agent_name)
+    if resolved:
+        logger.info(f"{agent_name} 根据确定性评分直接生成信号, 跳过LLM: {resolved}")
+
+    if state and state.get("metadata", {}).get("batch_llm_prompts") and len(pending) > 1:
+        for _ in range(max_batch_rounds):
+            batch_prompt = build_batched_prompt({ticker: prompts[ticker] for ticker in pending})
+            if batch_prompt is None:
+                break
+            for ticker in pending:
+                progress.update_status(agent_name, ticker, status)
+            with telemetry_ticker(",".join(pending)):
+                reply = call_llm(batch_prompt, BatchedSignals, agent_name, state, max_retries)
+            for ticker in pending:
+                entry = reply.signals.get(ticker)
+                if entry is None:
+                    continue
+                try:
+                    results[ticker] = pydantic_model.model_validate(entry)
+                except ValueError as e:
+                    logger.warning(f"批量响应中 {ticker} 的结果无效: {e}")
+            pending = [ticker for ticker in pending if ticker not in results]
+            if len(pending) <= 1:
+                break
+        if pending:
+            logger.info(f"批量请求未返回有效结果, 逐个重试: {pending}")
+
+    failed = set()
+    for ticker in pending:
+        progress.update_status(agent_name, ticker, status)
+        with telemetry_ticker(ticker):
+            results[ticker], record = _run_on_sync_loop(_acall_llm_recorded(prompts[ticker], pydantic_model, agent_name, state, max_retries, default_factory, True, None))
+        if not record.success:
+            failed.add(ticker)  # a default response; do not reuse it
+
+    # Results of work past its deadline may be defaults and are discarded anyway
+    if cancelled():
+        return {ticker: results[ticker] for ticker in prompts}
+    for ticker, key in keys.items():
+        if ticker not in reused and ticker not in failed:
+            store_signal(key, results[ticker].model_dump())
+
+    return {ticker: results[ticker] for ticker in prompts}
+
+
+def build_batched_prompt(prompts: dict[str, Any]) -> list | None:
+    """
+    Merges per-ticker prompts into one request.
+
+    The shared system messages are kept once and every ticker's human message
+    becomes its own section. Returns ``None`` when the prompts do not share
+    their system messages and so cannot be merged.
+    """
+    rendered = {ticker: prompt.to_messages() if hasattr(prompt, "to_messages") else prompt for ticker, prompt in prompts.items()}
+    split = {}
+    for ticker, messages in rendered.items():
+        if isinstance(messages, str):
+            return None
+        system = [m for m in messages if getattr(m, "type", None) == "system"]
+        human = [m for m in messages if getattr(m, "type", None) != "system"]
+        split[ticker] = ([m.content for m in system], "\n\n".join(str(m.content) for m in human))
+
+    system_contents = {tuple(system) for system, _ in split.values()}
+    if len(system_contents) != 1:
+        return None
+
+    tickers = list(prompts)
+    sections = "\n\n".join(f"### {ticker}\n{human}" for ticker, (_, human) in split.items())
+    example = ", ".join(f'"{ticker}": {{...}}' for ticker in tickers)
+    human = (
+        f"Analyze each of the following {len(tickers)} tickers independently; each section contains that ticker's analysis data and the required result format.\n\n"
+        f"{sections}\n\n"
+        f"Return one JSON object of the form {{\"signals\": {{{example}}}}} with exactly these keys: {', '.join(tickers)}. "
+        f"Each value must be the result object requested in that ticker's section."
+    )
+    return [SystemMessage(content=content) for content in next(iter(system_contents))] + [HumanMessage(content=human)]
+
+
 def create_default_response(model_class: type[BaseModel]) -> BaseModel:
     """Creates a safe default response based on the model's fields."""
     default_values = {}
@@ -132,24 +483,13 @@ def create_default_response(model_class: type[BaseModel]) -> BaseModel:
 
 
 def extract_json_from_response(content: str) -> dict | None:
-    """Extracts JSON from markdown-formatted response."""
-    try:
-        logger.info(f"尝试从响应中提取JSON")
-        json_start = content.find("```json")
-        if json_start != -1:
-            json_text = content[json_start + 7 :]  # Skip past ```json
-            json_end = json_text.find("```")
-            if json_end != -1:
-                json_text = json_text[:json_end].strip()
-                parsed_json = json.loads(json_text)
-                logger.info(f"成功从响应中提取JSON")
-                return parsed_json
-            else:
-                logger.warning(f"在响应中找不到JSON结束标记```")
-        else:
-            logger.warning(f"在响应中找不到JSON开始标记```json")
-    except Exception as e:
-        logger.error(f"从响应中提取JSON时出错: {str(e)}\n响应内容: {content[:200]}...")
+    """Extracts the JSON object from a free-text response, repairing common defects locally."""
+    logger.info(f"尝试从响应中提取JSON")
+    parsed_json = extract_json(content)
+    if isinstance(parsed_json, dict):
+        logger.info(f"成功从响应中提取JSON")
+        return parsed_json
+    logger.warning(f"无法从响应中提取JSON对象: {str(content)[:200]}...")
     return None
 
 
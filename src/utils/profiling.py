@@ -0,0 +1,225 @@
+"""Per-node profiling for hedge fund graph runs.
+
+Graph nodes are wrapped with :func:`profile_node` and data fetchers in
+``src.tools.api`` with :func:`profile_fetch`. Both are no-ops unless a
+:func:`profiling_run` block is active. Inside one, every node call records:
+
+* wall time and CPU time of the node's thread
+* time spent in data fetches, per ticker
+* LLM time (summed call latency from :mod:`src.llm.telemetry`), per ticker
+* peak traced memory (``tracemalloc``; nodes that overlap share one peak)
+
+Rows are keyed by (node, ticker): the ticker is known for single-ticker node
+calls (e.g. fan-out tasks), while multi-ticker calls get an ``all`` row plus
+per-ticker fetch and LLM rows. ``output`` optionally dumps merged cProfile
+stats (``*.prof``) or folded stacks for flamegraph tools (any other path).
+"""
+
+import cProfile
+import functools
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+
+from src.llm.telemetry import telemetry_run
+
+ALL_TICKERS = "all"
+DEFAULT_SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+
+
+@dataclass
+class NodeTiming:
+    node: str
+    ticker: str
+    calls: int = 0
+    wall: float | None = None  # seconds
+    cpu: float | None = None  # seconds
+    fetch: float = 0.0  # seconds
+    llm: float = 0.0  # seconds, summed over possibly concurrent calls
+    peak_memory: int | None = None  # bytes
+
+    def add(self, wall=None, cpu=None, fetch=0.0, llm=0.0, peak_memory=None, calls=0):
+        self.calls += calls
+        if wall is not None:
+            self.wall = (self.wall or 0.0) + wall
+        if cpu is not None:
+            self.cpu = (self.cpu or 0.0) + cpu
+        self.fetch += fetch
+        self.llm += llm
+        if peak_memory is not None:
+            self.peak_memory = max(self.peak_memory or 0, peak_memory)
+
+
+class RunProfile:
+    """Thread-safe per-(node, ticker) timings collected during one or more graph runs."""
+
+    def __init__(self, output: str | None = None, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.output = output
+        self.use_cprofile = bool(output) and output.endswith(".prof")
+        self.sample_stacks = bool(output) and not self.use_cprofile
+        self.sample_interval = sample_interval
+        self.rows: dict[tuple[str, str], NodeTiming] = {}
+        self.profilers: list[cProfile.Profile] = []
+        self.stacks: Counter = Counter()
+        self._active_threads: dict[int, str] = {}  # thread id -> node name
+        self._lock = threading.Lock()
+
+    def _row(self, node: str, ticker: str) -> NodeTiming:
+        if (node, ticker) not in self.rows:
+            self.rows[(node, ticker)] = NodeTiming(node, ticker)
+        return self.rows[(node, ticker)]
+
+    def run_node(self, node_name: str, func, state):
+        tickers = state.get("data", {}).get("tickers") or []
+        ticker = tickers[0] if len(tickers) == 1 else ALL_TICKERS
+        fetches: dict[str, float] = defaultdict(float)
+        profiler = cProfile.Profile() if self.use_cprofile else None
+        thread_id = threading.get_ident()
+
+        fetch_token = _fetch_times.set(fetches)
+        with self._lock:
+            self._active_threads[thread_id] = node_name
+        memory_before = None
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            memory_before = tracemalloc.get_traced_memory()[0]
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        try:
+            with telemetry_run() as llm_calls:
+                if profiler is not None:
+                    try:
+                        profiler.enable()
+                    except ValueError:  # another profiler is already active in this process
+                        profiler = None
+                try:
+                    return func(state)
+                finally:
+                    if profiler is not None:
+                        profiler.disable()
+        finally:
+            wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+            peak = tracemalloc.get_traced_memory()[1] - memory_before if memory_before is not None and tracemalloc.is_tracing() else None
+            _fetch_times.reset(fetch_token)
+            llm_by_ticker: dict[str, float] = defaultdict(float)
+            for record in llm_calls.records:
+                llm_by_ticker[record.ticker or ticker] += record.latency
+            with self._lock:
+                self._active_threads.pop(thread_id, None)
+                if profiler is not None:
+                    self.profilers.append(profiler)
+                self._row(node_name, ticker).add(wall, cpu, sum(fetches.values()), sum(llm_by_ticker.values()), peak, calls=1)
+                if ticker == ALL_TICKERS:
+                    for name in sorted(set(fetches) | set(llm_by_ticker)):
+                        self._row(node_name, name).add(fetch=fetches.get(name, 0.0), llm=llm_by_ticker.get(name, 0.0))
+
+    def sample(self):
+        """Records the current stack of every thread that is running a node."""
+        frames = sys._current_frames()
+        with self._lock:
+            active = dict(self._active_threads)
+        for thread_id, node_name in active.items():
+            frame = frames.get(thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename.rsplit('/', 1)[-1]}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join([node_name, *reversed(stack)])] += 1
+
+    def summary(self) -> list[dict]:
+        """Rows ranked by wall time, then by fetch + LLM time."""
+        with self._lock:
+            rows = [asdict(row) for row in self.rows.values()]
+        return sorted(rows, key=lambda row: (row["wall"] or 0.0, row["fetch"] + row["llm"]), reverse=True)
+
+    def dump(self):
+        if self.use_cprofile and self.profilers:
+            stats = pstats.Stats(self.profilers[0])
+            for profiler in self.profilers[1:]:
+                stats.add(profiler)
+            stats.dump_stats(self.output)
+        elif self.sample_stacks:
+            with open(self.output, "w") as f:
+                for stack, count in sorted(self.stacks.items()):
+                    f.write(f"{stack} {count}\n")
+
+
+_current_profile: ContextVar[RunProfile | None] = ContextVar("run_profile", default=None)
+_fetch_times: ContextVar[dict | None] = ContextVar("profile_fetch_times", default=None)
+_in_fetch: ContextVar[bool] = ContextVar("profile_in_fetch", default=False)
+
+
+@contextmanager
+def profiling_run(output: str | None = None, trace_memory: bool = True):
+    """Profiles every graph node executed inside the block (and threads/tasks started from it).
+
+    Nested blocks reuse the enclosing profile.
+    """
+    profile = _current_profile.get()
+    if profile is not None:
+        yield profile
+        return
+
+    profile = RunProfile(output)
+    token = _current_profile.set(profile)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    stop_sampling = threading.Event()
+    sampler = None
+    if profile.sample_stacks:
+
+        def sample_loop():
+            while not stop_sampling.wait(profile.sample_interval):
+                profile.sample()
+
+        sampler = threading.Thread(target=sample_loop, name="profile-sampler", daemon=True)
+        sampler.start()
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        if sampler is not None:
+            stop_sampling.set()
+            sampler.join()
+        if started_tracing:
+            tracemalloc.stop()
+        profile.dump()
+
+
+def profile_node(node_name: str, func):
+    """Wraps a graph node so its calls are recorded by the active :func:`profiling_run`."""
+
+    @functools.wraps(func)
+    def wrapper(state):
+        profile = _current_profile.get()
+        if profile is None:
+            return func(state)
+        return profile.run_node(node_name, func, state)
+
+    return wrapper
+
+
+def profile_fetch(func):
+    """Adds the time of a data fetch (first argument: ticker) to the calling node's fetch time."""
+
+    @functools.wraps(func)
+    def wrapper(ticker, *args, **kwargs):
+        fetches = _fetch_times.get()
+        if fetches is None or _in_fetch.get():
+            return func(ticker, *args, **kwargs)
+        token = _in_fetch.set(True)
+        start = time.perf_counter()
+        try:
+            return func(ticker, *args, **kwargs)
+        finally:
+            fetches[ticker] += time.perf_counter() - start
+            _in_fetch.reset(token)
+
+    return wrapper
@@ -1,3 +1,7 @@
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 from datetime import datetime, timezone
 from rich.console import Console
 from rich.live import Live
@@ -6,32 +10,97 @@ from rich.style import Style
 from rich.text import Text
 from typing import Dict, Optional, Callable, List
 
+from src.utils.cancellation import cancelled
+
 console = Console()
 
+# Run that updates made in this context belong to (see progress_run)
+_current_run: ContextVar[Optional[str]] = ContextVar("progress_run", default=None)
+
 
 class AgentProgress:
-    """Manages progress tracking for multiple agents."""
+    """Manages progress tracking for multiple agents.
+
+    Updates only record the new status and notify handlers. The status table
+    is rebuilt by the live display's refresh thread, at most
+    ``refresh_per_second`` times and only after something changed, so nothing
+    is rendered when the display is not started (the API server) or is
+    headless (``PROGRESS_DISPLAY=off``).
 
-    def __init__(self):
+    Updates made inside a :func:`progress_run` block belong to that run: they
+    go to the handlers registered for its run ID (plus the global handlers)
+    and are tracked separately from the terminal's status table, so concurrent
+    API runs never see each other's events.
+    """
+
+    def __init__(self, headless: Optional[bool] = None, refresh_per_second: float = 4):
         self.agent_status: Dict[str, Dict[str, str]] = {}
         self.table = Table(show_header=False, box=None, padding=(0, 1))
-        self.live = Live(self.table, console=console, refresh_per_second=4)
+        self.headless = os.getenv("PROGRESS_DISPLAY", "live").lower() == "off" if headless is None else headless
+        self.refresh_per_second = refresh_per_second
+        self.live: Optional[Live] = None
         self.started = False
+        self._lock = threading.Lock()
+        self._version = 0  # bumped by every status change
+        self._rendered_version = -1
         self.update_handlers: List[Callable[[str, Optional[str], str], None]] = []
-
-    def register_handler(self, handler: Callable[[str, Optional[str], str], None]):
-        """Register a handler to be called when agent status updates."""
-        self.update_handlers.append(handler)
+        self.token_handlers: List[Callable[[str, Optional[str], str], None]] = []
+        # Per-run handlers and statuses, keyed by run ID
+        self.run_update_handlers: Dict[str, List[Callable]] = {}
+        self.run_token_handlers: Dict[str, List[Callable]] = {}
+        self.run_status: Dict[str, Dict[str, Dict[str, str]]] = {}
+
+    def register_handler(self, handler: Callable[[str, Optional[str], str], None], run_id: Optional[str] = None):
+        """Register a handler to be called when agent status updates (only for run ``run_id`` if given)."""
+        with self._lock:
+            self._handler_list(self.update_handlers, self.run_update_handlers, run_id).append(handler)
         return handler  # Return handler to support use as decorator
 
-    def unregister_handler(self, handler: Callable[[str, Optional[str], str], None]):
+    def unregister_handler(self, handler: Callable[[str, Optional[str], str], None], run_id: Optional[str] = None):
         """Unregister a previously registered handler."""
-        if handler in self.update_handlers:
-            self.update_handlers.remove(handler)
+        with self._lock:
+            self._remove_handler(self.update_handlers, self.run_update_handlers, run_id, handler)
+
+    def register_token_handler(self, handler: Callable[[str, Optional[str], str], None], run_id: Optional[str] = None):
+        """Register a handler called with (agent_name, ticker, text) for every streamed LLM token (only for run ``run_id`` if given)."""
+        with self._lock:
+            self._handler_list(self.token_handlers, self.run_token_handlers, run_id).append(handler)
+        return handler
+
+    def unregister_token_handler(self, handler: Callable[[str, Optional[str], str], None], run_id: Optional[str] = None):
+        """Unregister a previously registered token handler."""
+        with self._lock:
+            self._remove_handler(self.token_handlers, self.run_token_handlers, run_id, handler)
+
+    @staticmethod
+    def _handler_list(global_handlers: List[Callable], run_handlers: Dict[str, List[Callable]], run_id: Optional[str]) -> List[Callable]:
+        return global_handlers if run_id is None else run_handlers.setdefault(run_id, [])
+
+    @staticmethod
+    def _remove_handler(global_handlers: List[Callable], run_handlers: Dict[str, List[Callable]], run_id: Optional[str], handler: Callable):
+        handlers = global_handlers if run_id is None else run_handlers.get(run_id, [])
+        if handler in handlers:
+            handlers.remove(handler)
+        if run_id is not None and not handlers:
+            run_handlers.pop(run_id, None)
+
+    def end_run(self, run_id: str):
+        """Forget the statuses tracked for a finished run."""
+        with self._lock:
+            self.run_status.pop(run_id, None)
+
+    def stream_token(self, agent_name: str, ticker: Optional[str], text: str):
+        """Forward a streamed LLM token to the token handlers (the status table is not redrawn)."""
+        if cancelled():
+            return
+        run_id = _current_run.get()
+        for handler in [*self.token_handlers, *self.run_token_handlers.get(run_id, ())]:
+            handler(agent_name, ticker, text)
 
     def start(self):
-        """Start the progress display."""
-        if not self.started:
+        """Start the progress display (a no-op when headless)."""
+        if not self.started and not self.headless:
+            self.live = Live(console=console, refresh_per_second=self.refresh_per_second, get_renderable=self._render)
             self.live.start()
             self.started = True
 
@@ -42,39 +111,56 @@ class AgentProgress:
             self.started = False
 
     def update_status(self, agent_name: str, ticker: Optional[str] = None, status: str = "", analysis: Optional[str] = None):
-        """Update the status of an agent."""
-        if agent_name not in self.agent_status:
-            self.agent_status[agent_name] = {"status": "", "ticker": None}
-
-        if ticker:
-            self.agent_status[agent_name]["ticker"] = ticker
-        if status:
-            self.agent_status[agent_name]["status"] = status
-        if analysis:
-            self.agent_status[agent_name]["analysis"] = analysis
-        
-        # Set the timestamp as UTC datetime
-        timestamp = datetime.now(timezone.utc).isoformat()
-        self.agent_status[agent_name]["timestamp"] = timestamp
-
-        # Notify all registered handlers
-        for handler in self.update_handlers:
-            handler(agent_name, ticker, status, analysis, timestamp)
+        """Update the status of an agent; updates from cancelled work are dropped."""
+        if cancelled():
+            return
+        run_id = _current_run.get()
+        with self._lock:
+            statuses = self.agent_status if run_id is None else self.run_status.setdefault(run_id, {})
+            info = statuses.setdefault(agent_name, {"status": "", "ticker": None})
+            # Coalesce repeats: an update that changes nothing is not re-sent to the handlers
+            if not analysis and (not ticker or ticker == info["ticker"]) and (not status or status == info["status"]):
+                return
 
-        self._refresh_display()
+            if ticker:
+                info["ticker"] = ticker
+            if status:
+                info["status"] = status
+            if analysis:
+                info["analysis"] = analysis
+
+            # Set the timestamp as UTC datetime
+            timestamp = datetime.now(timezone.utc).isoformat()
+            info["timestamp"] = timestamp
+            if run_id is None:
+                self._version += 1
+            handlers = [*self.update_handlers, *self.run_update_handlers.get(run_id, ())]
+
+        # Notify the global handlers and those subscribed to this run
+        for handler in handlers:
+            handler(agent_name, ticker, status, analysis, timestamp)
 
     def get_all_status(self):
         """Get the current status of all agents as a dictionary."""
-        return {agent_name: {"ticker": info["ticker"], "status": info["status"], "display_name": self._get_display_name(agent_name)} for agent_name, info in self.agent_status.items()}
+        with self._lock:
+            return {agent_name: {"ticker": info["ticker"], "status": info["status"], "display_name": self._get_display_name(agent_name)} for agent_name, info in self.agent_status.items()}
 
     def _get_display_name(self, agent_name: str) -> str:
         """Convert agent_name to a display-friendly format."""
         return agent_name.replace("_agent", "").replace("_", " ").title()
 
-    def _refresh_display(self):
-        """Refresh the progress display."""
-        self.table.columns.clear()
-        self.table.add_column(width=100)
+    def _render(self) -> Table:
+        """The status table, rebuilt only when a status changed since the last render."""
+        with self._lock:
+            if self._rendered_version != self._version:
+                self._rendered_version = self._version
+                self.table = self._build_table()
+            return self.table
+
+    def _build_table(self) -> Table:
+        """Build the status table from the current agent statuses."""
+        table = Table(show_header=False, box=None, padding=(0, 1))
+        table.add_column(width=100)
 
         # Sort agents with Risk Management and Portfolio Management at the bottom
         def sort_key(item):
@@ -109,8 +195,22 @@ class AgentProgress:
                 status_text.append(f"[{ticker}] ", style=Style(color="cyan"))
             status_text.append(status, style=style)
 
-            self.table.add_row(status_text)
+            table.add_row(status_text)
+
+        return table
 
 
 # Create a global instance
 progress = AgentProgress()
+
+
+@contextmanager
+def progress_run(run_id: Optional[str]):
+    """Attributes progress updates and streamed tokens made inside the block (and threads/tasks started from it) to ``run_id``."""
+    token = _current_run.set(run_id)
+    try:
+        yield
+    finally:
+        _current_run.reset(token)
+        if run_id is not None:
+            progress.end_run(run_id)
@@ -0,0 +1,329 @@
+"""Incremental (streaming) technical indicators.
+
+Holds running EMA / EWM state and rolling-window sums per ticker so a
+day-by-day backtest advances every indicator by one bar at O(1) cost instead
+of recomputing the whole window each day. Values follow the same
+definitions as :func:`src.utils.indicators.compute_indicators` over the
+bars fed so far and are exposed as an :class:`IndicatorSet`, so the
+technical strategies can consume them unchanged.
+
+State is plain Python data; :meth:`IndicatorBook.snapshot` /
+:meth:`IndicatorBook.restore` copy it for backtest checkpoints.
+"""
+
+from __future__ import annotations
+
+import copy
+import math
+from collections import deque
+
+import numpy as np
+
+from src.utils.indicators import IndicatorSet
+
+
+class EMAState:
+    """``ewm(span, adjust=False).mean()``: seeded with the first value."""
+
+    def __init__(self, span: int):
+        self.decay = 1 - 2 / (span + 1)
+        self.value = math.nan
+
+    def update(self, x: float) -> float:
+        if math.isnan(self.value):
+            self.value = x
+        else:
+            self.value = self.decay * self.value + (1 - self.decay) * x
+        return self.value
+
+
+class EWMState:
+    """``ewm(span, adjust=True).mean()`` with NaN observations skipped."""
+
+    def __init__(self, span: int):
+        self.decay = 1 - 2 / (span + 1)
+        self.num = 0.0
+        self.den = 0.0
+
+    def update(self, x: float) -> float:
+        observed = not math.isnan(x)
+        self.num = self.decay * self.num + (x if observed else 0.0)
+        self.den = self.decay * self.den + (1.0 if observed else 0.0)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.num / self.den if self.den > 0 else math.nan
+
+
+class RollingWindow:
+    """Fixed-size window with running power sums for O(1) moments.
+
+    Sums are kept relative to the first value seen to limit cancellation.
+    Like pandas ``rolling(window)``, statistics are NaN until the window is
+    full or while it contains a NaN.
+    """
+
+    def __init__(self, window: int, moments: int = 2):
+        self.window = window
+        self.moments = moments
+        self.values: deque = deque()
+        self.sums = [0.0] * (moments + 1)
+        self.nan_count = 0
+        self.shift = None
+
+    def update(self, x: float):
+        if self.shift is None and not math.isnan(x):
+            self.shift = x
+        self._add(x, 1)
+        self.values.append(x)
+        if len(self.values) > self.window:
+            self._add(self.values.popleft(), -1)
+
+    def _add(self, x: float, sign: int):
+        if math.isnan(x):
+            self.nan_count += sign
+            return
+        d = x - self.shift
+        for k in range(1, self.moments + 1):
+            self.sums[k] += sign * d**k
+
+    @property
+    def ready(self) -> bool:
+        return len(self.values) == self.window and self.nan_count == 0
+
+    @property
+    def last(self) -> float:
+        return self.values[-1] if self.values else math.nan
+
+    def sum(self) -> float:
+        if not self.ready:
+            return math.nan
+        return self.sums[1] + self.window * self.shift
+
+    def mean(self) -> float:
+        if not self.ready:
+            return math.nan
+        return self.sums[1] / self.window + self.shift
+
+    def _central(self):
+        n = self.window
+        m1 = self.sums[1] / n
+        m2 = self.sums[2] / n - m1**2
+        if self.moments < 4:
+            return m2, None, None
+        m3 = self.sums[3] / n - 3 * m1 * self.sums[2] / n + 2 * m1**3
+        m4 = self.sums[4] / n - 4 * m1 * self.sums[3] / n + 6 * m1**2 * self.sums[2] / n - 3 * m1**4
+        return m2, m3, m4
+
+    def std(self) -> float:
+        if not self.ready or self.window < 2:
+            return math.nan
+        m2, _, _ = self._central()
+        return math.sqrt(max(m2, 0.0) * self.window / (self.window - 1))
+
+    def skew(self) -> float:
+        if not self.ready or self.window < 3:
+            return math.nan
+        m2, m3, _ = self._central()
+        if m2 <= 1e-14:
+            return math.nan
+        n = float(self.window)
+        return math.sqrt(n * (n - 1)) / (n - 2) * m3 / (m2 * math.sqrt(m2))
+
+    def kurt(self) -> float:
+        if not self.ready or self.window < 4:
+            return math.nan
+        m2, _, m4 = self._central()
+        if m2 <= 1e-14:
+            return math.nan
+        n = float(self.window)
+        return ((n * n - 1) * m4 / (m2 * m2) - 3 * (n - 1) ** 2) / ((n - 2) * (n - 3))
+
+
+class LaggedDifferenceStats:
+    """Running std of ``close[t] - close[t - lag]`` for every lag (Hurst exponent)."""
+
+    def __init__(self, max_lag: int = 20):
+        self.lags = list(range(2, max_lag))
+        self.history: deque = deque(maxlen=max_lag)
+        self.count = [0] * len(self.lags)
+        self.sum = [0.0] * len(self.lags)
+        self.sumsq = [0.0] * len(self.lags)
+
+    def update(self, close: float):
+        for i, lag in enumerate(self.lags):
+            if len(self.history) >= lag:
+                d = close - self.history[-lag]
+                self.count[i] += 1
+                self.sum[i] += d
+                self.sumsq[i] += d * d
+        self.history.append(close)
+
+    def hurst(self) -> float:
+        tau = []
+        for n, s, sq in zip(self.count, self.sum, self.sumsq):
+            if n == 0:
+                tau.append(1e-8)
+                continue
+            var = max(sq / n - (s / n) ** 2, 0.0)
+            tau.append(max(1e-8, math.sqrt(var)))
+        x = np.log(self.lags)
+        x_centered = x - x.mean()
+        slope = float((np.log(tau) * x_centered).sum() / (x_centered**2).sum())
+        return slope if math.isfinite(slope) else 0.5
+
+
+class TickerIndicatorState:
+    """All streaming indicator state for a single ticker."""
+
+    def __init__(self, adx_period: int = 14, atr_period: int = 14, hurst_max_lag: int = 20):
+        self.last_time: str | None = None
+        self.prev_close = self.prev_high = self.prev_low = math.nan
+        self.close = math.nan
+        self.volume = math.nan
+        self.ema_8, self.ema_21, self.ema_55 = EMAState(8), EMAState(21), EMAState(55)
+        self.plus_dm, self.minus_dm, self.tr_ewm, self.dx_ewm = (EWMState(adx_period) for _ in range(4))
+        self.tr = RollingWindow(atr_period, moments=1)
+        self.gains_14, self.losses_14 = RollingWindow(14, moments=1), RollingWindow(14, moments=1)
+        self.gains_28, self.losses_28 = RollingWindow(28, moments=1), RollingWindow(28, moments=1)
+        self.close_20, self.close_50 = RollingWindow(20), RollingWindow(50)
+        self.returns_21 = RollingWindow(21)
+        self.returns_63 = RollingWindow(63, moments=4)
+        self.returns_126 = RollingWindow(126, moments=1)
+        self.volume_21 = RollingWindow(21, moments=1)
+        self.hist_vol_63 = RollingWindow(63)
+        self.lagged = LaggedDifferenceStats(hurst_max_lag)
+
+    def update(self, close: float, high: float, low: float, volume: float, time: str | None = None):
+        """Advance every indicator by one bar."""
+        first = math.isnan(self.prev_close)
+
+        tr = high - low
+        if first:
+            up = down = math.nan
+            ret = math.nan
+            delta = 0.0
+        else:
+            tr = max(tr, abs(high - self.prev_close), abs(low - self.prev_close))
+            up = high - self.prev_high
+            down = self.prev_low - low
+            ret = close / self.prev_close - 1
+            delta = close - self.prev_close
+        plus_dm = up if up > down and up > 0 else 0.0
+        minus_dm = down if down > up and down > 0 else 0.0
+
+        for ema in (self.ema_8, self.ema_21, self.ema_55):
+            ema.update(close)
+
+        self.plus_dm.update(plus_dm)
+        self.minus_dm.update(minus_dm)
+        self.tr_ewm.update(tr)
+        self.dx_ewm.update(self._dx())
+
+        self.tr.update(tr)
+        gain, loss = (delta if delta > 0 else 0.0), (-delta if delta < 0 else 0.0)
+        for window in (self.gains_14, self.gains_28):
+            window.update(gain)
+        for window in (self.losses_14, self.losses_28):
+            window.update(loss)
+        self.close_20.update(close)
+        self.close_50.update(close)
+        for window in (self.returns_21, self.returns_63, self.returns_126):
+            window.update(ret)
+        self.volume_21.update(volume)
+        self.hist_vol_63.update(self.returns_21.std() * math.sqrt(252))
+        self.lagged.update(close)
+
+        self.prev_close, self.prev_high, self.prev_low = close, high, low
+        self.close, self.volume = close, volume
+        if time is not None:
+            self.last_time = time
+
+    def _di(self) -> tuple[float, float]:
+        tr = self.tr_ewm.value
+        if tr == 0 or math.isnan(tr):
+            return math.nan, math.nan
+        return 100 * self.plus_dm.value / tr, 100 * self.minus_dm.value / tr
+
+    def _dx(self) -> float:
+        plus_di, minus_di = self._di()
+        total = plus_di + minus_di
+        if math.isnan(total) or total == 0:
+            return math.nan
+        return 100 * abs(plus_di - minus_di) / total
+
+    def indicators(self) -> IndicatorSet:
+        """Current indicator values as an unbatched :class:`IndicatorSet`."""
+        plus_di, minus_di = self._di()
+        sma_20, std_20 = self.close_20.mean(), self.close_20.std()
+        hist_vol = self.hist_vol_63.last
+        vol_ma, vol_std = self.hist_vol_63.mean(), self.hist_vol_63.std()
+        values = dict(
+            close=self.close,
+            ema_8=self.ema_8.value,
+            ema_21=self.ema_21.value,
+            ema_55=self.ema_55.value,
+            adx=self.dx_ewm.value,
+            plus_di=plus_di,
+            minus_di=minus_di,
+            atr=self.tr.mean(),
+            rsi_14=_rsi(self.gains_14.mean(), self.losses_14.mean()),
+            rsi_28=_rsi(self.gains_28.mean(), self.losses_28.mean()),
+            bb_upper=sma_20 + 2 * std_20,
+            bb_lower=sma_20 - 2 * std_20,
+            z_score=_ratio(self.close - self.close_50.mean(), self.close_50.std()),
+            momentum_1m=self.returns_21.sum(),
+            momentum_3m=self.returns_63.sum(),
+            momentum_6m=self.returns_126.sum(),
+            volume_momentum=_ratio(self.volume, self.volume_21.mean()),
+            historical_volatility=hist_vol,
+            volatility_regime=_ratio(hist_vol, vol_ma),
+            volatility_z_score=_ratio(hist_vol - vol_ma, vol_std),
+            skewness=self.returns_63.skew(),
+            kurtosis=self.returns_63.kurt(),
+            hurst=self.lagged.hurst(),
+        )
+        return IndicatorSet(**{name: np.float64(value) for name, value in values.items()})
+
+
+def _ratio(a: float, b: float) -> float:
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return float(np.float64(a) / np.float64(b))
+
+
+def _rsi(avg_gain: float, avg_loss: float) -> float:
+    return 100 - 100 / (1 + _ratio(avg_gain, avg_loss))
+
+
+class IndicatorBook:
+    """Streaming indicator state for a set of tickers."""
+
+    def __init__(self):
+        self.states: dict[str, TickerIndicatorState] = {}
+
+    def advance(self, ticker: str, prices: list) -> TickerIndicatorState:
+        """Feed only the bars newer than the last one seen for ``ticker``.
+
+        ``prices`` are :class:`src.data.models.Price` objects; overlapping
+        lookback windows from consecutive backtest days are skipped in O(1)
+        per bar.
+        """
+        state = self.states.setdefault(ticker, TickerIndicatorState())
+        for price in sorted(prices, key=lambda p: p.time):
+            if state.last_time is not None and price.time <= state.last_time:
+                continue
+            state.update(price.close, price.high, price.low, price.volume, time=price.time)
+        return state
+
+    def indicators(self, ticker: str) -> IndicatorSet | None:
+        state = self.states.get(ticker)
+        return state.indicators() if state and state.last_time is not None else None
+
+    def snapshot(self) -> dict[str, TickerIndicatorState]:
+        """Deep copy of all ticker state for a checkpoint."""
+        return copy.deepcopy(self.states)
+
+    def restore(self, snapshot: dict[str, TickerIndicatorState]):
+        """Return to a previously taken snapshot."""
+        self.states = copy.deepcopy(snapshot)
@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+from src.agents.valuation import calculate_intrinsic_value, calculate_owner_earnings_value, summarize_dcf_scenarios
+from src.utils.dcf import dcf_scenarios, dcf_value, growth_path, owner_earnings_scenarios, present_value, project_cash_flows, staged_dcf_value, terminal_value
+
+
+def scalar_dcf(cash_flow, growth, discount, terminal_growth, years=5):
+    """逐年循环的标量DCF, 作为向量化实现的参照"""
+    pv = sum(cash_flow * (1 + growth) ** year / (1 + discount) ** year for year in range(1, years + 1))
+    terminal = cash_flow * (1 + growth) ** years * (1 + terminal_growth) / (discount - terminal_growth)
+    return pv + terminal / (1 + discount) ** years
+
+
+GROWTH_RATES = [-0.02, 0.0, 0.05, 0.12]
+DISCOUNT_RATES = [0.08, 0.10, 0.15]
+TERMINAL_GROWTH_RATES = [0.01, 0.03]
+
+
+class TestKernels:
+    """DCF核心函数测试"""
+
+    @pytest.mark.parametrize("growth", GROWTH_RATES)
+    @pytest.mark.parametrize("discount", DISCOUNT_RATES)
+    @pytest.mark.parametrize("terminal_growth", TERMINAL_GROWTH_RATES)
+    def test_dcf_value_matches_scalar_loop(self, growth, discount, terminal_growth):
+        """向量化DCF与标量循环结果一致"""
+        assert float(dcf_value(1_000.0, growth, discount, terminal_growth)) == pytest.approx(scalar_dcf(1_000.0, growth, discount, terminal_growth))
+
+    def test_dcf_value_broadcasts(self):
+        """整个网格一次计算的结果与逐点计算一致"""
+        g, r, tg = np.meshgrid(GROWTH_RATES, DISCOUNT_RATES, TERMINAL_GROWTH_RATES, indexing="ij")
+        values = dcf_value(1_000.0, g, r, tg)
+        expected = np.vectorize(lambda *args: scalar_dcf(1_000.0, *args))(g, r, tg)
+        np.testing.assert_allclose(values, expected)
+
+    def test_undefined_terminal_value_is_nan(self):
+        """折现率不高于永续增长率时终值无定义"""
+        assert np.isnan(dcf_value(1_000.0, 0.05, 0.03, 0.03))
+        assert np.isnan(terminal_value(1_000.0, 0.02, 5, terminal_growth=0.03))
+
+    def test_staged_dcf_matches_scalar_loop(self):
+        """多阶段DCF与逐年循环结果一致"""
+        growth = [0.10] * 3 + [0.04] * 2
+        cash_flows = 1_000.0 * np.cumprod([1 + g for g in growth])
+        expected = sum(cf / 1.09 ** year for year, cf in enumerate(cash_flows, start=1))
+        expected += cash_flows[-1] * 1.02 / (0.09 - 0.02) / 1.09 ** 5
+        assert float(staged_dcf_value(1_000.0, [(0.10, 3), (0.04, 2)], 0.09, terminal_growth=0.02)) == pytest.approx(expected)
+
+    def test_growth_path_fades_linearly(self):
+        """增长率从首年线性过渡到末年"""
+        np.testing.assert_allclose(growth_path(0.10, 5, fade_to=0.02), [0.10, 0.08, 0.06, 0.04, 0.02])
+
+    def test_present_value_start_year(self):
+        """从指定年份开始折现"""
+        cash_flows = project_cash_flows(100.0, growth_path(0.0, 2))
+        assert float(present_value(cash_flows, 0.10, start_year=3)) == pytest.approx(100 / 1.1**3 + 100 / 1.1**4)
+
+
+class TestScenarios:
+    """估值情景网格测试"""
+
+    def test_dcf_scenarios_match_agent_helper(self):
+        """情景网格中每个点与估值智能体的单点DCF一致"""
+        grid = dcf_scenarios({"AAA": 500.0, "BBB": 2_000.0}, GROWTH_RATES, DISCOUNT_RATES, TERMINAL_GROWTH_RATES)
+        assert grid.values.shape == (2, len(GROWTH_RATES), len(DISCOUNT_RATES), len(TERMINAL_GROWTH_RATES))
+        for i, base in enumerate((500.0, 2_000.0)):
+            for j, g in enumerate(GROWTH_RATES):
+                for k, r in enumerate(DISCOUNT_RATES):
+                    for l, tg in enumerate(TERMINAL_GROWTH_RATES):
+                        assert grid.values[i, j, k, l] == pytest.approx(calculate_intrinsic_value(base, g, r, tg))
+
+    def test_owner_earnings_scenarios_match_agent_helper(self):
+        """股东收益情景网格与估值智能体的单点结果一致"""
+        parts = {"net_income": 900.0, "depreciation": 200.0, "capex": 250.0, "working_capital_change": 50.0}
+        grid = owner_earnings_scenarios({"AAA": parts}, GROWTH_RATES, [0.12, 0.15], [0.03])
+        for j, g in enumerate(GROWTH_RATES):
+            for k, r in enumerate([0.12, 0.15]):
+                assert grid.values[0, j, k, 0] == pytest.approx(calculate_owner_earnings_value(**parts, growth_rate=g, required_return=r))
+
+    def test_tickers_without_cash_flow_are_nan(self):
+        """现金流缺失或非正的股票所有情景均为NaN"""
+        grid = dcf_scenarios({"AAA": 1_000.0, "BBB": None, "CCC": -5.0}, [0.05], [0.10], [0.03])
+        assert not np.isnan(grid.values[0]).any()
+        assert np.isnan(grid.values[1:]).all()
+        assert grid.percentiles()["BBB"] == {"p10": None, "p50": None, "p90": None}
+
+    def test_summary_helpers(self):
+        """分位数、低估概率和敏感性表"""
+        grid = dcf_scenarios({"AAA": 1_000.0}, GROWTH_RATES, DISCOUNT_RATES, TERMINAL_GROWTH_RATES, market_caps={"AAA": 15_000.0})
+        values = grid.values[0].ravel()
+        assert grid.percentiles()["AAA"]["p50"] == pytest.approx(np.percentile(values, 50))
+        assert grid.probability_undervalued()["AAA"] == pytest.approx(np.mean(values > 15_000.0))
+        table = grid.sensitivity("AAA", terminal_growth=0.03)
+        assert table.shape == (len(GROWTH_RATES), len(DISCOUNT_RATES))
+        assert table.loc[0.05, 0.10] == pytest.approx(scalar_dcf(1_000.0, 0.05, 0.10, 0.03))
+
+    def test_valuation_agent_summary(self):
+        """估值智能体的情景摘要"""
+        summary = summarize_dcf_scenarios("AAA", 1_000.0, 0.05, 15_000.0)
+        assert summary["scenarios"] == 75
+        assert summary["p10"] <= summary["p50"] <= summary["p90"]
+        assert 0 <= summary["probability_undervalued"] <= 1
+        assert summarize_dcf_scenarios("AAA", None, 0.05, 15_000.0) is None
@@ -0,0 +1,37 @@
+import numpy as np
+import pytest
+
+from src.utils.indicators import hurst_exponent
+from src.utils.streaming_indicators import LaggedDifferenceStats
+
+
+class TestHurstExponent:
+    """Hurst指数测试"""
+
+    @staticmethod
+    def random_walks(count: int = 50, bars: int = 400) -> np.ndarray:
+        """生成随机游走价格序列"""
+        rng = np.random.default_rng(42)
+        return 100 + np.cumsum(rng.normal(0, 1, (count, bars)), axis=-1)
+
+    def test_random_walk_is_near_half(self):
+        """随机游走的Hurst指数应接近0.5"""
+        hurst = hurst_exponent(self.random_walks())
+        assert np.mean(hurst) == pytest.approx(0.5, abs=0.05)
+
+    def test_trending_and_mean_reverting(self):
+        """趋势序列H>0.5, 均值回归序列H<0.5"""
+        rng = np.random.default_rng(7)
+        noise = rng.normal(0, 1, 400)
+        trending = 100 + np.cumsum(np.convolve(noise, np.ones(10) / 10, mode="same"))
+        mean_reverting = 100 + noise
+        assert hurst_exponent(trending) > 0.5
+        assert hurst_exponent(mean_reverting) < 0.2
+
+    def test_streaming_matches_batch(self):
+        """流式计算结果与批量计算一致"""
+        for close in self.random_walks(count=5):
+            stats = LaggedDifferenceStats()
+            for value in close:
+                stats.update(value)
+            assert stats.hurst() == pytest.approx(float(hurst_exponent(close)), abs=1e-9)
@@ -0,0 +1,77 @@
+import pytest
+
+from src.llm.json_repair import extract_json, repair_json
+
+
+class TestExtractJson:
+    """JSON提取与修复测试"""
+
+    def test_valid_json(self):
+        """合法JSON直接解析"""
+        assert extract_json('{"signal": "bullish", "confidence": 80}') == {"signal": "bullish", "confidence": 80}
+
+    @pytest.mark.parametrize(
+        "text",
+        [
+            '```json\n{"signal": "bullish"}\n```',
+            'Here you go:\n```\n{"signal": "bullish"}\n```\nDone.',
+            'The answer is {"signal": "bullish"} as requested.',
+            '<think>maybe {"signal": "bearish"}?</think>{"signal": "bullish"}',
+        ],
+    )
+    def test_fences_and_surrounding_text(self, text):
+        """代码块、前后文字和<think>块被去除"""
+        assert extract_json(text) == {"signal": "bullish"}
+
+    def test_trailing_commas(self):
+        """去除对象和数组中的尾随逗号"""
+        assert extract_json('{"values": [1, 2, 3,], "signal": "bullish",}') == {"values": [1, 2, 3], "signal": "bullish"}
+
+    def test_single_quotes(self):
+        """单引号字符串转为双引号, 其中的双引号被转义"""
+        assert extract_json("{'reasoning': 'a \"strong\" quarter'}") == {"reasoning": 'a "strong" quarter'}
+
+    def test_python_literals(self):
+        """Python字面量转为JSON字面量"""
+        assert extract_json('{"a": True, "b": False, "c": None}') == {"a": True, "b": False, "c": None}
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ('{"signal": bullish, "confidence": 50}', {"signal": "bullish", "confidence": 50}),
+            ('{signal: "bullish"}', {"signal": "bullish"}),
+            ('{"signal": 看涨, "confidence": 50}', {"signal": "看涨", "confidence": 50}),
+            ("{信号: 中立}", {"信号": "中立"}),
+        ],
+    )
+    def test_bare_words(self, text, expected):
+        """未加引号的键和枚举值(ASCII和中文)被加上引号"""
+        assert extract_json(text) == expected
+
+    def test_comments_and_raw_newlines(self):
+        """去除注释, 字符串中的换行被转义"""
+        text = '{\n  // signal\n  "signal": "bullish", /* score */\n  "reasoning": "line one\nline two"\n}'
+        assert extract_json(text) == {"signal": "bullish", "reasoning": "line one\nline two"}
+
+    @pytest.mark.parametrize(
+        "text, expected",
+        [
+            ('{"signal": "bullish", "reasoning": "revenue gr', {"signal": "bullish", "reasoning": "revenue gr"}),
+            ('{"signal": "bullish", "scores": [1, 2', {"signal": "bullish", "scores": [1, 2]}),
+            ('{"signal": "bullish", "confidence":', {"signal": "bullish"}),
+            ('{"signal": "bullish", "confid', {"signal": "bullish"}),
+            ('{"a": {"b": 1,', {"a": {"b": 1}}),
+        ],
+    )
+    def test_truncated(self, text, expected):
+        """截断的输出被补全, 悬空的键被丢弃"""
+        assert extract_json(text) == expected
+
+    @pytest.mark.parametrize("text", ["", "no json here", "```\n```"])
+    def test_nothing_to_extract(self, text):
+        """没有JSON时返回None"""
+        assert extract_json(text) is None
+
+    def test_repair_without_json(self):
+        """没有JSON起始符时repair_json返回None"""
+        assert repair_json("plain text") is None
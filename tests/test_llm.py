@@ -0,0 +1,77 @@
+import time
+
+import pytest
+from pydantic import BaseModel
+
+import src.graph.signal_reuse as signal_reuse
+import src.utils.llm as llm
+from src.graph.signal_reuse import SignalStore, record_input, signal_inputs
+from src.utils.cancellation import work_deadline
+
+
+class Signal(BaseModel):
+    signal: str
+    confidence: float
+    reasoning: str
+
+
+@record_input
+def get_prices(ticker: str) -> list[float]:
+    return [100.0, 101.5]
+
+
+class FakeModel:
+    """按预设行为返回结果或抛出异常的模型"""
+
+    def __init__(self, error: Exception | None = None):
+        self.error = error
+        self.calls = 0
+
+    async def ainvoke(self, prompt, config=None):
+        self.calls += 1
+        if self.error is not None:
+            raise self.error
+        return Signal(signal="bullish", confidence=80, reasoning="ok")
+
+
+class TestSignalReuseStorage:
+    """信号复用存储测试"""
+
+    @pytest.fixture(autouse=True)
+    def store(self, monkeypatch):
+        """每个测试使用独立的信号存储"""
+        store = SignalStore()
+        monkeypatch.setattr(signal_reuse, "_store", store)
+        return store
+
+    @pytest.fixture
+    def state(self):
+        return {"metadata": {"reuse_signals": True, "bypass_llm_cache": True}}
+
+    def call(self, monkeypatch, state, model: FakeModel) -> dict:
+        monkeypatch.setattr(llm, "_structured_llm", lambda target, pydantic_model: (model, "json_mode"))
+        with signal_inputs(state):
+            get_prices("AAPL")
+            return llm.call_llm_for_tickers({"AAPL": "prompt"}, Signal, "test_agent", state, max_retries=1)
+
+    def test_successful_signal_is_stored(self, monkeypatch, state, store):
+        """成功的信号会被存储"""
+        results = self.call(monkeypatch, state, FakeModel())
+        assert results["AAPL"].signal == "bullish"
+        assert [signal["signal"] for signal in store._signals.values()] == ["bullish"]
+
+    def test_failed_call_is_not_stored(self, monkeypatch, state, store):
+        """调用失败返回的默认信号不会被存储"""
+        results = self.call(monkeypatch, state, FakeModel(ValueError("bad reply")))
+        assert results["AAPL"].confidence == 0
+        assert not store._signals
+
+    def test_cancelled_call_is_not_stored(self, monkeypatch, state, store):
+        """超过截止时间后不调用LLM, 也不存储信号"""
+        model = FakeModel()
+        with work_deadline(0.001):
+            time.sleep(0.01)
+            results = self.call(monkeypatch, state, model)
+        assert model.calls == 0
+        assert results["AAPL"].confidence == 0
+        assert not store._signals
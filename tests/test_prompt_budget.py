@@ -0,0 +1,38 @@
+import math
+
+from src.llm.prompt_budget import compact, estimate_tokens, fit_to_budget, to_prompt_json
+
+
+class TestCompact:
+    """提示数据压缩测试"""
+
+    def test_rounds_and_drops_empty_dict_fields(self):
+        """浮点数保留有效数字, 字典中的空字段被去除"""
+        data = {"pe": 12.345678, "missing": None, "nan": math.nan, "notes": "", "details": {}, "score": 3}
+        assert compact(data) == {"pe": 12.35, "score": 3}
+
+    def test_keeps_list_positions(self):
+        """列表中的空值保留为null, 后续数值不会错位"""
+        data = {"revenue": [100.0, None, math.nan, 130.0]}
+        assert compact(data) == {"revenue": [100.0, None, None, 130.0]}
+        assert to_prompt_json(data) == '{"revenue":[100.0,null,null,130.0]}'
+
+    def test_drops_lists_without_values(self):
+        """全部为空的列表被去除"""
+        assert compact({"revenue": [None, math.nan], "eps": []}) == {}
+
+
+class TestFitToBudget:
+    """预算截断测试"""
+
+    def test_fits_and_keeps_protected_fields(self):
+        """截断后满足预算, 保留信号和评分字段"""
+        data = compact({"signal": "bullish", "score": 7, "max_score": 10, "history": list(range(500)), "reasoning": "x" * 2000})
+        fitted = fit_to_budget(data, 100)
+        assert estimate_tokens(to_prompt_json(fitted)) <= 100
+        assert {key: fitted[key] for key in ("signal", "score", "max_score")} == {"signal": "bullish", "score": 7, "max_score": 10}
+
+    def test_truncated_series_keeps_leading_periods(self):
+        """截断序列时保留前面的期数及其位置"""
+        fitted = fit_to_budget({"signal": "neutral", "revenue": [1, None, 3, 4, 5, 6, 7, 8] * 50}, 40)
+        assert fitted["revenue"][:3] == [1, None, 3]
@@ -0,0 +1,30 @@
+import copy
+
+from langchain_core.messages import HumanMessage
+from langgraph.graph import END, StateGraph
+
+from src.graph.state import AgentState, merge_analyst_signals
+
+
+class TestAgentState:
+    """图状态合并测试"""
+
+    def test_merge_analyst_signals(self):
+        """同一分析师的信号按股票合并"""
+        merged = merge_analyst_signals({"a": {"AAPL": 1}}, {"a": {"MSFT": 2}, "b": {"AAPL": 3}})
+        assert merged == {"a": {"AAPL": 1, "MSFT": 2}, "b": {"AAPL": 3}}
+
+    def test_copied_messages_are_not_appended_again(self):
+        """节点返回消息历史的副本(如来自检查点或工作进程)时不会重复"""
+
+        def node(state):
+            return {"messages": [*copy.deepcopy(state["messages"]), HumanMessage(content="done")]}
+
+        graph = StateGraph(AgentState)
+        graph.add_node("start_node", lambda state: state)
+        graph.add_node("node", node)
+        graph.set_entry_point("start_node")
+        graph.add_edge("start_node", "node")
+        graph.add_edge("node", END)
+        result = graph.compile().invoke({"messages": [HumanMessage(content="go")], "data": {}, "metadata": {}, "analyst_signals": {}})
+        assert [message.content for message in result["messages"]] == ["go", "done"]